@@ -2,7 +2,9 @@ import base64
 import logging
 import os
 from textwrap import dedent
+from urllib.parse import urljoin
 
+import httpx
 import uvicorn
 from langchain_core.messages import HumanMessage
 from openinference.instrumentation.langchain import LangChainInstrumentor
@@ -36,7 +38,7 @@ def get_agent_card(host: str, port: int):
     skill = AgentSkill(
         id="image_agent",
         name="Image Agent",
-        description="Agent that requests an image from the image MCP tool and returns the base64 to the UI.",
+        description="Agent that requests an image from the image MCP tool and returns it to the UI as base64.",
         tags=["image"],
         examples=["give me a 100x100 image", "show me an image that is 400 by 400"],
     )
@@ -60,6 +62,19 @@ def get_agent_card(host: str, port: int):
     )
 
 
+async def fetch_image_blob(result: dict) -> bytes:
+    """Download the bytes of an image that image_tool returned by reference.
+
+    Uses `blob_url` when the tool advertises one, otherwise resolves `blob_path`
+    against the MCP server URL.
+    """
+    blob_url = result.get("blob_url") or urljoin(os.getenv("MCP_URL", "http://localhost:8000/mcp"), result["blob_path"])
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.get(blob_url)
+        response.raise_for_status()
+        return response.content
+
+
 class ImageTaskEventEmitter:
     def __init__(self, task_updater: TaskUpdater):
         self.task_updater = task_updater
@@ -153,6 +168,24 @@ class ImageExecutor(AgentExecutor):
                     result = ""
 
             try:
+                # Images returned by reference: fetch the bytes once from the tool's blob endpoint
+                if isinstance(result, dict) and ("blob_url" in result or "blob_path" in result):
+                    image_bytes = await fetch_image_blob(result)
+                    mime_type = result.get("mime_type", "image/png")
+                    parts = [
+                        DataPart(
+                            data={
+                                "content": base64.b64encode(image_bytes).decode("utf-8"),
+                                "content_encoding": "base64",
+                                "content_type": mime_type,
+                                "source_url": result.get("url"),
+                            }
+                        )
+                    ]
+                    await task_updater.add_artifact(parts, name=f"image.{mime_type.split('/')[-1]}")
+                    await task_updater.complete()
+                    return
+
                 # Check if it looks like our image result structure
                 if isinstance(result, dict) and "image_base64" in result:
                     image_base64 = result.get("image_base64")
@@ -81,6 +81,21 @@ Assistant:
     "name": "get_channel_history",
     "arguments": {
       "channel_id": "C0123",
+      "limit": 20,
+      "trimmed": true
+    }
+  }
+]
+
+(2) Reading several channels
+User: What was discussed in channels C0123 and C0456?
+Assistant:
+<|tool_call|>
+[
+  {
+    "name": "get_channels_history",
+    "arguments": {
+      "channel_ids": ["C0123", "C0456"],
       "limit": 20
     }
   }
@@ -0,0 +1,163 @@
+"""Concurrency benchmark for the weather_service assistant node.
+
+Starts a local OpenAI-compatible chat endpoint that answers after a fixed delay,
+then runs N graph executions at once through ``graph.astream`` (as the A2A executor
+does) with the async node from ``build_graph`` and with the previous blocking node
+(``invoke``). With the async node N requests finish in about one LLM latency.
+LangGraph runs a sync node on the default thread pool (min(32, CPUs + 4) threads),
+so blocking calls queue behind it and take about N / pool size x latency. No MCP
+server or LLM is needed.
+
+    uv run bench_concurrency.py --requests 10 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+ANSWER = ["It ", "is ", "sunny ", "in ", "New ", "York."]
+
+
+def _fake_llm_app(latency: float) -> Starlette:
+    def chunk(delta: dict, finish_reason: str | None = None) -> str:
+        body = {
+            "id": "bench",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "bench",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body)}\n\n"
+
+    async def completions(request: Request):
+        payload = await request.json()
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            message = {"role": "assistant", "content": "".join(ANSWER)}
+            return JSONResponse(
+                {
+                    "id": "bench",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "bench",
+                    "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": len(ANSWER), "total_tokens": 1 + len(ANSWER)},
+                }
+            )
+
+        async def events():
+            # Spread the latency over the tokens, as a real model would
+            for i, token in enumerate(ANSWER):
+                await asyncio.sleep(latency / len(ANSWER))
+                yield chunk({"role": "assistant", "content": token} if i == 0 else {"content": token})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[Route("/v1/chat/completions", completions, methods=["POST"])])
+
+
+def _start_fake_llm(latency: float) -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(_fake_llm_app(latency), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def _blocking_graph():
+    """The graph as it was: a sync node calling ``invoke`` inside ``astream``."""
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import END, START, StateGraph
+    from weather_service.graph import SYS_MSG, ExtendedMessagesState, get_llm
+
+    llm_with_tools = get_llm().bind_tools([])
+
+    def assistant(state: ExtendedMessagesState) -> ExtendedMessagesState:
+        result = llm_with_tools.invoke([SYS_MSG] + state["messages"])
+        state["messages"].append(result)
+        if isinstance(result, AIMessage) and not result.tool_calls:
+            state["final_answer"] = result.content
+        return state
+
+    builder = StateGraph(ExtendedMessagesState)
+    builder.add_node("assistant", assistant)
+    builder.add_edge(START, "assistant")
+    builder.add_edge("assistant", END)
+    return builder.compile()
+
+
+async def _run_one(graph) -> tuple[float, float | None]:
+    from langchain_core.messages import HumanMessage
+
+    start = time.perf_counter()
+    first_token = None
+    stream = graph.astream({"messages": [HumanMessage(content="weather in NY?")]}, stream_mode=["updates", "messages"])
+    async for mode, event in stream:
+        if mode == "messages" and first_token is None and event[0].content:
+            first_token = time.perf_counter() - start
+    return time.perf_counter() - start, first_token
+
+
+async def _run_concurrently(graph, requests: int) -> dict:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_run_one(graph) for _ in range(requests)))
+    wall = time.perf_counter() - start
+    latencies = sorted(r[0] for r in results)
+    ttfts = sorted(r[1] for r in results if r[1] is not None)
+    return {
+        "wall_s": wall,
+        "max_latency_s": latencies[-1],
+        "median_ttft_s": ttfts[len(ttfts) // 2] if ttfts else None,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent weather_service graph runs")
+    parser.add_argument("--requests", type=int, default=10, help="Simultaneous graph executions")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    # Must be set before weather_service.graph reads its configuration
+    os.environ["LLM_API_BASE"] = _start_fake_llm(args.latency)
+    os.environ.setdefault("LLM_API_KEY", "bench")
+
+    from weather_service.graph import build_graph
+
+    print(f"{args.requests} concurrent requests, simulated LLM latency {args.latency:.2f}s")
+    # One event loop for everything: the shared chat model's async HTTP pool is bound to it
+    asyncio.run(_compare({"async node": build_graph([]), "blocking node": _blocking_graph()}, args))
+    return 0
+
+
+async def _compare(graphs: dict, args: argparse.Namespace) -> None:
+    for label, graph in graphs.items():
+        await _run_one(graph)  # warm up connections and imports
+        result = await _run_concurrently(graph, args.requests)
+        ttft = f"{result['median_ttft_s']:.2f}s" if result["median_ttft_s"] is not None else "n/a"
+        print(
+            f"{label:>14}: wall={result['wall_s']:6.2f}s ({result['wall_s'] / args.latency:5.1f}x latency)  "
+            f"slowest={result['max_latency_s']:6.2f}s  median first token={ttft}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Per-request tracing overhead benchmark for weather_service.
+
+Sends A2A-style requests through ``TracingMiddleware`` to a stand-in app that opens a
+few child spans carrying prompt/response payloads (as the LangChain/OpenAI
+instrumentation does) and streams an SSE response. Spans go through a
+``BatchSpanProcessor`` to an exporter that OTLP-encodes them but sends nothing, so
+serialization is counted and no collector is needed. Each configuration is
+compared with tracing off: full tracing, deduplicated payload attributes,
+ratio sampling and per-route rate limiting.
+
+    uv run bench_tracing.py --requests 2000 --ratio 0.1 --rate-limit 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+try:
+    from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+except ImportError:
+    encode_spans = None
+
+PROMPT = "What is the weather like in New York today? " * 23  # ~1000 chars, the capture limit
+ANSWER = "It is sunny in New York with a high of 21C. " * 23
+CHILD_SPANS = 4  # graph step, LLM call, tool call, LLM call
+
+
+class _EncodingExporter(SpanExporter):
+    """Encodes spans to OTLP protobuf, as the HTTP exporter would, and drops them."""
+
+    def __init__(self):
+        self.spans = 0
+        self.bytes = 0
+
+    def export(self, spans):
+        self.spans += len(spans)
+        if encode_spans is not None:
+            self.bytes += len(encode_spans(spans).SerializeToString())
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _request_body() -> bytes:
+    message = {"role": "user", "messageId": "msg-1", "parts": [{"kind": "text", "text": PROMPT}]}
+    return json.dumps({"jsonrpc": "2.0", "id": 1, "method": "message/stream", "params": {"message": message}}).encode()
+
+
+def _sse_events() -> list:
+    status = {"jsonrpc": "2.0", "id": 1, "result": {"kind": "status-update", "status": {"state": "working"}}}
+    artifact = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {"kind": "artifact-update", "artifact": {"parts": [{"text": ANSWER}]}},
+    }
+    return [f"data: {json.dumps(event)}\n\n".encode() for event in (status, status, artifact)]
+
+
+def _agent_app(obs):
+    events = _sse_events()
+
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+        for _ in range(CHILD_SPANS):
+            with obs.create_agent_span("gen_ai.step", input_text=PROMPT) as span:
+                obs.set_span_output(span, ANSWER)
+        root = obs.get_root_span()
+        if root and root.is_recording():
+            obs.set_span_output(root, ANSWER)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        for i, event in enumerate(events):
+            await send({"type": "http.response.body", "body": event, "more_body": i < len(events) - 1})
+
+    return app
+
+
+async def _run(middleware, requests: int) -> float:
+    body = _request_body()
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "path": "/", "headers": [(b"content-type", b"application/json")]}
+    start = time.perf_counter()
+    for _ in range(requests):
+        incoming = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            return incoming.pop()
+
+        await middleware(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def _measure(obs, label: str, env: dict, requests: int, baseline: float | None) -> float:
+    for name in ("OTEL_TRACES_SAMPLE_RATIO", "OTEL_TRACES_ROUTE_RATE_LIMIT"):
+        os.environ.pop(name, None)
+    os.environ.update({k: v for k, v in env.items() if k.startswith("OTEL_TRACES")})
+    obs._use_otel = env.get("tracing", True)
+    obs.PAYLOAD_DEDUP = env.get("dedup", False)
+
+    exporter = _EncodingExporter()
+    provider = TracerProvider(sampler=obs._build_sampler())
+    processor = BatchSpanProcessor(exporter)
+    provider.add_span_processor(processor)
+    # With tracing off the service has no tracer provider, so spans are no-ops
+    tracer = provider.get_tracer(obs.TRACER_NAME) if obs._use_otel else trace.NoOpTracer()
+    obs.get_tracer = lambda: tracer
+    middleware = obs.TracingMiddleware(_agent_app(obs))
+
+    asyncio.run(_run(middleware, min(200, requests)))  # warm up
+    processor.force_flush()
+    exporter.spans = exporter.bytes = 0
+    start = time.perf_counter()
+    asyncio.run(_run(middleware, requests))
+    # Export happens on the processor's thread; count it, as it competes for the same CPU
+    processor.force_flush()
+    elapsed = time.perf_counter() - start
+    provider.shutdown()
+
+    per_request = elapsed / requests * 1e6
+    overhead = f"+{per_request - baseline:7.1f}us" if baseline is not None else " " * 10
+    print(
+        f"{label:>24}: {per_request:8.1f} us/request {overhead}  "
+        f"spans/request={exporter.spans / requests:5.2f}  exported={exporter.bytes / requests / 1024:6.2f} KiB/request"
+    )
+    return per_request
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark weather_service tracing overhead")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per configuration")
+    parser.add_argument("--ratio", type=float, default=0.1, help="Sample ratio for the ratio configuration")
+    parser.add_argument(
+        "--rate-limit", type=float, default=50, help="Traces per second for the rate-limit configuration"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    os.environ.pop("OTEL_TRACES_SAMPLER", None)
+    from weather_service import observability as obs
+
+    logging.disable(logging.WARNING)
+    if encode_spans is None:
+        print("opentelemetry-exporter-otlp-proto-common not installed: export size not measured")
+    print(f"{args.requests} requests per configuration, {CHILD_SPANS} child spans each, ~1000-char payloads")
+
+    baseline = _measure(obs, "tracing off", {"tracing": False}, args.requests, None)
+    for label, env in (
+        ("full", {}),
+        ("dedup payloads", {"dedup": True}),
+        (f"ratio {args.ratio}", {"OTEL_TRACES_SAMPLE_RATIO": str(args.ratio)}),
+        (f"rate limit {args.rate_limit:g}/s", {"OTEL_TRACES_ROUTE_RATE_LIMIT": str(args.rate_limit)}),
+    ):
+        _measure(obs, label, env, args.requests, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
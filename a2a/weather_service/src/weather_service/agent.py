@@ -1,11 +1,11 @@
 import logging
 import os
 import re
+import time
 from textwrap import dedent
 
 import uvicorn
 from langchain_core.messages import HumanMessage
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.routing import Route
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
@@ -16,42 +16,78 @@ from a2a.server.tasks import InMemoryTaskStore, TaskUpdater
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill, TaskState, TextPart
 from a2a.utils import new_agent_text_message, new_task
 from weather_service.configuration import Configuration
-from weather_service.graph import get_graph, get_mcpclient
+from weather_service.graph import MCPConnectionError, graph_cache
+from weather_service.metrics import GRAPH_NODE_STAGES, TASKS, TASKS_IN_FLIGHT, metrics_endpoint, observe_stage
 from weather_service.observability import (
-    create_tracing_middleware,
+    TracingMiddleware,
     get_root_span,
     set_span_output,
 )
 
 
 class SecretRedactionFilter(logging.Filter):
-    """Redacts Bearer tokens and the configured API key from log messages."""
+    """Redacts Bearer tokens and the configured API key from log messages.
 
-    _BEARER_RE = re.compile(r"(Bearer\s+)\S+", re.IGNORECASE)
+    Can be attached to a logger or handler, but the agent installs it through
+    SecretRedactingFormatter so that only records that are emitted get redacted.
+    """
 
     def __init__(self):
         super().__init__()
         key = os.environ.get("LLM_API_KEY", "").strip()
-        self._key_re = re.compile(re.escape(key)) if len(key) > 8 else None
-
-    def _redact(self, text: str) -> str:
-        text = self._BEARER_RE.sub(r"\1[REDACTED]", text)
-        if self._key_re:
-            text = self._key_re.sub("[REDACTED]", text)
-        return text
+        self._key = key if len(key) > 8 else ""
+        # One pass for both secrets; an unmatched \1 (the key branch) expands to ""
+        pattern = r"(?i:(Bearer\s+))\S+"
+        if self._key:
+            pattern += "|" + re.escape(self._key)
+        self._secret_re = re.compile(pattern)
+
+    def redact(self, text: str) -> str:
+        # Substring searches are far cheaper than the regex: most messages contain neither
+        # secret and skip it, the rest only run it from the first possible match on
+        lowered = text.lower()
+        start = lowered.find("bearer")
+        if self._key:
+            key_at = text.find(self._key)
+            if key_at != -1 and (start == -1 or key_at < start):
+                start = key_at
+        if start == -1:
+            return text
+        if len(lowered) != len(text):
+            start = 0  # lower() changed the length, so offsets into it don't apply to text
+        return text[:start] + self._secret_re.sub(r"\1[REDACTED]", text[start:])
 
     def filter(self, record: logging.LogRecord) -> bool:
         if isinstance(record.msg, str):
-            record.msg = self._redact(record.msg)
+            record.msg = self.redact(record.msg)
         if isinstance(record.args, dict):
-            record.args = {k: self._redact(v) if isinstance(v, str) else v for k, v in record.args.items()}
+            record.args = {k: self.redact(v) if isinstance(v, str) else v for k, v in record.args.items()}
         elif isinstance(record.args, tuple):
-            record.args = tuple(self._redact(a) if isinstance(a, str) else a for a in record.args)
+            record.args = tuple(self.redact(a) if isinstance(a, str) else a for a in record.args)
         return True
 
 
+class SecretRedactingFormatter(logging.Formatter):
+    """Wraps a handler's formatter and redacts secrets from its output.
+
+    Formatting happens only for records a handler emits, so records dropped by a
+    level check cost nothing, and the message, its arguments and any traceback are
+    redacted together in a single pass.
+    """
+
+    def __init__(self, formatter: logging.Formatter | None = None):
+        super().__init__()
+        self._formatter = formatter or logging.Formatter()
+        self._redaction = SecretRedactionFilter()
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self._redaction.redact(self._formatter.format(record))
+
+
 logging.basicConfig(level=logging.INFO)
-logging.getLogger().addFilter(SecretRedactionFilter())
+for _handler in logging.getLogger().handlers:
+    if not isinstance(_handler.formatter, SecretRedactingFormatter):
+        _handler.setFormatter(SecretRedactingFormatter(_handler.formatter))
 logger = logging.getLogger(__name__)
 
 
@@ -104,6 +140,7 @@ class A2AEvent:
 
     async def emit_event(self, message: str, final: bool = False, failed: bool = False) -> None:
         logger.info("Emitting event %s", message)
+        start = time.perf_counter()
 
         if final or failed:
             parts = [TextPart(text=message)]
@@ -112,6 +149,7 @@ class A2AEvent:
                 await self.task_updater.complete()
             if failed:
                 await self.task_updater.failed()
+            TASKS.labels(outcome="failed" if failed else "completed").inc()
         else:
             await self.task_updater.update_status(
                 TaskState.working,
@@ -121,6 +159,7 @@ class A2AEvent:
                     self.task_updater.task_id,
                 ),
             )
+        observe_stage("emit", time.perf_counter() - start)
 
 
 class WeatherExecutor(AgentExecutor):
@@ -132,7 +171,17 @@ class WeatherExecutor(AgentExecutor):
         """
         The agent allows to retrieve weather info through a natural language conversational interface
         """
-
+        start = time.perf_counter()
+        with TASKS_IN_FLIGHT.track_inprogress():
+            try:
+                await self._execute(context, event_queue)
+            except Exception:
+                TASKS.labels(outcome="error").inc()
+                raise
+            finally:
+                observe_stage("execute", time.perf_counter() - start)
+
+    async def _execute(self, context: RequestContext, event_queue: EventQueue):
         # Setup Event Emitter
         task = context.current_task
         if not task:
@@ -156,7 +205,7 @@ class WeatherExecutor(AgentExecutor):
         # Parse Messages
         messages = [HumanMessage(content=user_input)]
         input = {"messages": messages}
-        logger.info(f"Processing messages: {input}")
+        logger.info("Processing messages: %s", input)
 
         # Note: Root span with MLflow attributes is created by tracing middleware
         # Here we just run the agent logic - spans from LangChain are auto-captured
@@ -172,32 +221,51 @@ class WeatherExecutor(AgentExecutor):
         else:
             logger.warning("No inbound Authorization header; MCP tool calls will be unauthenticated")
 
-        # Test MCP connection first
-        logger.info(f"Attempting to connect to MCP server at: {os.getenv('MCP_URL', 'http://localhost:8000/sse')}")
-
-        mcpclient = get_mcpclient(headers=mcp_headers)
-
-        # Try to get tools to verify connection
+        # The compiled graph and MCP tool list are cached per forwarded headers;
+        # only the first request for a given set of headers connects to MCP
+        graph_start = time.perf_counter()
         try:
-            tools = await mcpclient.get_tools()
-            logger.info(f"Successfully connected to MCP server. Available tools: {[tool.name for tool in tools]}")
-        except Exception as tool_error:
+            graph = await graph_cache.get(mcp_headers)
+            observe_stage("graph", time.perf_counter() - graph_start)
+        except MCPConnectionError as tool_error:
             logger.error(f"Failed to connect to MCP server: {tool_error}")
             await event_emitter.emit_event(
                 f"Error: Cannot connect to MCP weather service at {os.getenv('MCP_URL', 'http://localhost:8000/sse')}. Please ensure the weather MCP server is running. Error: {tool_error}",
                 failed=True,
             )
             return
-
-        try:
-            graph = await get_graph(mcpclient)
         except Exception as graph_error:
             logger.error(f"Failed to create LLM graph: {graph_error}")
             await event_emitter.emit_event(f"Error: Failed to initialize LLM graph: {graph_error}", failed=True)
             return
 
+        # Assistant tokens are forwarded as status updates in batches of this many
+        # characters; 0 turns token streaming off and only graph steps are emitted
+        flush_chars = int(os.getenv("LLM_STREAM_FLUSH_CHARS", "80"))
+        stream_mode = ["updates", "messages"] if flush_chars > 0 else ["updates"]
+        pending_tokens = ""
+        # Graph nodes run one after another, so the time between two step updates
+        # is how long the node in the second one took
+        step_start = time.perf_counter()
+
         try:
-            async for event in graph.astream(input, stream_mode="updates"):
+            async for mode, event in graph.astream(input, stream_mode=stream_mode):
+                if mode == "messages":
+                    chunk, metadata = event
+                    if metadata.get("langgraph_node") == "assistant" and isinstance(chunk.content, str):
+                        pending_tokens += chunk.content
+                        if len(pending_tokens) >= flush_chars:
+                            await event_emitter.emit_event(pending_tokens)
+                            pending_tokens = ""
+                    continue
+                now = time.perf_counter()
+                for node in event:
+                    if node in GRAPH_NODE_STAGES:
+                        observe_stage(GRAPH_NODE_STAGES[node], now - step_start)
+                step_start = now
+                if pending_tokens:
+                    await event_emitter.emit_event(pending_tokens)
+                    pending_tokens = ""
                 await event_emitter.emit_event(
                     "\n".join(
                         f"🚶‍♂️{key}: {str(value)[:256] + '...' if len(str(value)) > 256 else str(value)}"
@@ -206,9 +274,11 @@ class WeatherExecutor(AgentExecutor):
                     + "\n"
                 )
                 output = event
-                logger.info(f"event: {event}")
+                logger.info("event: %s", event)
         except Exception as llm_error:
             logger.error(f"LLM execution failed: {llm_error}")
+            # The cached graph may hold stale tools or credentials; rebuild it next time
+            graph_cache.invalidate(mcp_headers)
             await event_emitter.emit_event(f"Error: LLM execution failed: {llm_error}", failed=True)
             return
 
@@ -262,7 +332,10 @@ def run():
         ),
     )
 
+    # Prometheus metrics (request rate, in-flight tasks, per-stage latency)
+    app.routes.insert(0, Route("/metrics", metrics_endpoint, methods=["GET"], name="metrics"))
+
     # Add tracing middleware - creates root span with MLflow/GenAI attributes
-    app.add_middleware(BaseHTTPMiddleware, dispatch=create_tracing_middleware())
+    app.add_middleware(TracingMiddleware)
 
     uvicorn.run(app, host="0.0.0.0", port=8000)
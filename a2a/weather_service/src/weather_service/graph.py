@@ -1,4 +1,12 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
 
 from langchain_core.messages import AIMessage, SystemMessage
 from langchain_mcp_adapters.client import MultiServerMCPClient
@@ -7,8 +15,15 @@ from langgraph.graph import START, MessagesState, StateGraph
 from langgraph.prebuilt import ToolNode, tools_condition
 
 from weather_service.configuration import Configuration
+from weather_service.metrics import observe_stage
 
 config = Configuration()
+logger = logging.getLogger(__name__)
+
+# System message
+SYS_MSG = SystemMessage(
+    content="You are a helpful assistant tasked with providing weather information. You must use the provided tools to complete your task."
+)
 
 
 # Extend MessagesState to include a final answer
@@ -32,8 +47,10 @@ def get_mcpclient(headers=None):
     return MultiServerMCPClient({"math": mcp_config})
 
 
-async def get_graph(client) -> StateGraph:
-    llm = ChatOpenAI(
+@lru_cache(maxsize=1)
+def get_llm() -> ChatOpenAI:
+    """One chat model (and HTTP connection pool) shared by every compiled graph."""
+    return ChatOpenAI(
         model=config.llm_model,
         openai_api_key=config.llm_api_key,
         openai_api_base=config.llm_api_base,
@@ -42,18 +59,23 @@ async def get_graph(client) -> StateGraph:
         request_timeout=int(os.getenv("LLM_REQUEST_TIMEOUT", "60")),
     )
 
+
+async def get_graph(client) -> StateGraph:
     # Get tools asynchronously
     tools = await client.get_tools()
-    llm_with_tools = llm.bind_tools(tools)
+    return build_graph(tools)
 
-    # System message
-    sys_msg = SystemMessage(
-        content="You are a helpful assistant tasked with providing weather information. You must use the provided tools to complete your task."
-    )
 
-    # Node
-    def assistant(state: ExtendedMessagesState) -> ExtendedMessagesState:
-        result = llm_with_tools.invoke([sys_msg] + state["messages"])
+def build_graph(tools) -> StateGraph:
+    start = time.perf_counter()
+    llm_with_tools = get_llm().bind_tools(tools)
+
+    # Node: async so the LLM call never blocks the event loop shared with other
+    # requests; under stream_mode="messages" LangGraph streams its tokens as they arrive
+    async def assistant(state: ExtendedMessagesState) -> ExtendedMessagesState:
+        llm_start = time.perf_counter()
+        result = await llm_with_tools.ainvoke([SYS_MSG] + state["messages"])
+        observe_stage("llm", time.perf_counter() - llm_start)
         state["messages"].append(result)
         # Set the final answer only if the result is an AIMessage (i.e., not a tool call)
         # and it's meant to be the final response to the user.
@@ -75,9 +97,115 @@ async def get_graph(client) -> StateGraph:
 
     # Compile graph
     graph = builder.compile()
+    observe_stage("graph_build", time.perf_counter() - start)
     return graph
 
 
+class MCPConnectionError(Exception):
+    """The MCP server could not be reached to list its tools."""
+
+
+def tools_signature(tools) -> str:
+    """Digest of the tool names, descriptions and argument schemas, to detect tool-list changes."""
+    described = [
+        (tool.name, tool.description, tool.args_schema if isinstance(tool.args_schema, dict) else tool.args)
+        for tool in tools
+    ]
+    return hashlib.sha256(json.dumps(sorted(described), sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class _CachedGraph:
+    graph: StateGraph
+    signature: str
+    checked_at: float
+    refresh: asyncio.Task | None = None
+
+
+class GraphCache:
+    """Process-wide cache of compiled graphs, keyed by the headers forwarded to MCP.
+
+    A cached graph is returned with no MCP or LLM setup at all. Once an entry is
+    older than ``ttl`` seconds it is still served, while a background task lists
+    the MCP tools again and recompiles the graph only if they changed. Tool calls
+    carry the forwarded headers, so each distinct set of headers gets its own
+    graph; the least recently used are evicted beyond ``maxsize``.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        # The entry just built must survive eviction to be returned
+        self.maxsize = max(1, maxsize)
+        self._entries: OrderedDict[tuple, _CachedGraph] = OrderedDict()
+        self._locks: dict[tuple, asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(headers: dict | None) -> tuple:
+        return tuple(sorted((headers or {}).items()))
+
+    async def _list_tools(self, headers: dict | None):
+        start = time.perf_counter()
+        try:
+            return await get_mcpclient(headers=headers).get_tools()
+        except Exception as error:
+            raise MCPConnectionError(str(error)) from error
+        finally:
+            observe_stage("mcp_get_tools", time.perf_counter() - start)
+
+    async def get(self, headers: dict | None = None) -> StateGraph:
+        key = self._key(headers)
+        entry = self._entries.get(key)
+        if entry is None:
+            # One build per key, however many requests arrive while it runs
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                entry = self._entries.get(key)
+                if entry is None:
+                    try:
+                        tools = await self._list_tools(headers)
+                        logger.info(
+                            f"Successfully connected to MCP server. Available tools: {[tool.name for tool in tools]}"
+                        )
+                        entry = _CachedGraph(build_graph(tools), tools_signature(tools), time.monotonic())
+                    finally:
+                        # A failed build leaves no entry to evict the lock with
+                        if entry is None:
+                            self._locks.pop(key, None)
+                    self._entries[key] = entry
+                    while len(self._entries) > self.maxsize:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._locks.pop(evicted, None)
+        self._entries.move_to_end(key)
+        if time.monotonic() - entry.checked_at >= self.ttl and entry.refresh is None:
+            entry.refresh = asyncio.create_task(self._refresh(headers, entry))
+        return entry.graph
+
+    async def _refresh(self, headers: dict | None, entry: _CachedGraph) -> None:
+        try:
+            tools = await self._list_tools(headers)
+            signature = tools_signature(tools)
+            if signature != entry.signature:
+                logger.info(
+                    f"MCP tool list changed, rebuilding graph. Available tools: {[tool.name for tool in tools]}"
+                )
+                entry.graph = build_graph(tools)
+                entry.signature = signature
+        except Exception as error:
+            logger.warning(f"Failed to refresh MCP tools, keeping cached graph: {error}")
+        finally:
+            entry.checked_at = time.monotonic()
+            entry.refresh = None
+
+    def invalidate(self, headers: dict | None = None) -> None:
+        """Drop the graph for ``headers`` so the next request rebuilds it."""
+        self._entries.pop(self._key(headers), None)
+
+
+graph_cache = GraphCache(
+    ttl=float(os.getenv("GRAPH_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("GRAPH_CACHE_SIZE", "32")),
+)
+
+
 # async def main():
 #     from langchain_core.messages import HumanMessage
 #     client = get_mcpclient()
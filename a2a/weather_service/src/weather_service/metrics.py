@@ -0,0 +1,51 @@
+"""
+Prometheus metrics for the Weather Agent.
+
+Always on and served at /metrics by the agent's own HTTP server, so request rate,
+in-flight tasks and per-stage latency can be scraped and alerted on without an
+OTEL collector or sampled traces.
+
+Stages of WeatherExecutor.execute (label ``stage`` of weather_agent_stage_seconds):
+- execute: the whole task
+- graph: getting the compiled graph (a cache hit, or listing tools and building it)
+- mcp_get_tools: listing the MCP server's tools
+- graph_build: compiling the LangGraph graph
+- llm: one LLM call of the assistant node
+- tool: one run of the tools node (the tool calls requested by one LLM turn)
+- emit: enqueueing one A2A event
+"""
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+
+# From 100us (event emits) to a minute (slow LLM calls and tool runs)
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+TASKS = Counter("weather_agent_tasks", "A2A tasks finished, by outcome", ["outcome"])
+TASKS_IN_FLIGHT = Gauge("weather_agent_tasks_in_flight", "A2A tasks currently executing")
+STAGE_SECONDS = Histogram(
+    "weather_agent_stage_seconds",
+    "Time spent in each stage of handling an A2A task",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+# Graph nodes whose duration is recorded as a stage
+GRAPH_NODE_STAGES = {"tools": "tool"}
+
+
+# Resolved label children; labels() takes a lock and builds a key on every call
+_stage_histograms: dict = {}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    histogram = _stage_histograms.get(stage)
+    if histogram is None:
+        histogram = _stage_histograms[stage] = STAGE_SECONDS.labels(stage=stage)
+    histogram.observe(seconds)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
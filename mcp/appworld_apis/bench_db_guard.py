@@ -0,0 +1,87 @@
+"""Microbenchmark for the docker-mode DB guard's per-call overhead.
+
+Times path coercion with and without the resolved-path cache, and a guarded
+``save_local_dbs`` call against the previous guard (``inspect`` binding and path
+resolution on every call) and against calling an unguarded no-op directly. No appworld install
+is needed; the no-op mirrors AppWorld's ``save_local_dbs`` signature.
+
+    python bench_db_guard.py --calls 200000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from inspect import signature
+from typing import Literal
+
+from entrypoint import _coerce_db_path_for_docker_mode, _guard_save_local_dbs, _resolve_db_path
+
+
+def save_local_dbs(
+    from_db_home_path: str,
+    to_db_home_path: str,
+    format: Literal["full", "changes"] = "full",
+    app_names: list[str] | None = None,
+    delete_if_exists: bool = False,
+    skip_mandatory_apps: bool = False,
+    save_model_hashes: bool = False,
+    vaccum: bool = False,
+) -> None:
+    pass
+
+
+def _coerce_uncached(path: str | None, appworld_root: str) -> str | None:
+    return None if path is None else _resolve_db_path.__wrapped__(path, appworld_root)
+
+
+def _bind_every_call(original, appworld_root: str):
+    """The guard as it was: ``inspect`` binding and path resolution on every call."""
+    save_sig = signature(original)
+
+    def guarded(*args, **kwargs) -> None:
+        arguments = dict(save_sig.bind_partial(*args, **kwargs).arguments)
+        arguments["to_db_home_path"] = _coerce_uncached(arguments.get("to_db_home_path"), appworld_root)
+        arguments["from_db_home_path"] = _coerce_uncached(arguments.get("from_db_home_path"), appworld_root)
+        original(**arguments)
+
+    return guarded
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the docker-mode DB guard")
+    parser.add_argument("--calls", type=int, default=200_000, help="Calls per measurement")
+    parser.add_argument("--root", default="/run", help="APPWORLD_ROOT to resolve against")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    root = os.path.abspath(args.root)
+    src = os.path.join(root, "experiments", "outputs", "exp", "tasks", "abc123", "dbs")
+    dst = "/home/user/appworld/experiments/outputs/exp/tasks/abc123/dbs_saved"
+
+    def per_call_us(stmt) -> float:
+        return min(timeit.repeat(stmt, number=args.calls, repeat=3)) / args.calls * 1e6
+
+    results = {
+        "coerce, uncached": per_call_us(lambda: _coerce_uncached(dst, root)),
+        "coerce, cached": per_call_us(lambda: _coerce_db_path_for_docker_mode(dst, root)),
+        "save, unguarded": per_call_us(lambda: save_local_dbs(src, dst, format="changes")),
+    }
+    # Build the wrappers once, as the guard does, so only the call itself is timed
+    old = _bind_every_call(save_local_dbs, root)
+    new = _guard_save_local_dbs(save_local_dbs, root)
+    results["save, previous guard"] = per_call_us(lambda: old(src, dst, format="changes"))
+    results["save, guarded"] = per_call_us(lambda: new(src, dst, format="changes"))
+
+    for label, micros in results.items():
+        print(f"{label:>22}: {micros:7.3f} us/call")
+    overhead = results["save, guarded"] - results["save, unguarded"]
+    print(f"guard overhead: {overhead:.3f} us/call ({overhead * 1000:.0f} ms per million calls)")
+    print(f"resolved-path cache: {_resolve_db_path.cache_info()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
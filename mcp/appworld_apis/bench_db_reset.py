@@ -0,0 +1,123 @@
+"""Task DB reset benchmark: plain file copies vs the snapshot pool.
+
+A "reset" copies every app DB of a source DB home into a fresh task DB home, as
+AppWorld does when a task sets its DBs. It is timed with a plain ``shutil.copy``
+(today's path), with ``SnapshotPool`` when the pool has refilled between resets
+(as it does between episodes) and when resets run back to back. A SQLite backup into
+``:memory:``, AppWorld's in-memory path, is timed for comparison. Without
+``--source`` a synthetic DB home is generated. No appworld install is needed.
+
+    python bench_db_reset.py --apps 11 --size-mb 8 --resets 30
+    python bench_db_reset.py --source /run/data/base_dbs --workdir /run/experiments/outputs
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from db_snapshots import SnapshotPool
+
+
+def make_db_home(directory: str, apps: int, size_mb: int) -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(apps):
+        path = os.path.join(directory, f"app{i}.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY, body BLOB)")
+            conn.executemany("INSERT INTO rows (body) VALUES (?)", ((os.urandom(4096),) for _ in range(size_mb * 256)))
+        conn.close()
+        paths.append(path)
+    return paths
+
+
+def _time_resets(sources: List[str], workdir: str, resets: int, reset: Callable[[str, str], None]) -> List[float]:
+    timings = []
+    for n in range(resets):
+        home = os.path.join(workdir, f"task{n}")
+        start = time.perf_counter()
+        for src in sources:
+            reset(src, os.path.join(home, os.path.basename(src)))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _copy(src: str, dst: str) -> None:
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.copy(src, dst)
+
+
+def _memory_backup(src: str, dst: str) -> None:
+    source = sqlite3.connect(src)
+    target = sqlite3.connect(":memory:")
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def _summary(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    return {
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[max(0, int(len(timings) * 0.95) - 1)] * 1000,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark AppWorld task DB resets")
+    parser.add_argument("--source", default=None, help="DB home to copy from (default: generate one)")
+    parser.add_argument("--apps", type=int, default=11, help="Apps in the generated DB home")
+    parser.add_argument("--size-mb", type=int, default=8, help="Size of each generated app DB")
+    parser.add_argument("--resets", type=int, default=30, help="Resets per mode")
+    parser.add_argument("--depth", type=int, default=2, help="Snapshot pool depth")
+    parser.add_argument("--workdir", default=None, help="Where task DB homes and the pool go (same filesystem)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    workdir = tempfile.mkdtemp(prefix="db-reset-bench-", dir=args.workdir)
+    try:
+        if args.source:
+            sources = sorted(entry.path for entry in os.scandir(args.source) if entry.name.endswith(".db"))
+        else:
+            sources = make_db_home(os.path.join(workdir, "base"), args.apps, args.size_mb)
+        total_mb = sum(os.path.getsize(path) for path in sources) / 2**20
+        print(f"{len(sources)} app DBs, {total_mb:.1f} MiB per reset, {args.resets} resets per mode")
+
+        results = {"copy": _summary(_time_resets(sources, os.path.join(workdir, "copy"), args.resets, _copy))}
+
+        pool = SnapshotPool(os.path.join(workdir, "pool"), depth=args.depth)
+        pool.prepare(sources)
+        pool.wait()
+        between = []
+        for n in range(args.resets):
+            between += _time_resets(sources, os.path.join(workdir, f"pool{n}"), 1, pool.materialize)
+            pool.wait()
+        results["pool (refilled)"] = _summary(between)
+        results["pool (back to back)"] = _summary(
+            _time_resets(sources, os.path.join(workdir, "pool-b2b"), args.resets, pool.materialize)
+        )
+        results[":memory: backup"] = _summary(_time_resets(sources, workdir, args.resets, _memory_backup))
+
+        baseline = results["copy"]["mean_ms"]
+        for label, result in results.items():
+            print(
+                f"{label:>20}: mean={result['mean_ms']:8.2f}ms  p50={result['p50_ms']:8.2f}ms  "
+                f"p95={result['p95_ms']:8.2f}ms  speedup={baseline / result['mean_ms']:6.1f}x"
+            )
+        print(f"pool methods used: {dict(pool.stats)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Copy-on-write snapshot pool for AppWorld task databases.
+
+AppWorld resets a task's databases by copying each app's SQLite file from the
+source DB home (the base DBs, or a task's inputs) into the task's DB home. This
+module makes that copy near constant time: on filesystems with reflink support
+(btrfs, XFS, ...) the file is cloned copy-on-write; elsewhere a few private copies
+of each source are kept ready in a pool directory and renamed into place, and a
+background thread refills the pool.
+
+Kept free of appworld imports so the benchmark can use it on its own.
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import Counter, deque
+
+# _IOW(0x94, 9, int) from linux/fs.h: clone a whole file, sharing extents
+FICLONE = 0x40049409
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Clone ``src`` to a new file ``dst`` copy-on-write; return False if the filesystem can't."""
+    try:
+        with open(src, "rb") as source, open(dst, "xb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        try:
+            os.unlink(dst)
+        except FileNotFoundError:
+            pass
+        return False
+    shutil.copymode(src, dst)
+    return True
+
+
+def _source_key(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class SnapshotPool:
+    """Hands out private copies of SQLite files in (near) constant time.
+
+    ``materialize(src, dst)`` places a copy of ``src`` at ``dst`` and returns how it
+    did so: ``"reflink"``, ``"pool"`` (a pre-made copy renamed into place) or
+    ``"copy"`` (the pool was empty). Only sources registered with ``prepare`` are
+    pooled, kept topped up to ``depth`` ready copies; these should be files that are
+    not written in place, such as the base DBs, as a snapshot is judged current by
+    its source's mtime and size alone. Copies made before the source file last
+    changed are discarded rather than handed out. Any other source is cloned or
+    copied directly.
+    """
+
+    def __init__(self, directory: str, depth: int = 2) -> None:
+        self.directory = directory
+        self.depth = depth
+        self.stats: Counter[str] = Counter()
+        self._ready: dict[str, deque[tuple[tuple[int, int], str]]] = {}
+        self._wanted: set[str] = set()
+        self._reflink_devices: dict[tuple[int, int], bool] = {}
+        self._cond = threading.Condition()
+        self._filling = False
+        os.makedirs(directory, exist_ok=True)
+        # Snapshots left by a previous run may predate changes to their sources
+        for name in os.listdir(directory):
+            if name.endswith(SNAPSHOT_SUFFIX):
+                os.unlink(os.path.join(directory, name))
+        threading.Thread(target=self._fill_forever, name="db-snapshot-pool", daemon=True).start()
+
+    def materialize(self, src: str, dst: str) -> str:
+        dst_dir = os.path.dirname(dst) or "."
+        os.makedirs(dst_dir, exist_ok=True)
+        tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+
+        device = (os.stat(src).st_dev, os.stat(dst_dir).st_dev)
+        if self._reflink_devices.get(device, True):
+            cloned = reflink(src, tmp)
+            self._reflink_devices[device] = cloned
+            if cloned:
+                os.replace(tmp, dst)
+                self.stats["reflink"] += 1
+                return "reflink"
+
+        snapshot = self._take(src)
+        if snapshot is not None:
+            try:
+                os.replace(snapshot, dst)
+                self.stats["pool"] += 1
+                return "pool"
+            except OSError:
+                # Pool directory on another filesystem; fall through to a plain copy
+                os.unlink(snapshot)
+        shutil.copy(src, tmp)
+        os.replace(tmp, dst)
+        self.stats["copy"] += 1
+        return "copy"
+
+    def prepare(self, sources: list[str]) -> None:
+        """Keep ``sources`` topped up in the pool from now on."""
+        with self._cond:
+            self._wanted.update(sources)
+            self._cond.notify_all()
+
+    def ready(self, src: str) -> int:
+        with self._cond:
+            return len(self._ready.get(src, ()))
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until every wanted source has ``depth`` ready copies."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._filling and self._next_source() is None, timeout)
+
+    def _take(self, src: str) -> str | None:
+        try:
+            key = _source_key(src)
+        except OSError:
+            return None
+        with self._cond:
+            if src not in self._wanted:
+                return None
+            ready = self._ready.get(src)
+            while ready:
+                snapshot_key, snapshot = ready.popleft()
+                if snapshot_key == key:
+                    self._cond.notify_all()
+                    return snapshot
+                os.unlink(snapshot)
+            return None
+
+    def _next_source(self) -> str | None:
+        for src in self._wanted:
+            if len(self._ready.get(src, ())) < self.depth:
+                return src
+        return None
+
+    def _fill_forever(self) -> None:
+        while True:
+            with self._cond:
+                self._filling = False
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._next_source() is not None)
+                src = self._next_source()
+                self._filling = True
+            try:
+                self._fill_one(src)
+            except OSError as error:
+                print(f"[db-snapshots] cannot snapshot {src}: {error}")
+                with self._cond:
+                    self._wanted.discard(src)
+
+    def _fill_one(self, src: str) -> None:
+        digest = hashlib.sha1(src.encode()).hexdigest()[:12]
+        snapshot = os.path.join(self.directory, f"{digest}-{uuid.uuid4().hex[:8]}{SNAPSHOT_SUFFIX}")
+        # Stat before copying: if the source changes mid-copy the key is stale and
+        # the snapshot will be discarded instead of handed out
+        key = _source_key(src)
+        shutil.copy(src, snapshot)
+        with self._cond:
+            self._ready.setdefault(src, deque()).append((key, snapshot))
+
+
+class SnapshotShutil:
+    """Stands in for ``shutil`` inside AppWorld's model_lib so DB copies come from a SnapshotPool."""
+
+    def __init__(self, pool: SnapshotPool) -> None:
+        self._pool = pool
+
+    def __getattr__(self, name: str):
+        return getattr(shutil, name)
+
+    def copy(self, src: str, dst: str, **kwargs):
+        if kwargs or not str(src).endswith(".db"):
+            return shutil.copy(src, dst, **kwargs)
+        if os.path.isdir(dst):
+            dst = os.path.join(dst, os.path.basename(src))
+        self._pool.materialize(str(src), str(dst))
+        return dst
@@ -1,12 +1,34 @@
+"""Supervisor for the AppWorld APIs and MCP servers.
+
+Runs ``MCP_WORKERS`` MCP processes and ``APIS_WORKERS`` API processes (by default
+one per MCP worker, see ``build_workers``), restarting
+any that exit with exponential backoff (``RESTART_BACKOFF_SECONDS`` doubling up to
+``RESTART_BACKOFF_MAX_SECONDS``, reset after ``RESTART_STABLE_SECONDS`` of uptime).
+MCP workers start only once their API worker answers its readiness probe, and
+pre-import the apps in ``MCP_APP_NAMES``. Per-worker liveness, readiness, restart
+counts and cold-start times are served as JSON on ``SUPERVISOR_PORT`` at
+``/health`` and ``/ready``.
+
+API workers serve AppWorld's DB resets from a copy-on-write snapshot pool (see
+``db_snapshots``) unless ``APIS_DB_SNAPSHOTS=0``.
+"""
+
+import json
 import os
+import shutil
 import signal
+import socket
 import sys
 import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from importlib import import_module
-from inspect import signature
+from inspect import Parameter, signature
 from multiprocessing import Process
-
-from appworld import update_root
+from typing import Callable
 
 
 def _str_is_true(value: str | None) -> bool:
@@ -24,6 +46,18 @@ def _ensure_under(base_dir: str, path: str) -> bool:
 def _coerce_db_path_for_docker_mode(path: str | None, appworld_root: str) -> str | None:
     if path is None:
         return None
+    resolved = _resolve_db_path(path, appworld_root)
+    if resolved is None:
+        raise ValueError(
+            "DB path is outside allowed roots. Allowed: APPWORLD_ROOT/data and APPWORLD_ROOT/experiments/outputs"
+        )
+    return resolved
+
+
+# Evaluation loops reset and save DBs thousands of times per episode with a
+# handful of distinct paths, so remember each decision (None = not allowed)
+@lru_cache(maxsize=1024)
+def _resolve_db_path(path: str, appworld_root: str) -> str | None:
     if path.lower().startswith(":memory:"):
         return path
 
@@ -43,10 +77,48 @@ def _coerce_db_path_for_docker_mode(path: str | None, appworld_root: str) -> str
     resolved = os.path.abspath(path if os.path.isabs(path) else os.path.join(appworld_root, path))
     if _ensure_under(data_root, resolved) or _ensure_under(outputs_root, resolved):
         return resolved
-    raise ValueError(
-        "DB path is outside allowed roots. Allowed: APPWORLD_ROOT/data and APPWORLD_ROOT/experiments/outputs"
+    return None
+
+
+def _guard_save_local_dbs(
+    original_save_local_dbs: Callable[..., None],
+    appworld_root: str,
+    raise_http_exception: Callable[..., None] | None = None,
+) -> Callable[..., None]:
+    """Wrap ``save_local_dbs`` so both DB paths are coerced into the allowed roots."""
+    save_sig = signature(original_save_local_dbs)
+    # Map positional arguments by name directly; inspect's binding is only
+    # needed for signatures with *args/**kwargs or to report a bad call
+    param_names = tuple(save_sig.parameters)
+    simple = all(
+        param.kind in (Parameter.POSITIONAL_OR_KEYWORD, Parameter.KEYWORD_ONLY)
+        for param in save_sig.parameters.values()
     )
 
+    def guarded_save_local_dbs(*args, **kwargs) -> None:
+        try:
+            if simple and len(args) <= len(param_names) and not kwargs.keys() & param_names[: len(args)]:
+                arguments = dict(zip(param_names, args))
+                arguments.update(kwargs)
+            else:
+                arguments = dict(save_sig.bind_partial(*args, **kwargs).arguments)
+            arguments["to_db_home_path"] = _coerce_db_path_for_docker_mode(
+                arguments.get("to_db_home_path"),
+                appworld_root,
+            )
+            arguments["from_db_home_path"] = _coerce_db_path_for_docker_mode(
+                arguments.get("from_db_home_path"),
+                appworld_root,
+            )
+        except ValueError as error:
+            if callable(raise_http_exception):
+                raise_http_exception(str(error), status_code=422)
+            raise
+
+        original_save_local_dbs(**arguments)
+
+    return guarded_save_local_dbs
+
 
 def _enable_docker_mode_db_guard() -> None:
     appworld_root = os.path.abspath(os.environ.get("APPWORLD_ROOT", os.getcwd()))
@@ -128,41 +200,66 @@ def _enable_docker_mode_db_guard() -> None:
     setattr(api_module, "set_local_dbs", guarded_set_local_dbs)
 
     if callable(original_save_local_dbs):
-        save_sig = signature(original_save_local_dbs)
+        setattr(
+            api_module,
+            "save_local_dbs",
+            _guard_save_local_dbs(original_save_local_dbs, appworld_root, raise_http_exception),
+        )
 
-        def guarded_save_local_dbs(*args, **kwargs) -> None:
-            try:
-                bound = save_sig.bind_partial(*args, **kwargs)
-                arguments = dict(bound.arguments)
-                arguments["to_db_home_path"] = _coerce_db_path_for_docker_mode(
-                    arguments.get("to_db_home_path"),
-                    appworld_root,
-                )
-                arguments["from_db_home_path"] = _coerce_db_path_for_docker_mode(
-                    arguments.get("from_db_home_path"),
-                    appworld_root,
-                )
-            except ValueError as error:
-                if callable(raise_http_exception):
-                    raise_http_exception(str(error), status_code=422)
-                raise
-
-            original_save_local_dbs(**arguments)
-
-        setattr(api_module, "save_local_dbs", guarded_save_local_dbs)
-
-
-def run_apis() -> None:
+
+def _enable_db_snapshot_pool() -> None:
+    """Serve AppWorld's per-reset DB file copies from a copy-on-write snapshot pool."""
+    from db_snapshots import SnapshotPool, SnapshotShutil
+
+    try:
+        model_lib = import_module("appworld.apps.model_lib")
+    except ModuleNotFoundError:
+        print("APIS_DB_SNAPSHOTS enabled, but appworld.apps.model_lib was not found; skipping snapshot pool.")
+        return
+    if getattr(model_lib, "shutil", None) is not shutil:
+        print("APIS_DB_SNAPSHOTS enabled, but model_lib does not copy DBs with shutil; skipping snapshot pool.")
+        return
+
+    appworld_root = os.path.abspath(os.environ.get("APPWORLD_ROOT", os.getcwd()))
+    directory = os.environ.get(
+        "APIS_DB_SNAPSHOT_DIR", os.path.join(appworld_root, "experiments", "outputs", ".db_snapshots")
+    )
+    pool = SnapshotPool(directory, depth=int(os.environ.get("APIS_DB_SNAPSHOT_DEPTH", "2")))
+    # Task resets in "changes" format start from the base DBs, so keep those warm
+    try:
+        base_dbs = model_lib.get_db_home_path(storage_type="disk", type="base")
+        pool.prepare([entry.path for entry in os.scandir(base_dbs) if entry.name.endswith(".db")])
+    except (AttributeError, OSError) as error:
+        print(f"[db-snapshots] not pre-filling base DBs: {error}")
+    model_lib.shutil = SnapshotShutil(pool)
+
+
+def run_apis(port: int | None = None) -> None:
     from appworld.serve.apis import run
 
-    port = int(os.environ.get("APIS_PORT", "8000"))
+    if port is None:
+        port = int(os.environ.get("APIS_PORT", "8000"))
     docker_mode = _str_is_true(os.environ.get("APIS_DOCKER_MODE", "1"))
     if docker_mode:
         _enable_docker_mode_db_guard()
+    if _str_is_true(os.environ.get("APIS_DB_SNAPSHOTS", "1")):
+        _enable_db_snapshot_pool()
     run(port=port)
 
 
-def run_mcp() -> None:
+def _prewarm_apps(app_names: tuple[str, ...]) -> None:
+    """Import the API and model modules of ``app_names`` so first tool calls don't pay for it."""
+    start = time.perf_counter()
+    for app_name in app_names:
+        for kind in ("apis", "models"):
+            try:
+                import_module(f"appworld.apps.{app_name}.{kind}")
+            except ModuleNotFoundError as error:
+                print(f"[prewarm] cannot import {kind} of {app_name!r}: {error}")
+    print(f"[prewarm] imported {len(app_names)} apps in {time.perf_counter() - start:.2f}s")
+
+
+def run_mcp(port: int | None = None, remote_apis_url: str | None = None) -> None:
     from appworld.serve import _mcp
 
     docker_mode = _str_is_true(os.environ.get("APIS_DOCKER_MODE", "1"))
@@ -170,13 +267,16 @@ def run_mcp() -> None:
         _enable_docker_mode_db_guard()
 
     transport = "http"
-    port = int(os.environ.get("MCP_PORT", "8001"))
-    remote_apis_url = os.environ.get("REMOTE_APIS_URL", "http://localhost:8000")
+    if port is None:
+        port = int(os.environ.get("MCP_PORT", "8001"))
+    if remote_apis_url is None:
+        remote_apis_url = os.environ.get("REMOTE_APIS_URL", "http://localhost:8000")
     output_type = os.environ.get("MCP_OUTPUT_TYPE", "both")
     app_names_raw = os.environ.get("MCP_APP_NAMES")
     app_names = None
     if app_names_raw:
         app_names = tuple(name for name in app_names_raw.split(",") if name)
+        _prewarm_apps(app_names)
     _mcp.run(
         transport=transport,
         app_names=app_names,
@@ -186,30 +286,263 @@ def run_mcp() -> None:
     )
 
 
-def main() -> None:
-    appworld_root = os.environ.get("APPWORLD_ROOT")
-    if appworld_root:
-        update_root(appworld_root)
+def _port_open(port: int, timeout: float = 1.0) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout):
+            return True
+    except OSError:
+        return False
 
-    apis_process = Process(target=run_apis)
-    mcp_process = Process(target=run_mcp)
 
-    apis_process.start()
-    mcp_process.start()
+def _http_ok(port: int, path: str, timeout: float = 1.0) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+            return response.status < 400
+    except (OSError, ValueError):
+        return False
+
 
-    def shutdown() -> None:
+def _run_worker(target: Callable[..., None], *args: object) -> None:
+    # Forked children inherit the supervisor's shutdown handlers, which only set an
+    # event in the parent; restore the defaults so terminate() stops them at any time
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    target(*args)
+
+
+@dataclass
+class Worker:
+    """One supervised child process and its restart bookkeeping.
+
+    A worker is ready once ``ready_path`` answers over HTTP (or, without one, once
+    its port accepts connections); it is not started until ``depends_on`` is ready.
+    """
+
+    name: str
+    target: Callable[..., None]
+    args: tuple = ()
+    port: int | None = None
+    ready_path: str | None = None
+    depends_on: "Worker | None" = None
+    process: Process | None = None
+    restarts: int = 0
+    failures: int = 0
+    last_exit_code: int | None = None
+    started_at: float = 0.0
+    next_start_at: float = 0.0
+    healthy: bool = False
+    ready_after: float | None = None
+
+    def probe(self) -> bool:
+        if self.port is None:
+            return True
+        if self.ready_path is not None:
+            return _http_ok(self.port, self.ready_path)
+        return _port_open(self.port)
+
+    def status(self, now: float) -> dict:
+        alive = self.process is not None and self.process.is_alive()
+        return {
+            "name": self.name,
+            "port": self.port,
+            "pid": self.process.pid if alive else None,
+            "alive": alive,
+            "healthy": alive and self.healthy,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "uptime_seconds": round(now - self.started_at, 1) if alive else 0.0,
+            "ready_after_seconds": round(self.ready_after, 2) if alive and self.ready_after is not None else None,
+            "next_restart_in": round(max(0.0, self.next_start_at - now), 1) if not alive else None,
+        }
+
+
+class Supervisor:
+    """Keeps a set of workers running, restarting crashed ones with exponential backoff.
+
+    A worker that exits is restarted after ``backoff * 2**(failures - 1)`` seconds,
+    capped at ``max_backoff``; the failure count resets once a worker has stayed
+    up for ``stable_after`` seconds. Workers that are not ready yet are probed on
+    every poll so dependents start as soon as possible; ready ones only when
+    ``poll(probe=True)``.
+    """
+
+    def __init__(
+        self,
+        workers: list[Worker],
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        stable_after: float = 60.0,
+    ) -> None:
+        self.workers = workers
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self._lock = threading.Lock()
+        self._created_at = time.monotonic()
+        self._cold_start_logged = False
+
+    def _start(self, worker: Worker, now: float) -> None:
+        if worker.process is not None:
+            worker.restarts += 1
+        worker.process = Process(target=_run_worker, args=(worker.target, *worker.args), name=worker.name)
+        worker.process.start()
+        worker.started_at = now
+        worker.next_start_at = 0.0
+        worker.healthy = False
+        worker.ready_after = None
+        print(f"[supervisor] started {worker.name} (pid {worker.process.pid}, port {worker.port})")
+
+    def _schedule_restart(self, worker: Worker, now: float) -> None:
+        worker.last_exit_code = worker.process.exitcode
+        worker.healthy = False
+        if now - worker.started_at >= self.stable_after:
+            worker.failures = 0
+        worker.failures += 1
+        delay = min(self.max_backoff, self.backoff * 2 ** (worker.failures - 1))
+        worker.next_start_at = now + delay
+        print(f"[supervisor] {worker.name} exited with code {worker.last_exit_code}; restarting in {delay:.1f}s")
+
+    def poll(self, probe: bool = True) -> None:
+        """Reap exited workers, start those whose backoff has elapsed and probe live ones."""
+        now = time.monotonic()
+        to_probe = []
+        with self._lock:
+            for worker in self.workers:
+                process = worker.process
+                blocked = worker.depends_on is not None and not worker.depends_on.healthy
+                if process is None:
+                    if not blocked:
+                        self._start(worker, now)
+                elif process.is_alive():
+                    if probe or not worker.healthy:
+                        to_probe.append(worker)
+                elif not worker.next_start_at:
+                    self._schedule_restart(worker, now)
+                elif now >= worker.next_start_at and not blocked:
+                    self._start(worker, now)
+        # Probe outside the lock so a slow connect never stalls /health
+        for worker in to_probe:
+            healthy = worker.probe()
+            if healthy and worker.ready_after is None:
+                worker.ready_after = time.monotonic() - worker.started_at
+                print(f"[supervisor] {worker.name} ready after {worker.ready_after:.2f}s")
+            worker.healthy = healthy
+        if not self._cold_start_logged and all(w.healthy for w in self.workers):
+            self._cold_start_logged = True
+            print(f"[supervisor] cold start: all workers ready in {time.monotonic() - self._created_at:.2f}s")
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            workers = [worker.status(now) for worker in self.workers]
+        return {
+            "alive": all(w["alive"] for w in workers),
+            "ready": all(w["healthy"] for w in workers),
+            "workers": workers,
+        }
+
+    def stop(self) -> None:
         """Terminate child processes gracefully, then forcefully if needed."""
-        for process in (apis_process, mcp_process):
+        with self._lock:
+            processes = [w.process for w in self.workers if w.process is not None]
+        for process in processes:
             if process.is_alive():
                 process.terminate()
-        for process in (apis_process, mcp_process):
+        for process in processes:
             process.join(timeout=5)
             if process.is_alive():
                 process.kill()
                 process.join(timeout=2)
 
+
+def _serve_status(supervisor: Supervisor, port: int) -> ThreadingHTTPServer:
+    """Serve per-worker liveness, readiness and restart counts.
+
+    ``GET /health`` answers 503 while any worker is down and ``GET /ready`` while any
+    worker is not ready yet; both return the full status as JSON.
+    """
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            check = {"": "alive", "/health": "alive", "/ready": "ready"}.get(self.path.rstrip("/"))
+            if check is None:
+                self.send_error(404)
+                return
+            status = supervisor.status()
+            body = json.dumps(status).encode()
+            self.send_response(200 if status[check] else 503)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), StatusHandler)
+    threading.Thread(target=server.serve_forever, name="supervisor-status", daemon=True).start()
+    return server
+
+
+def build_workers() -> list[Worker]:
+    """Create the API and MCP workers described by the environment.
+
+    Worker ``i`` of each kind listens on its base port plus ``i * WORKER_PORT_STEP``
+    (MCP on 8001, 8011, 8021, ... by default); clients spread sessions across the MCP
+    ports. AppWorld keeps DB state in the API process, so rather than spreading
+    individual calls, each MCP worker is pinned to one API worker (round-robin), which
+    keeps a session's reads and writes on the same state. ``APIS_WORKERS`` therefore
+    defaults to ``MCP_WORKERS`` and is capped at it, as extra API workers would get no
+    traffic; fewer API workers are shared by several MCP workers, and ``0`` sends all
+    MCP workers to ``REMOTE_APIS_URL``.
+    """
+    apis_port = int(os.environ.get("APIS_PORT", "8000"))
+    mcp_port = int(os.environ.get("MCP_PORT", "8001"))
+    mcp_workers = int(os.environ.get("MCP_WORKERS", "1"))
+    apis_workers = int(os.environ.get("APIS_WORKERS", str(mcp_workers)))
+    port_step = int(os.environ.get("WORKER_PORT_STEP", "10"))
+    if apis_workers > mcp_workers:
+        print(f"[supervisor] APIS_WORKERS={apis_workers} > MCP_WORKERS={mcp_workers}; starting {mcp_workers}")
+        apis_workers = mcp_workers
+
+    api_workers = [
+        Worker(name=f"apis-{i}", target=run_apis, args=(port,), port=port, ready_path="/")
+        for i, port in enumerate(apis_port + i * port_step for i in range(apis_workers))
+    ]
+    workers = list(api_workers)
+    for i in range(mcp_workers):
+        port = mcp_port + i * port_step
+        api_worker = api_workers[i % len(api_workers)] if api_workers else None
+        if api_worker is not None:
+            remote_apis_url = f"http://localhost:{api_worker.port}"
+        else:
+            remote_apis_url = os.environ.get("REMOTE_APIS_URL", "http://localhost:8000")
+        # MCP tool calls go straight to the API worker, so hold MCP back until it answers
+        workers.append(
+            Worker(name=f"mcp-{i}", target=run_mcp, args=(port, remote_apis_url), port=port, depends_on=api_worker)
+        )
+    return workers
+
+
+def main() -> None:
+    from appworld import update_root
+
+    appworld_root = os.environ.get("APPWORLD_ROOT")
+    if appworld_root:
+        update_root(appworld_root)
+
+    supervisor = Supervisor(
+        build_workers(),
+        backoff=float(os.environ.get("RESTART_BACKOFF_SECONDS", "1")),
+        max_backoff=float(os.environ.get("RESTART_BACKOFF_MAX_SECONDS", "60")),
+        stable_after=float(os.environ.get("RESTART_STABLE_SECONDS", "60")),
+    )
+    health_interval = float(os.environ.get("HEALTH_CHECK_INTERVAL", "5"))
+    supervisor_port = int(os.environ.get("SUPERVISOR_PORT", "8002"))
+
     # Event is set by the signal handler to wake the loop immediately on
-    # SIGTERM/SIGINT; otherwise we poll child processes every 5 seconds.
+    # SIGTERM/SIGINT; otherwise we reap/restart children every second and
+    # probe their ports every HEALTH_CHECK_INTERVAL seconds.
     _shutdown_event = threading.Event()
 
     def _signal_handler(signum: int, _frame: object | None) -> None:
@@ -218,22 +551,22 @@ def main() -> None:
     signal.signal(signal.SIGTERM, _signal_handler)
     signal.signal(signal.SIGINT, _signal_handler)
 
-    exit_code = 0
+    status_server = _serve_status(supervisor, supervisor_port) if supervisor_port else None
+    last_probe = 0.0
     try:
-        while True:
-            if not apis_process.is_alive():
-                exit_code = apis_process.exitcode or 1
-                break
-            if not mcp_process.is_alive():
-                exit_code = mcp_process.exitcode or 1
-                break
-            _shutdown_event.wait(timeout=5)
-            if _shutdown_event.is_set():
-                break
+        while not _shutdown_event.is_set():
+            now = time.monotonic()
+            probe = now - last_probe >= health_interval
+            supervisor.poll(probe=probe)
+            if probe:
+                last_probe = now
+            _shutdown_event.wait(timeout=1)
     finally:
-        shutdown()
+        if status_server is not None:
+            status_server.shutdown()
+        supervisor.stop()
 
-    sys.exit(exit_code)
+    sys.exit(0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""Resize throughput and memory benchmark for image_tool's Pillow pipeline.
+
+Derives a set of sizes from one square source image, serially in-process and on a
+process pool, for each output format. Reports renders per second, latency, average
+output size and peak resident memory (of this process for the serial
+run, of the largest worker for the pool run). No network access is needed.
+
+    uv run bench_resize.py --source-size 1024 --renders 400 --workers 4
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from image_resize import FORMATS, render_image
+from PIL import Image
+
+
+def make_source(size: int) -> bytes:
+    """A photo-like square JPEG: a gradient with noise, so encoders cannot cheat on flat colour."""
+    noise = Image.effect_noise((size, size), 40).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    out = io.BytesIO()
+    Image.blend(gradient, noise, 0.35).save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+
+def _parse_sizes(spec: str) -> List[Tuple[int, int]]:
+    return [tuple(int(v) for v in item.lower().split("x")) for item in spec.split(",") if item.strip()]
+
+
+def _timed_render(args: tuple) -> Tuple[float, int]:
+    start = time.perf_counter()
+    out = render_image(*args)
+    return time.perf_counter() - start, len(out)
+
+
+def run_serial(jobs: List[tuple]) -> Dict[str, float]:
+    start = time.perf_counter()
+    results = [_timed_render(job) for job in jobs]
+    return _summary(results, time.perf_counter() - start)
+
+
+def run_pool(jobs: List[tuple], workers: int) -> Dict[str, float]:
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Warm-up: start every worker and import Pillow before timing
+        list(pool.map(_timed_render, jobs[:workers]))
+        start = time.perf_counter()
+        results = list(pool.map(_timed_render, jobs, chunksize=1))
+        elapsed = time.perf_counter() - start
+    return _summary(results, elapsed)
+
+
+def _summary(results: List[Tuple[float, int]], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(r[0] for r in results)
+    return {
+        "renders_per_s": len(results) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "avg_bytes": statistics.mean(r[1] for r in results),
+    }
+
+
+def _max_rss_mib(who: int) -> float:
+    # ru_maxrss is KiB on Linux; Pillow's pixel buffers live outside the Python allocator,
+    # so process RSS is the meaningful memory figure
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark image_tool resizing")
+    parser.add_argument("--source-size", type=int, default=1024, help="Edge of the square source image")
+    parser.add_argument("--source", default=None, help="Use this image file as the source instead of a synthetic one")
+    parser.add_argument("--sizes", default="64x64,200x300,400x400,800x600", help="Target sizes to derive")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Output formats to benchmark")
+    parser.add_argument("--quality", type=int, default=80, help="Encoder quality for jpeg/webp")
+    parser.add_argument("--renders", type=int, default=200, help="Renders per format and mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Process pool size")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    if args.source:
+        with open(args.source, "rb") as f:
+            source = f.read()
+    else:
+        source = make_source(args.source_size)
+    sizes = _parse_sizes(args.sizes)
+    print(f"source: {len(source)} bytes, sizes: {args.sizes}, renders: {args.renders}, workers: {args.workers}")
+
+    for fmt in args.formats.split(","):
+        jobs = [(source, *sizes[i % len(sizes)], fmt, args.quality) for i in range(args.renders)]
+        serial = run_serial(jobs)
+        serial_rss = _max_rss_mib(resource.RUSAGE_SELF)
+        pool = run_pool(jobs, args.workers)
+        pool_rss = _max_rss_mib(resource.RUSAGE_CHILDREN)
+        for label, result, rss in (("serial", serial, serial_rss), (f"pool x{args.workers}", pool, pool_rss)):
+            print(
+                f"{fmt:>5} {label:>8}: {result['renders_per_s']:8.1f} renders/s  "
+                f"p50={result['p50_ms']:6.1f}ms  p95={result['p95_ms']:6.1f}ms  "
+                f"avg_out={result['avg_bytes'] / 1024:7.1f}KiB  max_rss={rss:6.1f}MiB"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Pillow image resizing and re-encoding for image_tool.
+
+Kept in its own module, free of server side effects, so process pool workers
+(and the resize benchmark) can import it without starting an MCP server.
+"""
+
+import io
+import math
+
+# Output formats accepted by get_image: name -> (Pillow format, MIME type)
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+_ALIASES = {"jpg": "jpeg"}
+
+
+def normalize_format(fmt: str) -> str:
+    """Return the canonical format name for ``fmt`` or raise ValueError."""
+    name = _ALIASES.get(fmt.strip().lower(), fmt.strip().lower())
+    if name not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return name
+
+
+def _cover_box(src_w: int, src_h: int, width: int, height: int) -> tuple[float, float, float, float]:
+    """Centered crop of the source with the target's aspect ratio."""
+    scale = max(width / src_w, height / src_h)
+    crop_w, crop_h = width / scale, height / scale
+    left, top = (src_w - crop_w) / 2, (src_h - crop_h) / 2
+    return (left, top, left + crop_w, top + crop_h)
+
+
+def render_image(data: bytes, width: int, height: int, fmt: str, quality: int) -> bytes:
+    """Crop ``data`` to the target aspect ratio, resize it to ``width`` x ``height`` and encode it as ``fmt``."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as src:
+        # For JPEG sources, let the decoder downscale by a power of two while decoding,
+        # which is far cheaper than decoding at full size and resampling afterwards
+        scale = max(width / src.width, height / src.height)
+        src.draft("RGB", (math.ceil(src.width * scale), math.ceil(src.height * scale)))
+        box = _cover_box(src.width, src.height, width, height)
+        img = src.resize((width, height), Image.Resampling.LANCZOS, box=box, reducing_gap=3.0)
+
+    pil_format, _ = FORMATS[fmt]
+    if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    if pil_format == "PNG":
+        img.save(out, pil_format, optimize=True)
+    else:
+        img.save(out, pil_format, quality=quality)
+    return out.getvalue()
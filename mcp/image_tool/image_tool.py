@@ -1,12 +1,30 @@
 # Image MCP tool - returns images from picsum.photos.
 
 import base64
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
+import re
 import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
 
 import requests
 from fastmcp import FastMCP
+from fastmcp.resources import ResourceContent, ResourceResult
+from fastmcp.tools import ToolResult
+from image_resize import FORMATS, normalize_format, render_image
+from requests.adapters import HTTPAdapter
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from mcp.types import ImageContent, ResourceLink, TextContent
 
 mcp = FastMCP("Image")
 logger = logging.getLogger(__name__)
@@ -16,41 +34,395 @@ logging.basicConfig(
     format="%(levelname)s: %(message)s",
 )
 
+# Directory holding fetched images, one file per SHA-256 digest
+IMAGE_BLOB_DIR = os.getenv("IMAGE_BLOB_DIR", os.path.join(tempfile.gettempdir(), "image_tool_blobs"))
+# Externally reachable base URL of this server (e.g. http://image-tool:8000); used to build blob_url
+IMAGE_PUBLIC_URL = os.getenv("IMAGE_PUBLIC_URL", "")
+# Byte budgets for cached images: hot blobs stay in memory, the rest spill to IMAGE_BLOB_DIR
+IMAGE_CACHE_MEMORY_BYTES = int(os.getenv("IMAGE_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+IMAGE_CACHE_DISK_BYTES = int(os.getenv("IMAGE_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+# How long a width x height request keeps returning the same cached image (0 disables reuse)
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "3600"))
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "1024"))
+IMAGE_HTTP_POOL_SIZE = int(os.getenv("IMAGE_HTTP_POOL_SIZE", "10"))
+# Edge of the square source image smaller sizes are derived from locally (0 fetches every size upstream)
+IMAGE_SOURCE_SIZE = int(os.getenv("IMAGE_SOURCE_SIZE", "1024"))
+IMAGE_RESIZE_WORKERS = int(os.getenv("IMAGE_RESIZE_WORKERS", "2"))
+IMAGE_DEFAULT_QUALITY = int(os.getenv("IMAGE_DEFAULT_QUALITY", "80"))
+# Comma-separated WIDTHxHEIGHT sizes fetched at startup, e.g. "200x300,400x400"
+IMAGE_PREWARM_SIZES = os.getenv("IMAGE_PREWARM_SIZES", "")
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_MAGIC = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def _sniff_mime(data: bytes) -> str:
+    """Detect the image type from its leading bytes."""
+    for magic, mime in _MAGIC:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class BlobCache:
+    """Content-addressed LRU store of image bytes.
+
+    Blobs are keyed by the SHA-256 of their content, so identical images are stored
+    once and a digest always refers to the same bytes. The most recently used blobs
+    are held in memory up to ``max_memory`` bytes; older ones spill to files under
+    ``directory``, which is itself trimmed to ``max_disk`` bytes.
+    """
+
+    def __init__(self, directory: str, max_memory: int, max_disk: int):
+        self.directory = directory
+        self._max_memory = max_memory
+        self._max_disk = max_disk
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_disk_index()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _load_disk_index(self) -> None:
+        """Pick up blobs spilled by a previous run, least recently used first."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if _DIGEST_RE.match(name):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name, stat.st_size))
+        for _, digest, size in sorted(entries):
+            self._disk[digest] = size
+            self._disk_bytes += size
+        self._trim_disk()
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+            else:
+                self._memory[digest] = data
+                self._memory_bytes += len(data)
+                self._trim_memory()
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        if not _DIGEST_RE.match(digest):
+            return None
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return data
+            if digest not in self._disk:
+                return None
+            try:
+                with open(self._path(digest), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self._disk_bytes -= self._disk.pop(digest)
+                return None
+            # Promote back to memory; the disk copy stays so a later eviction needs no write
+            self._disk.move_to_end(digest)
+            self._memory[digest] = data
+            self._memory_bytes += len(data)
+            self._trim_memory()
+            return data
+
+    def _trim_memory(self) -> None:
+        while self._memory and self._memory_bytes > self._max_memory:
+            digest, data = self._memory.popitem(last=False)
+            self._memory_bytes -= len(data)
+            if digest not in self._disk:
+                self._spill(digest, data)
+        self._trim_disk()
+
+    def _spill(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary name first so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._disk[digest] = len(data)
+        self._disk_bytes += len(data)
+
+    def _trim_disk(self) -> None:
+        while self._disk and self._disk_bytes > self._max_disk:
+            digest, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[Any, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Any, value: str) -> None:
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+def _build_session() -> requests.Session:
+    """Create an HTTP session whose connection pool is shared by all image fetches."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=IMAGE_HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Module-level session — reused across tool calls for connection pooling
+_session = _build_session()
+_blobs = BlobCache(IMAGE_BLOB_DIR, IMAGE_CACHE_MEMORY_BYTES, IMAGE_CACHE_DISK_BYTES)
+# width x height -> digest of the image last served for that size
+_requests_cache = TTLCache(IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL)
+# (source digest, width, height, format, quality) -> digest of the rendered image
+_derived_cache = TTLCache(IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL)
+
+_resize_pool: Optional[ProcessPoolExecutor] = None
+_resize_pool_lock = threading.Lock()
+
+
+def _get_resize_pool() -> ProcessPoolExecutor:
+    """Start the resize worker processes on first use."""
+    global _resize_pool
+    with _resize_pool_lock:
+        if _resize_pool is None:
+            # spawn rather than fork: the server process already runs threads
+            _resize_pool = ProcessPoolExecutor(
+                max_workers=IMAGE_RESIZE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _resize_pool
+
+
+def _render(data: bytes, w: int, h: int, fmt: str, quality: int) -> tuple[str, bytes]:
+    """Resize/encode ``data`` in the worker pool and store the result; returns ``(digest, bytes)``."""
+    rendered = _get_resize_pool().submit(render_image, data, w, h, fmt, quality).result()
+    return _blobs.put(rendered), rendered
+
+
+def _cached_render(src_digest: str, src: bytes, w: int, h: int, fmt: str, quality: int) -> tuple[str, bytes]:
+    """Return ``(digest, bytes)`` of ``src`` rendered at ``w`` x ``h`` in ``fmt``, rendering only on a cache miss."""
+    key = (src_digest, w, h, fmt, quality)
+    digest = _derived_cache.get(key)
+    data = _blobs.get(digest) if digest is not None else None
+    if data is None:
+        digest, data = _render(src, w, h, fmt, quality)
+        _derived_cache.put(key, digest)
+    return digest, data
+
+
+def _derivable(w: int, h: int) -> bool:
+    return 0 < IMAGE_SOURCE_SIZE and w <= IMAGE_SOURCE_SIZE and h <= IMAGE_SOURCE_SIZE
+
+
+def _derive_image(w: int, h: int, fmt: str, quality: int) -> tuple[str, bytes, bool, str]:
+    """Return ``(digest, bytes, cached, source_url)`` for a size cut from the shared square source image."""
+    size = IMAGE_SOURCE_SIZE
+    src_digest, src, cached = _fetch_image(size, size)
+    digest, data = _cached_render(src_digest, src, w, h, fmt, quality)
+    return digest, data, cached, f"https://picsum.photos/{size}/{size}"
+
+
+def _fetch_image(w: int, h: int) -> tuple[str, bytes, bool]:
+    """Return ``(digest, bytes, cached)`` for a size, downloading only on a cache miss."""
+    digest = _requests_cache.get((w, h))
+    if digest is not None:
+        data = _blobs.get(digest)
+        if data is not None:
+            return digest, data, True
+    resp = _session.get(f"https://picsum.photos/{w}/{h}", timeout=10)
+    resp.raise_for_status()
+    data = resp.content
+    digest = _blobs.put(data)
+    _requests_cache.put((w, h), digest)
+    return digest, data, False
+
+
+def _parse_sizes(spec: str) -> list[tuple[int, int]]:
+    """Parse ``"200x300,400x400"`` into size tuples, skipping malformed entries."""
+    sizes = []
+    for item in spec.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        try:
+            w, h = (int(v) for v in item.split("x"))
+        except ValueError:
+            logger.warning("ignoring invalid IMAGE_PREWARM_SIZES entry %r", item)
+            continue
+        if w > 0 and h > 0:
+            sizes.append((w, h))
+    return sizes
+
+
+def prewarm(sizes: list[tuple[int, int]]) -> None:
+    """Fetch each size once so the first requests for popular sizes are served locally."""
+    for w, h in sizes:
+        try:
+            if _derivable(w, h):
+                _derive_image(w, h, "jpeg", IMAGE_DEFAULT_QUALITY)
+            else:
+                _fetch_image(w, h)
+            logger.info(f"Pre-warmed {w}x{h} image")
+        except requests.RequestException as e:
+            logger.warning("failed to pre-warm %dx%d image: %s", w, h, e)
+
+
+def _blob_uri(digest: str) -> str:
+    return f"image://blobs/{digest}"
+
+
+def _result(payload: dict, *extra) -> ToolResult:
+    """Tool result whose text part is the JSON payload, followed by any non-text content."""
+    return ToolResult(content=[TextContent(type="text", text=json.dumps(payload)), *extra], structured_content=payload)
+
 
 @mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
-def get_image(width: int, height: int) -> dict:
-    """Fetch a random image from picsum.photos API and return it as base64-encoded data.
+def get_image(
+    width: int, height: int, inline: bool = False, format: Optional[str] = None, quality: Optional[int] = None
+) -> ToolResult:
+    """Fetch an image of the given size from picsum.photos and return a reference to it.
+
+    Images are cached: within IMAGE_CACHE_TTL seconds the same size returns the same
+    image, cut from the same cached source image for sizes up to IMAGE_SOURCE_SIZE.
+
+    The image bytes are stored on the server and returned by reference, so they are
+    not sent through the tool result unless `inline` is set.
 
     Parameters:
     - width: image width in pixels (must be positive integer)
     - height: image height in pixels (must be positive integer)
+    - inline: also return the image itself as MCP image content (default false)
+    - format: output format, one of "webp", "jpeg" or "png" (default jpeg); webp is usually smallest
+    - quality: encoder quality for jpeg and webp, 1-100 (default 80)
 
     Returns a dict containing:
-    - image_base64: base64-encoded image data (string)
+    - uri: MCP resource URI for the image bytes (string)
+    - blob_path: HTTP path on this server serving the raw image bytes (string)
+    - blob_url: absolute URL for blob_path, when the server's public URL is configured (string)
+    - mime_type: image MIME type (string)
+    - size: image size in bytes (integer)
+    - sha256: content digest of the image (string)
     - url: the source URL of the image (string)
+    - cached: whether the image was served from the local cache (boolean)
 
     Example return value:
-    {"image_base64": "/9j/4AAQSkZJRg...", "url": "https://picsum.photos/200/300"}
+    {"uri": "image://blobs/9f86d0...", "blob_path": "/blobs/9f86d0...", "mime_type": "image/jpeg",
+     "size": 10240, "sha256": "9f86d0...", "url": "https://picsum.photos/200/300", "cached": false}
     """
     try:
         h = int(height)
         w = int(width)
         if h <= 0 or w <= 0:
-            return {"error": "height and width must be positive integers"}
+            return _result({"error": "height and width must be positive integers"})
     except (ValueError, TypeError):
-        return {"error": "height and width must be integers"}
+        return _result({"error": "height and width must be integers"})
+    try:
+        fmt = normalize_format(format) if format else None
+        q = IMAGE_DEFAULT_QUALITY if quality is None else int(quality)
+        if not 1 <= q <= 100:
+            return _result({"error": "quality must be between 1 and 100"})
+    except (ValueError, TypeError) as e:
+        return _result({"error": str(e)})
     url = f"https://picsum.photos/{w}/{h}"
 
     try:
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        img_b = resp.content
-        img_b64 = base64.b64encode(img_b).decode("ascii")
-        logger.info(f"Successfully fetched and encoded {w}x{h} image, base64 length={len(img_b64)}")
-        return {"image_base64": img_b64, "url": url}
+        if _derivable(w, h):
+            # One large source serves every smaller size; no upstream request per size
+            digest, img_b, cached, url = _derive_image(w, h, fmt or "jpeg", q)
+        else:
+            digest, img_b, cached = _fetch_image(w, h)
+            if fmt and FORMATS[fmt][1] != _sniff_mime(img_b):
+                digest, img_b = _cached_render(digest, img_b, w, h, fmt, q)
     except requests.RequestException as e:
         logger.error("failed to fetch image: %s", e)
-        return {"error": str(e), "url": url}
+        return _result({"error": str(e), "url": url})
+
+    mime_type = _sniff_mime(img_b)
+    payload = {
+        "uri": _blob_uri(digest),
+        "blob_path": f"/blobs/{digest}",
+        "mime_type": mime_type,
+        "size": len(img_b),
+        "sha256": digest,
+        "url": url,
+        "cached": cached,
+    }
+    if IMAGE_PUBLIC_URL:
+        payload["blob_url"] = IMAGE_PUBLIC_URL.rstrip("/") + payload["blob_path"]
+    logger.info(f"Served {w}x{h} image ({'cache' if cached else 'upstream'}), {len(img_b)} bytes, sha256={digest}")
+
+    if inline:
+        content = ImageContent(type="image", data=base64.b64encode(img_b).decode("ascii"), mimeType=mime_type)
+    else:
+        content = ResourceLink(
+            type="resource_link", uri=payload["uri"], name=f"image-{w}x{h}", mimeType=mime_type, size=len(img_b)
+        )
+    return _result(payload, content)
+
+
+@mcp.resource("image://blobs/{digest}", annotations={"readOnlyHint": True, "idempotentHint": True})
+def read_image_blob(digest: str) -> ResourceResult:
+    """Raw bytes of an image previously returned by get_image, addressed by its SHA-256 digest."""
+    data = _blobs.get(digest)
+    if data is None:
+        raise ValueError(f"Unknown image blob {digest}")
+    return ResourceResult([ResourceContent(data, mime_type=_sniff_mime(data))])
+
+
+@mcp.custom_route("/blobs/{digest}", methods=["GET"])
+async def serve_image_blob(request: Request) -> Response:
+    """Serve blob bytes over plain HTTP so callers can download an image without going through JSON-RPC."""
+    digest = request.path_params["digest"]
+    data = _blobs.get(digest)
+    if data is None:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    etag = f'"{digest}"'
+    # Blobs are content-addressed and never change, so they can be cached indefinitely
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=_sniff_mime(data), headers=headers)
 
 
 # host can be specified with HOST env variable
@@ -60,6 +432,9 @@ def run_server():
     transport = os.getenv("MCP_TRANSPORT", "streamable-http")
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
+    sizes = _parse_sizes(IMAGE_PREWARM_SIZES)
+    if sizes:
+        threading.Thread(target=prewarm, args=(sizes,), name="image-prewarm", daemon=True).start()
     mcp.run(transport=transport, host=host, port=port)
 
 
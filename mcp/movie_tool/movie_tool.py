@@ -1,11 +1,17 @@
 import json
 import logging
 import os
+import re
 import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import requests
 from fastmcp import FastMCP
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -16,10 +22,148 @@ logging.basicConfig(
 logging.getLogger("urllib3").setLevel(logging.INFO)
 
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")
+OMDB_BASE_URL = "http://www.omdbapi.com/"
+
+# Movie records rarely change, so lookups are cached per normalized title
+MOVIE_CACHE_TTL = float(os.getenv("MOVIE_CACHE_TTL", "86400"))
+MOVIE_CACHE_SIZE = int(os.getenv("MOVIE_CACHE_SIZE", "512"))
+MOVIE_BATCH_WORKERS = int(os.getenv("MOVIE_BATCH_WORKERS", "8"))
+MOVIE_MAX_BATCH_TITLES = int(os.getenv("MOVIE_MAX_BATCH_TITLES", "20"))
+
+# Search results and the local fuzzy title index built from past responses
+MOVIE_SEARCH_CACHE_TTL = float(os.getenv("MOVIE_SEARCH_CACHE_TTL", "3600"))
+MOVIE_INDEX_SIZE = int(os.getenv("MOVIE_INDEX_SIZE", "10000"))
+MOVIE_FUZZY_THRESHOLD = float(os.getenv("MOVIE_FUZZY_THRESHOLD", "0.7"))
 
 mcp = FastMCP("Movie Review")
 
 
+def _build_session() -> requests.Session:
+    """Create an HTTP session whose connection pool is large enough for concurrent batch lookups."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MOVIE_BATCH_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Module-level session — reused across tool calls for connection pooling
+_session = _build_session()
+_executor = ThreadPoolExecutor(max_workers=MOVIE_BATCH_WORKERS, thread_name_prefix="omdb")
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        if self._ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+def _normalize_title(title: str) -> str:
+    return " ".join(title.lower().split())
+
+
+def _trigrams(title: str) -> set[str]:
+    """Character trigrams of a title, ignoring case, punctuation and extra whitespace."""
+    words = re.sub(r"[^\w\s]", "", title.lower()).split()
+    text = "  " + " ".join(words) + " "
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+_SEQUEL_NUMERALS = frozenset({"ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x"})
+
+
+def _sequel_markers(title: str) -> set[str]:
+    """Numbers and roman numerals in a title, which tell sequels, remakes and years apart."""
+    words = re.sub(r"[^\w\s]", "", title.lower()).split()
+    return {word for word in words if word.isdigit() or word in _SEQUEL_NUMERALS}
+
+
+class TitleIndex:
+    """Bounded trigram index of movie titles seen in past OMDb responses.
+
+    Resolves misspelled or partial titles locally by Jaccard similarity of
+    their trigram sets, so near-miss lookups need no extra upstream search.
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[dict[str, str], set[str]]] = OrderedDict()
+        self._postings: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, record: dict[str, Any]) -> None:
+        """Index a search hit or full record; needs at least ``imdbID`` and ``Title``."""
+        imdb_id, title = record.get("imdbID"), record.get("Title")
+        if not imdb_id or not title:
+            return
+        entry = {k: record[k] for k in ("Title", "Year", "imdbID", "Type") if k in record}
+        grams = _trigrams(title)
+        with self._lock:
+            if imdb_id in self._entries:
+                self._entries.move_to_end(imdb_id)
+                return
+            self._entries[imdb_id] = (entry, grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(imdb_id)
+            while len(self._entries) > self._maxsize:
+                old_id, (_, old_grams) = self._entries.popitem(last=False)
+                for gram in old_grams:
+                    ids = self._postings.get(gram)
+                    if ids is not None:
+                        ids.discard(old_id)
+                        if not ids:
+                            del self._postings[gram]
+
+    def search(self, query: str, limit: int = 5, threshold: float = 0.0) -> list[tuple[float, dict[str, str]]]:
+        """Return up to ``limit`` (score, entry) pairs scoring at least ``threshold``, best first."""
+        grams = _trigrams(query)
+        with self._lock:
+            shared: dict[str, int] = {}
+            for gram in grams:
+                for imdb_id in self._postings.get(gram, ()):
+                    shared[imdb_id] = shared.get(imdb_id, 0) + 1
+            scored = []
+            for imdb_id, count in shared.items():
+                entry, entry_grams = self._entries[imdb_id]
+                score = count / (len(grams) + len(entry_grams) - count)
+                if score >= threshold:
+                    scored.append((score, entry))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+
+_movie_cache = TTLCache(MOVIE_CACHE_SIZE, MOVIE_CACHE_TTL)
+_search_cache = TTLCache(MOVIE_CACHE_SIZE, MOVIE_SEARCH_CACHE_TTL)
+_title_index = TitleIndex(MOVIE_INDEX_SIZE)
+
+
 def _fetch_json(params: dict[str, Any], timeout: int = 10) -> dict[str, Any]:
     """
     Helper to perform a GET request and parse the JSON response from the OMDb API.
@@ -33,9 +177,8 @@ def _fetch_json(params: dict[str, Any], timeout: int = 10) -> dict[str, Any]:
     """
     if OMDB_API_KEY is None:
         return {"Error": "OMDB_API_KEY is not configured"}
-    base_url = f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&"
     try:
-        resp = requests.get(base_url, params=params, timeout=timeout)
+        resp = _session.get(OMDB_BASE_URL, params={"apikey": OMDB_API_KEY, **params}, timeout=timeout)
         resp.raise_for_status()
         return resp.json()
     except Exception as e:
@@ -43,40 +186,152 @@ def _fetch_json(params: dict[str, Any], timeout: int = 10) -> dict[str, Any]:
         return {"Error": "Error fetching data"}
 
 
-@mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
-def get_full_plot(movie_title: str) -> str:
-    """Get full plot summary of a movie from OMDb API."""
+def _get_movie(movie_title: str) -> dict[str, Any]:
+    """Return the full-plot OMDb record for a title, fetching it at most once per cache TTL.
+
+    A single full-plot response carries every field either tool needs, so both
+    get_full_plot and get_movie_details are served from the same cached record.
+    If OMDb has no exact match, the title is resolved through the local title
+    index instead, skipping titles with different numbers (sequels, remakes).
+    Such a record is marked with "resolved_from" (the requested title) and
+    "matched_title", and is cached with that marker under the near-miss title.
+    """
+    key = _normalize_title(movie_title)
+    data = _movie_cache.get(key)
+    if data is not None:
+        logger.debug("Movie cache hit for %s", key)
+        return data
 
     logger.debug("Requesting OMDb with t=%s plot=%s", movie_title, "full")
-    params = {"t": movie_title, "plot": "full"}
-    data = _fetch_json(params=params)
+    data = _fetch_json(params={"t": movie_title, "plot": "full"})
+    resolved = False
+    if data.get("Response") == "False":
+        markers = _sequel_markers(movie_title)
+        matches = _title_index.search(movie_title, limit=5, threshold=MOVIE_FUZZY_THRESHOLD)
+        entry = next((entry for _, entry in matches if _sequel_markers(entry["Title"]) == markers), None)
+        if entry is not None:
+            logger.debug("Resolved %s to %s (%s) via title index", movie_title, entry["Title"], entry["imdbID"])
+            data = _movie_cache.get(_normalize_title(entry["Title"])) or _fetch_json(
+                params={"i": entry["imdbID"], "plot": "full"}
+            )
+            resolved = True
+    if data.get("Response") == "True":
+        title_key = _normalize_title(data.get("Title", movie_title))
+        _movie_cache.put(title_key, data)
+        if resolved and title_key != key:
+            data = {**data, "resolved_from": movie_title, "matched_title": data.get("Title")}
+        _movie_cache.put(key, data)
+        _title_index.add(data)
+    return data
+
+
+def _movie_details(data: dict[str, Any]) -> dict[str, Any] | str:
+    """Project an OMDb record to the details returned to agents, or an error message."""
+    if "Error" in data:
+        return data["Error"]
+    if data.get("Response") == "True":
+        return {k: v for k, v in data.items() if k not in ("Poster", "Response")}
+    return "Movie not found"
+
 
+def _full_plot(data: dict[str, Any]) -> str:
+    """The plot of an OMDb record, naming the matched movie if a close title was substituted."""
     if "Error" in data:
         return data["Error"]
 
     if "Response" in data and data["Response"] == "True" and "Plot" in data:
+        if "resolved_from" in data:
+            return (
+                f"No exact match for {data['resolved_from']!r}; showing the plot of "
+                f"{data['matched_title']!r} ({data.get('Year', 'unknown year')}).\n\n{data['Plot']}"
+            )
         return data["Plot"]
 
     return "Movie not found"
 
 
+@mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
+def get_full_plot(movie_title: str) -> str:
+    """Get full plot summary of a movie from OMDb API."""
+
+    return _full_plot(_get_movie(movie_title))
+
+
 @mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
 def get_movie_details(movie_title: str) -> str:
-    """Get full details (awards, actors, short plot, and ratings, etc.) of a movie from OMDb API."""
+    """Get full details (awards, actors, plot, and ratings, etc.) of a movie from OMDb API.
 
-    logger.debug("Requesting OMDb with t=%s plot=%s", movie_title, "short")
-    params = {"t": movie_title, "plot": "short"}
-    data = _fetch_json(params=params)
+    If OMDb has no exact match and a close title from earlier lookups is used
+    instead, the details include "resolved_from" and "matched_title".
+    """
 
-    if "Error" in data:
-        return data["Error"]
+    details = _movie_details(_get_movie(movie_title))
+    if isinstance(details, str):
+        return details
+    return json.dumps(details)
 
-    if "Response" in data and data["Response"] == "True":
-        data.pop("Poster", None)
-        data.pop("Response", None)
-        return json.dumps(data)
 
-    return "Movie not found"
+@mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
+def get_movies(titles: list[str]) -> str:
+    """Get full details of several movies at once from OMDb API.
+
+    Returns a JSON object mapping each title to its details, or to an object
+    with an "error" key if that movie could not be found.
+    """
+    names = list(dict.fromkeys(t.strip() for t in titles if isinstance(t, str) and t.strip()))
+    if not names:
+        return json.dumps({"error": "titles must contain at least one movie title"})
+    if len(names) > MOVIE_MAX_BATCH_TITLES:
+        return json.dumps({"error": f"Too many titles (max {MOVIE_MAX_BATCH_TITLES})"})
+
+    results = {}
+    for title, data in zip(names, _executor.map(_get_movie, names)):
+        details = _movie_details(data)
+        results[title] = {"error": details} if isinstance(details, str) else details
+    return json.dumps(results)
+
+
+@mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
+def search_movies(query: str, year: str | None = None, page: int = 1) -> str:
+    """Search OMDb for movies and series whose titles match a query, e.g. to disambiguate a title.
+
+    Args:
+        query: Full or partial title to search for.
+        year: Optional release year to narrow the results.
+        page: Result page (10 results per page).
+
+    Returns a JSON object with a "results" list of {Title, Year, imdbID, Type}.
+    If OMDb has no match (for example because of a typo), close matches from
+    previously seen titles are returned with "source": "local_index".
+    """
+    if not isinstance(query, str) or not query.strip():
+        return json.dumps({"error": "query must not be empty"})
+    key = (_normalize_title(query), year or "", page)
+    found = _search_cache.get(key)
+    if found is None:
+        params = {"s": query, "page": page}
+        if year:
+            params["y"] = year
+        logger.debug("Requesting OMDb with s=%s y=%s page=%s", query, year, page)
+        data = _fetch_json(params=params)
+        if data.get("Response") == "True":
+            results = [{k: item.get(k) for k in ("Title", "Year", "imdbID", "Type")} for item in data.get("Search", [])]
+            for item in results:
+                _title_index.add(item)
+            found = {"total": data.get("totalResults"), "results": results}
+            _search_cache.put(key, found)
+    else:
+        logger.debug("Search cache hit for %s", key)
+
+    if found is not None:
+        return json.dumps({"query": query, "source": "omdb", **found})
+
+    matches = _title_index.search(query, limit=10, threshold=MOVIE_FUZZY_THRESHOLD / 2)
+    if matches:
+        return json.dumps({"query": query, "source": "local_index", "results": [entry for _, entry in matches]})
+    if "Error" in data:
+        return json.dumps({"query": query, "error": data["Error"], "results": []})
+    return json.dumps({"query": query, "results": []})
 
 
 # host can be specified with HOST env variable
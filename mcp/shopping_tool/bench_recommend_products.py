@@ -0,0 +1,133 @@
+"""End-to-end MCP throughput benchmark for `recommend_products`.
+
+Starts the offline SerpAPI stub, then runs shopping_agent.py once per cache mode
+(SERPAPI_CACHE_TTL=0 and SERPAPI_CACHE_TTL>0) and drives `recommend_products`
+over streamable HTTP with concurrent MCP clients. No SerpAPI credits are used.
+
+    uv run bench_recommend_products.py --requests 500 --concurrency 16 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from fastmcp import Client
+from serpapi_stub import StubConfig, create_server
+
+_HERE = Path(__file__).resolve().parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f"MCP server did not start listening on port {port}")
+
+
+async def _drive(url: str, total: int, concurrency: int, distinct: int) -> List[float]:
+    """Issue `total` tool calls with `concurrency` parallel clients; return per-call latencies."""
+    queries = [f"benchmark product {i}" for i in range(distinct)]
+    latencies: List[float] = []
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        async with Client(url) as client:
+            for i in counter:
+                start = time.perf_counter()
+                await client.call_tool("recommend_products", {"query": queries[i % distinct], "max_results": 10})
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def run_mode(cache_ttl: float, stub_url: str, args: argparse.Namespace) -> Dict[str, float]:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        HOST="127.0.0.1",
+        PORT=str(port),
+        SERPAPI_API_KEY="stub",
+        SERPAPI_BASE_URL=stub_url,
+        SERPAPI_CACHE_TTL=str(cache_ttl),
+        LOG_LEVEL="WARNING",
+    )
+    server = subprocess.Popen(
+        [sys.executable, str(_HERE / "shopping_agent.py")],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_port(port)
+        url = f"http://127.0.0.1:{port}/mcp"
+        # Warm-up: establish the server session machinery before timing
+        asyncio.run(_drive(url, args.concurrency, args.concurrency, 1))
+        start = time.perf_counter()
+        latencies = asyncio.run(_drive(url, args.requests, args.concurrency, args.distinct_queries))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    latencies.sort()
+    return {
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark recommend_products with caching on and off")
+    parser.add_argument("--requests", type=int, default=200, help="Tool calls per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent MCP clients")
+    parser.add_argument("--distinct-queries", type=int, default=20, help="Size of the rotating query set")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Simulated SerpAPI latency")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="Simulated SerpAPI latency jitter")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="SERPAPI_CACHE_TTL for the cached run")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    stub_config = StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    stub = create_server("127.0.0.1", _free_port(), stub_config)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    try:
+        for label, ttl in (("cache off", 0.0), ("cache on", args.cache_ttl)):
+            before = stub_config.request_count
+            result = run_mode(ttl, stub_url, args)
+            upstream = stub_config.request_count - before
+            print(
+                f"{label:>9}: {result['throughput_rps']:8.1f} req/s  "
+                f"p50={result['p50_ms']:7.1f}ms  p95={result['p95_ms']:7.1f}ms  "
+                f"upstream_calls={upstream}"
+            )
+    finally:
+        stub.shutdown()
+        stub.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Offline SerpAPI stand-in for local development and load testing of the Shopping Agent.
+
+Serves `GET /search` with the same JSON shape SerpAPI returns for the `google_shopping`
+(`shopping_results`) and `google` (`organic_results`) engines, either from a recorded
+response file or synthesized from the query. Point the MCP server at it with:
+
+    python serpapi_stub.py --port 9100 --latency-ms 300
+    SERPAPI_BASE_URL=http://localhost:9100 SERPAPI_API_KEY=dummy python shopping_agent.py
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+_ADJECTIVES = ["Classic", "Premium", "Compact", "Deluxe", "Eco", "Pro", "Lightweight", "Essential"]
+_SOURCES = ["Amazon.com", "Walmart", "Target", "Best Buy", "Etsy", "eBay"]
+
+
+def _rng_for(query: str, engine: str) -> random.Random:
+    """Seed a RNG from the request so the same query always gets the same synthetic results."""
+    digest = hashlib.sha256(f"{engine}:{query}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def synthetic_shopping_results(query: str, count: int) -> List[Dict[str, Any]]:
+    """Generate `shopping_results` entries shaped like SerpAPI's google_shopping engine."""
+    rng = _rng_for(query, "google_shopping")
+    results = []
+    for position in range(1, count + 1):
+        title = f"{rng.choice(_ADJECTIVES)} {query.strip().title()} #{position}"
+        price = round(rng.uniform(5, 200), 2)
+        results.append(
+            {
+                "position": position,
+                "title": title,
+                "price": f"${price:.2f}",
+                "extracted_price": price,
+                "snippet": f"Stub listing for '{query}'.",
+                "link": f"https://shop.example.com/p/{position}",
+                "thumbnail": f"https://shop.example.com/img/{position}.jpg",
+                "source": rng.choice(_SOURCES),
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "reviews": rng.randint(0, 5000),
+            }
+        )
+    return results
+
+
+def synthetic_organic_results(query: str, count: int) -> List[Dict[str, Any]]:
+    """Generate `organic_results` entries shaped like SerpAPI's google engine."""
+    rng = _rng_for(query, "google")
+    return [
+        {
+            "position": position,
+            "title": f"{query.strip().title()} - {rng.choice(_ADJECTIVES)} guide #{position}",
+            "link": f"https://www.example.com/{position}",
+            "displayed_link": "www.example.com",
+            "snippet": f"Stub organic result for '{query}'.",
+        }
+        for position in range(1, count + 1)
+    ]
+
+
+class StubConfig:
+    """Runtime knobs shared by all request handler threads."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        results: int = 20,
+        error_rate: float = 0.0,
+        fixture: Optional[Dict[str, Any]] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.results = results
+        self.error_rate = error_rate
+        self.fixture = fixture
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def next_request(self) -> int:
+        with self._lock:
+            self.request_count += 1
+            return self.request_count
+
+    def build_response(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Return the response body for a search, preferring recorded data over synthetic data."""
+        query = params.get("q", "")
+        engine = params.get("engine", "google")
+        count = min(int(params.get("num") or self.results), self.results)
+
+        if self.fixture is not None:
+            body = dict(self.fixture)
+        elif engine == "google_shopping":
+            body = {"shopping_results": synthetic_shopping_results(query, count)}
+        else:
+            body = {
+                "organic_results": synthetic_organic_results(query, count),
+                "shopping_results": synthetic_shopping_results(query, min(count, 5)),
+            }
+        body["search_metadata"] = {"status": "Success", "engine": engine}
+        body["search_parameters"] = {"q": query, "engine": engine}
+        return body
+
+
+class SerpApiStubHandler(BaseHTTPRequestHandler):
+    """Request handler answering SerpAPI `/search` calls from the server's StubConfig."""
+
+    server_version = "SerpApiStub/1.0"
+
+    def do_GET(self) -> None:
+        config: StubConfig = self.server.config  # type: ignore[attr-defined]
+        url = urlparse(self.path)
+        if url.path == "/healthz":
+            self._send_json(200, {"status": "ok", "requests": config.request_count})
+            return
+        if url.path not in ("/search", "/search.json"):
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        config.next_request()
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        if not params.get("api_key"):
+            self._send_json(
+                401, {"error": "Invalid API key. Your API key should be here: https://serpapi.com/manage-api-key"}
+            )
+            return
+        if config.error_rate and random.random() < config.error_rate:
+            self._send_json(503, {"error": "Stub injected failure"})
+            return
+        self._send_json(200, config.build_response(params))
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(host: str, port: int, config: StubConfig) -> ThreadingHTTPServer:
+    """Create (but do not start) a threaded stub server bound to host:port."""
+    server = ThreadingHTTPServer((host, port), SerpApiStubHandler)
+    server.daemon_threads = True
+    server.config = config  # type: ignore[attr-defined]
+    return server
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline SerpAPI stub server")
+    parser.add_argument("--host", default=os.getenv("SERPAPI_STUB_HOST", "127.0.0.1"), help="Host interface to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERPAPI_STUB_PORT", "9100")), help="Port to bind")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay added to every search")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform random delay added on top of latency")
+    parser.add_argument("--results", type=int, default=20, help="Maximum synthetic results per search")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of searches answered with HTTP 503")
+    parser.add_argument(
+        "--fixture",
+        default=None,
+        help="JSON file with a recorded SerpAPI response to serve for every search",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        stream=sys.stdout,
+        format="%(levelname)s: %(message)s",
+    )
+    args = _parse_args()
+
+    fixture = None
+    if args.fixture:
+        with open(args.fixture, encoding="utf-8") as f:
+            fixture = json.load(f)
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        results=args.results,
+        error_rate=args.error_rate,
+        fixture=fixture,
+    )
+    server = create_server(args.host, args.port, config)
+    logger.info("SerpAPI stub listening on http://%s:%s (latency=%sms)", args.host, args.port, args.latency_ms)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
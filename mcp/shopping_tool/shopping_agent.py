@@ -5,7 +5,10 @@ import json
 import logging
 import os
 import sys
-from typing import Any, Dict, Optional, Union
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
 
 from fastmcp import FastMCP
 from serpapi import GoogleSearch
@@ -24,6 +27,48 @@ def _env_flag(name: str, default: str = "false") -> bool:
 # Environment variable for API key
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
+# SerpAPI endpoint; point at serpapi_stub.py for offline development and load testing
+SERPAPI_BASE_URL = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com").rstrip("/")
+
+# In-process cache of SerpAPI responses (SERPAPI_CACHE_TTL=0 disables it)
+SERPAPI_CACHE_TTL = float(os.getenv("SERPAPI_CACHE_TTL", "300"))
+SERPAPI_CACHE_SIZE = int(os.getenv("SERPAPI_CACHE_SIZE", "256"))
+
+_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(params: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Build a cache key from search params, ignoring the API key and query case/spacing."""
+    return tuple(
+        sorted((k, " ".join(str(v).lower().split()) if k == "q" else v) for k, v in params.items() if k != "api_key")
+    )
+
+
+def _serpapi_search(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a SerpAPI search against SERPAPI_BASE_URL, serving repeated queries from the cache."""
+    key = _cache_key(params)
+    if SERPAPI_CACHE_TTL > 0:
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                _cache.move_to_end(key)
+                logger.debug("SerpAPI cache hit for %s", params.get("q"))
+                return entry[1]
+
+    search = GoogleSearch(dict(params))
+    search.BACKEND = SERPAPI_BASE_URL
+    results = search.get_dict()
+
+    if SERPAPI_CACHE_TTL > 0 and "error" not in results:
+        with _cache_lock:
+            _cache[key] = (time.monotonic() + SERPAPI_CACHE_TTL, results)
+            _cache.move_to_end(key)
+            while len(_cache) > SERPAPI_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return results
+
+
 # Initialize FastMCP
 mcp = FastMCP("Shopping Agent")
 
@@ -90,8 +135,7 @@ def recommend_products(query: str, max_results: int = 10) -> str:
         }
 
         logger.debug(f"Searching with params: {json.dumps(params, default=str)}")
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        results = _serpapi_search(params)
 
         if "error" in results:
             return json.dumps({"error": results["error"]})
@@ -171,8 +215,7 @@ def search_products(query: str, max_results: int = 10) -> str:
             "num": max_results,
         }
 
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        results = _serpapi_search(params)
 
         if "error" in results:
             return json.dumps({"error": results["error"]})
@@ -301,7 +344,7 @@ def main() -> int:
         logger.error("Please configure the SERPAPI_API_KEY environment variable before running the server")
         return 1
 
-    logger.info("Starting Shopping Agent MCP Server with SerpAPI")
+    logger.info("Starting Shopping Agent MCP Server with SerpAPI at %s", SERPAPI_BASE_URL)
     logger.info("Note: This server provides search results. The calling agent provides reasoning.")
 
     run_server(
@@ -1,11 +1,20 @@
+import json
 import logging
 import os
+import re
+import sqlite3
+import ssl
 import sys
-from typing import Any, Dict, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 from fastmcp import FastMCP
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_handlers import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -17,14 +26,72 @@ logging.basicConfig(
 # setup slack client
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 ADMIN_SLACK_BOT_TOKEN = os.getenv("ADMIN_SLACK_BOT_TOKEN")
+SLACK_RATE_LIMIT_RETRIES = int(os.getenv("SLACK_RATE_LIMIT_RETRIES", "2"))
+SLACK_CHANNEL_CACHE_TTL = float(os.getenv("SLACK_CHANNEL_CACHE_TTL", "300"))
+SLACK_USER_CACHE_TTL = float(os.getenv("SLACK_USER_CACHE_TTL", "3600"))
+# Page size for conversations.list; Slack caps it at 1000
+SLACK_CHANNEL_PAGE_SIZE = 1000
+# Page size for conversations.history and users.list; Slack recommends no more than 200
+SLACK_HISTORY_PAGE_SIZE = 200
+SLACK_USER_PAGE_SIZE = 200
+SLACK_HISTORY_CONCURRENCY = int(os.getenv("SLACK_HISTORY_CONCURRENCY", "4"))
+SLACK_MAX_HISTORY_CHANNELS = int(os.getenv("SLACK_MAX_HISTORY_CHANNELS", "20"))
+# SQLite file holding synced channel history; empty keeps the store in memory
+SLACK_MESSAGE_STORE = os.getenv("SLACK_MESSAGE_STORE", "")
+# Newest messages kept per channel in the store; older ones are pruned after each sync (0 keeps all)
+SLACK_STORE_MAX_MESSAGES = int(os.getenv("SLACK_STORE_MAX_MESSAGES", "5000"))
+# Most new messages fetched by one delta sync; beyond this the channel is re-synced from scratch
+SLACK_SYNC_MAX_DELTA = int(os.getenv("SLACK_SYNC_MAX_DELTA", "1000"))
+# Messages per channel kept synced before search_messages searches it
+SLACK_SEARCH_SYNC_LIMIT = int(os.getenv("SLACK_SEARCH_SYNC_LIMIT", "200"))
+# Workspace URL used to build permalinks; taken from auth.test when unset
+SLACK_WORKSPACE_URL = os.getenv("SLACK_WORKSPACE_URL", "")
+
+# Requests per minute allowed for each Web API method, following Slack's rate limit
+# tiers (https://api.slack.com/apis/rate-limits). Override with SLACK_RATE_LIMIT_<METHOD>,
+# e.g. SLACK_RATE_LIMIT_CONVERSATIONS_HISTORY=1 for apps on the reduced non-Marketplace limits.
+_TIER_LIMITS = {
+    "conversations.list": 20,  # Tier 2
+    "conversations.history": 50,  # Tier 3
+    "conversations.replies": 50,  # Tier 3
+    "users.list": 20,  # Tier 2
+}
+
+# Slack errors after which a cached client must re-authenticate before it is used again
+_REAUTH_ERRORS = {"invalid_auth", "token_revoked", "token_expired", "not_authed", "account_inactive"}
+
+# One authenticated client per token, reused across tool calls. slack_sdk's sync
+# transport opens a connection per request, so clients share one SSL context
+# (certificates are loaded once) and the same retry handlers.
+_ssl_context = ssl.create_default_context()
+_clients: Dict[str, WebClient] = {}
+# Workspace URL reported by auth.test for each token, used to build permalinks
+_team_urls: Dict[str, str] = {}
+_clients_lock = threading.Lock()
+
+T = TypeVar("T")
 
 
 def slack_client_from_bot_token(bot_token):
+    with _clients_lock:
+        cached = _clients.get(bot_token)
+    if cached is not None:
+        return cached
     try:
-        slack_client = WebClient(token=bot_token)
+        slack_client = WebClient(
+            token=bot_token,
+            ssl=_ssl_context,
+            retry_handlers=[
+                ConnectionErrorRetryHandler(),
+                RateLimitErrorRetryHandler(max_retry_count=SLACK_RATE_LIMIT_RETRIES),
+            ],
+        )
         auth_test = slack_client.auth_test()
         logger.info(f"Successfully authenticated as bot '{auth_test['user']}' in workspace '{auth_test['team']}'.")
-        return slack_client
+        with _clients_lock:
+            if auth_test.get("url"):
+                _team_urls[bot_token] = auth_test["url"]
+            return _clients.setdefault(bot_token, slack_client)
     except SlackApiError as e:
         # Handle authentication errors, such as an invalid token
         logger.error(f"Error authenticating with Slack: {e.response['error']}")
@@ -34,79 +101,680 @@ def slack_client_from_bot_token(bot_token):
         return None
 
 
+def _active_token() -> Optional[str]:
+    return ADMIN_SLACK_BOT_TOKEN or SLACK_BOT_TOKEN
+
+
 def get_slack_client():
-    if ADMIN_SLACK_BOT_TOKEN:
-        return slack_client_from_bot_token(ADMIN_SLACK_BOT_TOKEN)
-    return slack_client_from_bot_token(SLACK_BOT_TOKEN)
+    return slack_client_from_bot_token(_active_token())
 
 
-# Create FastMCP app
-mcp = FastMCP("Slack")
+def _invalidate_slack_client(bot_token: Optional[str]) -> None:
+    with _clients_lock:
+        _clients.pop(bot_token, None)
 
 
-@mcp.tool()
-def get_channels() -> List[Dict[str, Any]]:
+class SlackClientUnavailableError(RuntimeError):
+    """Raised when no authenticated Slack client can be created for the configured token."""
+
+
+def _require_client(token: Optional[str]) -> WebClient:
+    slack_client = slack_client_from_bot_token(token)
+    if slack_client is None:
+        raise SlackClientUnavailableError("Could not start slack client. Check the configured bot token")
+    return slack_client
+
+
+def call_slack(call: Callable[[WebClient], T]) -> T:
+    """Run ``call`` with the cached client for the active token.
+
+    If Slack rejects the token (e.g. ``invalid_auth`` or ``token_revoked``), the
+    cached client is dropped and the call is retried once with a freshly
+    authenticated client.
     """
-    Lists all public and private slack channels you have access to.
+    token = _active_token()
+    try:
+        return call(_require_client(token))
+    except SlackApiError as e:
+        if e.response.get("error") not in _REAUTH_ERRORS:
+            raise
+        logger.warning(f"Slack rejected cached client ({e.response['error']}); re-authenticating")
+        _invalidate_slack_client(token)
+    return call(_require_client(token))
+
+
+class TokenBucket:
+    """Blocking token bucket that paces calls to a single Slack method across threads.
+
+    ``rate_per_minute`` tokens are added evenly over each minute, up to ``burst``.
+    ``pause`` stops handing out tokens until a server-provided ``Retry-After`` has
+    passed, so every worker backs off together after a 429.
     """
-    logger.debug("Called get_channels tool")
 
-    slack_client = get_slack_client()
-    if slack_client is None:
-        return [{"error": "Could not start slack client. Check the configured bot token"}]
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, rate_per_minute / 10.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def _rate_limiter(method: str) -> TokenBucket:
+    """Return the shared token bucket for a Slack Web API method."""
+    with _buckets_lock:
+        bucket = _buckets.get(method)
+        if bucket is None:
+            env_name = "SLACK_RATE_LIMIT_" + method.replace(".", "_").upper()
+            default = _TIER_LIMITS.get(method, 20)
+            rate = float(os.getenv(env_name, default))
+            if rate <= 0:
+                logger.warning(f"{env_name}={rate:g} is not a positive rate; using {default} per minute")
+                rate = default
+            bucket = _buckets[method] = TokenBucket(rate)
+        return bucket
+
 
+def _retry_after(e: SlackApiError) -> Optional[float]:
+    """Seconds Slack asked us to wait, if ``e`` is a rate-limit error."""
+    if e.response.get("error") != "ratelimited" and getattr(e.response, "status_code", None) != 429:
+        return None
+    headers = getattr(e.response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _fetch_history(channel_id: str, limit: int, oldest: Optional[str], latest: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch up to ``limit`` messages from one channel, following cursors and pacing each page.
+
+    ``oldest`` and ``latest`` bound the window exclusively, as in conversations.history.
+    """
+    bucket = _rate_limiter("conversations.history")
+    messages: List[Dict[str, Any]] = []
+    cursor = None
+    has_more = False
+    while len(messages) < limit:
+        bucket.acquire()
+        page_size = min(SLACK_HISTORY_PAGE_SIZE, limit - len(messages))
+        try:
+            response = call_slack(
+                lambda slack_client: slack_client.conversations_history(
+                    channel=channel_id, limit=page_size, cursor=cursor, oldest=oldest, latest=latest
+                )
+            )
+        except SlackApiError as e:
+            # The client's retry handler already waited out Retry-After; if Slack is
+            # still limiting us, hold every other worker off for the same period.
+            retry_after = _retry_after(e)
+            if retry_after is not None:
+                bucket.pause(retry_after)
+            raise
+        messages.extend(response.get("messages", []))
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        has_more = bool(response.get("has_more")) and bool(cursor)
+        if not has_more:
+            break
+    return {"channel_id": channel_id, "messages": messages, "has_more": has_more}
+
+
+def _history_result(channel_id: str, limit: int, oldest: Optional[str]) -> Dict[str, Any]:
+    """Per-channel result for get_channels_history: messages, or the error that stopped the fetch."""
     try:
-        # Call the conversations_list method to get public channels
-        result = slack_client.conversations_list(types="public_channel")
-        channels = result.get("channels", [])
-        # We'll just return some key information for each channel
-        logger.debug(f"Successful get_channels call: {channels}")
+        return _fetch_history(channel_id, limit, oldest)
+    except SlackApiError as e:
+        logger.error(f"Slack API Error for channel {channel_id}: {e.response['error']}")
+        return {"channel_id": channel_id, "error": f"Slack API Error: {e.response['error']}"}
+    except SlackClientUnavailableError as e:
+        return {"channel_id": channel_id, "error": str(e)}
+    except Exception as e:
+        logger.exception(f"Unexpected error fetching channel {channel_id}: {e}")
+        return {"channel_id": channel_id, "error": f"An unexpected error occurred: {e}"}
+
+
+class MessageStore:
+    """SQLite store of channel history, synced incrementally from Slack.
+
+    For each channel the store keeps a contiguous run of messages from ``oldest_ts``
+    up to the high-water mark ``latest_ts``. ``complete`` records that the run
+    reaches the start of the channel, so no further backfill is possible. Only the
+    newest ``max_messages`` of each channel are kept (0 keeps all); pruning older
+    ones moves ``oldest_ts`` up and clears ``complete``.
+
+    Message text is indexed with FTS5 (an external-content table kept current by
+    triggers), so every sync updates the index incrementally. SQLite builds without
+    FTS5 fall back to a substring scan.
+    """
+
+    def __init__(self, path: str = "", max_messages: int = 0):
+        self.max_messages = max_messages
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                channel_id TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                user TEXT,
+                text TEXT,
+                thread_ts TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (channel_id, ts)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                channel_id TEXT PRIMARY KEY,
+                latest_ts TEXT,
+                oldest_ts TEXT,
+                complete INTEGER NOT NULL DEFAULT 0,
+                synced_at REAL NOT NULL
+            );
+            """
+        )
+        self.fts = self._create_index()
+        self._db.commit()
+
+    def _create_index(self) -> bool:
+        exists = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+        try:
+            self._db.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    text, content='messages', content_rowid='rowid', tokenize='porter unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                    INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+                    INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+                    INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                    INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+                END;
+                """
+            )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable ({e}); search_messages will scan message text")
+            return False
+        if not exists:
+            # Index messages stored before the index existed
+            self._db.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+        return True
+
+    def state(self, channel_id: str) -> Optional[Tuple[Optional[str], Optional[str], bool]]:
+        """Return ``(latest_ts, oldest_ts, complete)`` for a synced channel, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT latest_ts, oldest_ts, complete FROM sync_state WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return None if row is None else (row[0], row[1], bool(row[2]))
+
+    def save(
+        self,
+        channel_id: str,
+        messages: List[Dict[str, Any]],
+        latest_ts: Optional[str],
+        oldest_ts: Optional[str],
+        complete: bool,
+        replace: bool = False,
+    ) -> None:
+        """Upsert ``messages`` and move the channel's sync window; ``replace`` drops what was stored before."""
+        rows = [
+            (channel_id, m["ts"], m.get("user"), m.get("text"), m.get("thread_ts"), json.dumps(m))
+            for m in messages
+            if m.get("ts")
+        ]
+        with self._lock, self._db:
+            if replace:
+                self._db.execute("DELETE FROM messages WHERE channel_id = ?", (channel_id,))
+            # An upsert (rather than INSERT OR REPLACE) so the update trigger keeps the index in step
+            self._db.executemany(
+                """
+                INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (channel_id, ts) DO UPDATE SET
+                    user = excluded.user, text = excluded.text, thread_ts = excluded.thread_ts, data = excluded.data
+                """,
+                rows,
+            )
+            if self.max_messages > 0:
+                pruned = self._db.execute(
+                    """
+                    DELETE FROM messages WHERE channel_id = ? AND ts < (
+                        SELECT ts FROM messages WHERE channel_id = ? ORDER BY ts DESC LIMIT 1 OFFSET ?
+                    )
+                    """,
+                    (channel_id, channel_id, self.max_messages - 1),
+                ).rowcount
+                if pruned:
+                    oldest_ts = self._db.execute(
+                        "SELECT MIN(ts) FROM messages WHERE channel_id = ?", (channel_id,)
+                    ).fetchone()[0]
+                    complete = False
+            self._db.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                (channel_id, latest_ts, oldest_ts, int(complete), time.time()),
+            )
+
+    def count(self, channel_id: str) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages WHERE channel_id = ?", (channel_id,)).fetchone()[0]
+
+    def recent(self, channel_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Return the newest ``limit`` stored messages, newest first like conversations.history."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM messages WHERE channel_id = ? ORDER BY ts DESC LIMIT ?", (channel_id, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search(
+        self, query: str, channel_ids: Optional[List[str]], since: Optional[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` stored messages matching ``query``, best match first.
+
+        Any query word may match (ranked by BM25); ``since`` is an exclusive Slack ts.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        filters, params = [], []
+        if channel_ids:
+            filters.append(f"m.channel_id IN ({', '.join('?' * len(channel_ids))})")
+            params.extend(channel_ids)
+        if since:
+            filters.append("m.ts > ?")
+            params.append(since)
+        where = "".join(f" AND {f}" for f in filters)
+
+        if self.fts:
+            sql = (
+                "SELECT m.channel_id, m.ts, m.user, m.thread_ts,"
+                " snippet(messages_fts, 0, '**', '**', '…', 16) AS snippet"
+                " FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid"
+                f" WHERE messages_fts MATCH ?{where} ORDER BY rank LIMIT ?"
+            )
+            params = [" OR ".join(f'"{w}"' for w in words), *params, limit]
+        else:
+            like = " OR ".join("m.text LIKE ?" for _ in words)
+            sql = (
+                "SELECT m.channel_id, m.ts, m.user, m.thread_ts, m.text AS snippet FROM messages m"
+                f" WHERE ({like}){where} ORDER BY m.ts DESC LIMIT ?"
+            )
+            params = [*(f"%{w}%" for w in words), *params, limit]
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
         return [
+            {"channel_id": row[0], "ts": row[1], "user": row[2], "thread_ts": row[3], "snippet": row[4]} for row in rows
+        ]
+
+
+_message_store = MessageStore(SLACK_MESSAGE_STORE, SLACK_STORE_MAX_MESSAGES)
+_sync_locks: Dict[str, threading.Lock] = {}
+_sync_locks_lock = threading.Lock()
+
+
+def _max_ts(messages: List[Dict[str, Any]], default: Optional[str]) -> Optional[str]:
+    return max((m["ts"] for m in messages if m.get("ts")), default=default)
+
+
+def _min_ts(messages: List[Dict[str, Any]], default: Optional[str]) -> Optional[str]:
+    return min((m["ts"] for m in messages if m.get("ts")), default=default)
+
+
+def _sync_channel(channel_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Bring the local store up to date for ``channel_id`` and return its newest ``limit`` messages.
+
+    A channel seen before costs one delta request (``oldest=`` the high-water mark);
+    older messages are only fetched when the store holds fewer than ``limit``.
+    """
+    with _sync_locks_lock:
+        lock = _sync_locks.setdefault(channel_id, threading.Lock())
+    with lock:
+        state = _message_store.state(channel_id)
+        if state is None:
+            page = _fetch_history(channel_id, limit, None)
+            messages = page["messages"]
+            _message_store.save(
+                channel_id, messages, _max_ts(messages, None), _min_ts(messages, None), complete=not page["has_more"]
+            )
+        else:
+            latest_ts, oldest_ts, complete = state
+            page = _fetch_history(channel_id, SLACK_SYNC_MAX_DELTA, latest_ts)
+            messages = page["messages"]
+            if page["has_more"]:
+                # Too many new messages to bridge the gap: keep only the newest run
+                logger.debug(f"Delta for channel {channel_id} exceeded {SLACK_SYNC_MAX_DELTA} messages; re-syncing")
+                _message_store.save(
+                    channel_id, messages, _max_ts(messages, None), _min_ts(messages, None), False, replace=True
+                )
+            else:
+                _message_store.save(
+                    channel_id, messages, _max_ts(messages, latest_ts), oldest_ts or _min_ts(messages, None), complete
+                )
+
+        latest_ts, oldest_ts, complete = _message_store.state(channel_id)
+        if _message_store.max_messages > 0:
+            # Backfilling past the cap would only be pruned again
+            limit = min(limit, _message_store.max_messages)
+        missing = limit - _message_store.count(channel_id)
+        if missing > 0 and not complete and oldest_ts is not None:
+            page = _fetch_history(channel_id, missing, None, latest=oldest_ts)
+            older = page["messages"]
+            _message_store.save(channel_id, older, latest_ts, _min_ts(older, oldest_ts), complete=not page["has_more"])
+        return _message_store.recent(channel_id, limit)
+
+
+def _slack_ts(value: Optional[str]) -> Optional[str]:
+    """Normalize a Slack ts or an ISO 8601 date/time to Slack's ``seconds.micros`` form.
+
+    Dates and times without an offset are read as UTC, not the server's local time.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        seconds = parsed.timestamp()
+    return f"{seconds:.6f}"
+
+
+def _permalink(channel_id: str, ts: str, thread_ts: Optional[str]) -> Optional[str]:
+    """Build a message permalink locally instead of calling chat.getPermalink for each result."""
+    base = SLACK_WORKSPACE_URL or _team_urls.get(_active_token() or "", "")
+    if not base:
+        return None
+    link = f"{base.rstrip('/')}/archives/{channel_id}/p{ts.replace('.', '')}"
+    if thread_ts and thread_ts != ts:
+        link += f"?thread_ts={thread_ts}&cid={channel_id}"
+    return link
+
+
+# Channel directory per token: (expires_at, channels). Listing a large workspace
+# takes several paginated requests, so it is reused until the TTL runs out.
+_channel_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+_channel_cache_lock = threading.Lock()
+
+
+def _list_all_channels(slack_client: WebClient) -> List[Dict[str, Any]]:
+    """Walk every conversations.list page and return the trimmed channel records."""
+    channels: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        result = slack_client.conversations_list(types="public_channel", limit=SLACK_CHANNEL_PAGE_SIZE, cursor=cursor)
+        channels.extend(
             {
                 "id": c["id"],
                 "name": c["name"],
                 "purpose": c.get("purpose", {}).get("value", ""),
             }
-            for c in channels
-        ]
+            for c in result.get("channels", [])
+        )
+        cursor = (result.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return channels
+
+
+def _channel_directory() -> List[Dict[str, Any]]:
+    """Return the cached channel directory for the active token, refreshing it after the TTL."""
+    token = _active_token()
+    now = time.monotonic()
+    with _channel_cache_lock:
+        cached = _channel_cache.get(token)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    channels = call_slack(_list_all_channels)
+    logger.debug(f"Loaded channel directory with {len(channels)} channels")
+    if SLACK_CHANNEL_CACHE_TTL > 0:
+        with _channel_cache_lock:
+            _channel_cache[token] = (now + SLACK_CHANNEL_CACHE_TTL, channels)
+    return channels
+
+
+# User ID -> display name per token: (expires_at, names)
+_user_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_user_cache_lock = threading.Lock()
+
+
+def _list_all_users(slack_client: WebClient) -> Dict[str, str]:
+    """Walk every users.list page and map each user ID to the name people see in Slack."""
+    bucket = _rate_limiter("users.list")
+    names: Dict[str, str] = {}
+    cursor = None
+    while True:
+        bucket.acquire()
+        result = slack_client.users_list(limit=SLACK_USER_PAGE_SIZE, cursor=cursor)
+        for member in result.get("members", []):
+            profile = member.get("profile") or {}
+            names[member["id"]] = profile.get("display_name") or member.get("real_name") or member.get("name", "")
+        cursor = (result.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return names
+
+
+def _user_directory() -> Dict[str, str]:
+    """Return the cached user directory for the active token.
+
+    Names are a convenience, so a failed listing (e.g. a token without ``users:read``)
+    yields an empty directory and messages keep their raw user IDs.
+    """
+    token = _active_token()
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(token)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    try:
+        names = call_slack(_list_all_users)
+    except SlackApiError as e:
+        logger.warning(f"Could not load Slack user directory: {e.response['error']}")
+        return {}
+    logger.debug(f"Loaded user directory with {len(names)} users")
+    if SLACK_USER_CACHE_TTL > 0:
+        with _user_cache_lock:
+            _user_cache[token] = (now + SLACK_USER_CACHE_TTL, names)
+    return names
+
+
+_MENTION_RE = re.compile(r"<@([UW][A-Z0-9]+)(?:\|[^>]*)?>")
+
+
+def _trim_messages(
+    messages: List[Dict[str, Any]], users: Dict[str, str], max_chars: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Project messages onto ts/user/text/thread_ts/reply_count, resolving user IDs to names.
+
+    With ``max_chars``, message text is included newest first until the budget is
+    spent; the message that crosses it is cut short and marked ``truncated``.
+    """
+    trimmed = []
+    remaining = max_chars
+    for m in messages:
+        if remaining is not None and remaining <= 0:
+            break
+        user_id = m.get("user")
+        text = _MENTION_RE.sub(lambda match: "@" + users.get(match.group(1), match.group(1)), m.get("text", ""))
+        entry: Dict[str, Any] = {
+            "ts": m.get("ts"),
+            "user": users.get(user_id, user_id) if user_id else m.get("username"),
+        }
+        if remaining is not None and len(text) > remaining:
+            text = text[:remaining]
+            entry["truncated"] = True
+        entry["text"] = text
+        if m.get("thread_ts"):
+            entry["thread_ts"] = m["thread_ts"]
+        if m.get("reply_count"):
+            entry["reply_count"] = m["reply_count"]
+        trimmed.append(entry)
+        if remaining is not None:
+            remaining -= len(text)
+    return trimmed
+
+
+def _filter_channels(
+    channels: List[Dict[str, Any]], name_contains: Optional[str], purpose_contains: Optional[str]
+) -> List[Dict[str, Any]]:
+    """Case-insensitive substring filter on channel name and purpose; returns copies of the matches."""
+    name_filter = (name_contains or "").lower()
+    purpose_filter = (purpose_contains or "").lower()
+    return [dict(c) for c in channels if name_filter in c["name"].lower() and purpose_filter in c["purpose"].lower()]
+
+
+# Create FastMCP app
+mcp = FastMCP("Slack")
+
+
+@mcp.tool()
+def get_channels(name_contains: Optional[str] = None, purpose_contains: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Lists all public and private slack channels you have access to.
+
+    Args:
+        name_contains: Only return channels whose name contains this text (case-insensitive).
+        purpose_contains: Only return channels whose purpose contains this text (case-insensitive).
+    """
+    logger.debug(f"Called get_channels tool: name_contains={name_contains!r} purpose_contains={purpose_contains!r}")
+
+    try:
+        channels = _channel_directory()
+        matches = _filter_channels(channels, name_contains, purpose_contains)
+        logger.debug(f"Successful get_channels call: {len(matches)} of {len(channels)} channels")
+        return matches
     except SlackApiError as e:
         # Handle API errors and return a descriptive message
         logger.error(f"Slack API Error: {e.response['error']}")
         return [{"error": f"Slack API Error: {e.response['error']}"}]
+    except SlackClientUnavailableError as e:
+        return [{"error": str(e)}]
     except Exception as e:
         logger.exception(f"Unexpected error occurred: {e}")
         return [{"error": f"An unexpected error occurred: {e}"}]
 
 
 @mcp.tool()
-def get_channel_history(channel_id: str, limit: int = 20) -> List:
+def get_channel_history(
+    channel_id: str, limit: int = 20, trimmed: bool = False, max_chars: Optional[int] = None
+) -> List:
     """
     Fetches the most recent messages from a specific Slack channel ID.
 
     Args:
         channel_id: The ID of the channel (e.g., 'C024BE91L').
         limit: The maximum number of messages to return (default is 20).
+        trimmed: Return only ts, user name, text, thread_ts and reply_count for each message
+            instead of the full Slack payload. Recommended when only the conversation matters.
+        max_chars: With trimmed, stop adding message text once this many characters are returned.
     """
     logger.debug(f"Called get_channel_history tool: {channel_id}")
 
-    slack_client = get_slack_client()
-    if slack_client is None:
-        return [{"error": "Could not start slack client. Check the configured bot token"}]
-
     try:
-        # Call the Slack API to list conversations the bot is part of.
-        response = slack_client.conversations_history(channel=channel_id, limit=limit)
-        logger.debug(f"Successful get_channel_history call: {response}")
-        return response.get(
-            "messages",
-        )
+        # Only messages newer than the last sync are requested from Slack
+        messages = _sync_channel(channel_id, limit)
+        logger.debug(f"Successful get_channel_history call: {len(messages)} messages")
+        if trimmed:
+            return _trim_messages(messages, _user_directory(), max_chars)
+        return messages
     except SlackApiError as e:
         # Handle API errors and return a descriptive message
         return [{"error": f"Slack API Error: {e.response['error']}"}]
+    except SlackClientUnavailableError as e:
+        return [{"error": str(e)}]
     except Exception as e:
         return [{"error": f"An unexpected error occurred: {e}"}]
 
 
+@mcp.tool()
+def get_channels_history(channel_ids: List[str], limit: int = 20, oldest: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fetches recent messages from several Slack channels at once.
+
+    Channels are read concurrently while staying within Slack's rate limits. A failure
+    in one channel does not affect the others; failed channels carry an "error" entry
+    and are listed under "failed".
+
+    Args:
+        channel_ids: The IDs of the channels to read (e.g., ['C024BE91L', 'C0123']).
+        limit: The maximum number of messages to return per channel (default is 20).
+        oldest: Only return messages after this Slack timestamp (e.g., '1712345678.000100').
+    """
+    logger.debug(f"Called get_channels_history tool: {channel_ids}")
+
+    channel_ids = list(dict.fromkeys(channel_ids))
+    if len(channel_ids) > SLACK_MAX_HISTORY_CHANNELS:
+        return {"error": f"Too many channels requested; the maximum is {SLACK_MAX_HISTORY_CHANNELS}"}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SLACK_HISTORY_CONCURRENCY, len(channel_ids) or 1))) as pool:
+        results = list(pool.map(lambda channel_id: _history_result(channel_id, limit, oldest), channel_ids))
+    return {"channels": results, "failed": [r["channel_id"] for r in results if "error" in r]}
+
+
+@mcp.tool()
+def search_messages(
+    query: str, channels: Optional[List[str]] = None, since: Optional[str] = None, limit: int = 20
+) -> List[Dict[str, Any]]:
+    """
+    Searches Slack messages for a topic and returns the best matching snippets with permalinks.
+
+    Prefer this over reading whole channel histories when looking for discussions about something.
+
+    Args:
+        query: Words to search for (e.g., 'deploy failure rollback').
+        channels: Channel IDs to search (e.g., ['C024BE91L']). These channels are synced first.
+            When omitted, every channel synced so far is searched.
+        since: Only match messages after this Slack timestamp or ISO 8601 date (e.g., '2024-05-01', read as UTC).
+        limit: The maximum number of results to return (default is 20).
+    """
+    logger.debug(f"Called search_messages tool: {query!r} in {channels}")
+
+    try:
+        since_ts = _slack_ts(since)
+    except ValueError:
+        return [{"error": f"Invalid since value {since!r}; use a Slack timestamp or an ISO 8601 date"}]
+
+    try:
+        for channel_id in dict.fromkeys(channels or []):
+            _sync_channel(channel_id, SLACK_SEARCH_SYNC_LIMIT)
+        results = _message_store.search(query, channels, since_ts, limit)
+        for result in results:
+            result["permalink"] = _permalink(result["channel_id"], result["ts"], result["thread_ts"])
+        logger.debug(f"Successful search_messages call: {len(results)} results")
+        return results
+    except SlackApiError as e:
+        return [{"error": f"Slack API Error: {e.response['error']}"}]
+    except SlackClientUnavailableError as e:
+        return [{"error": str(e)}]
+    except Exception as e:
+        logger.exception(f"Unexpected error occurred: {e}")
+        return [{"error": f"An unexpected error occurred: {e}"}]
+
+
 # host can be specified with HOST env variable
 # transport can be specified with MCP_TRANSPORT env variable (defaults to streamable-http)
 def run_server():
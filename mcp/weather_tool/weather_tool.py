@@ -1,14 +1,18 @@
 "Weather MCP tool example"
 
+import asyncio
 import json
 import logging
 import os
+import sqlite3
 import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
 
-import requests
-from fastmcp import FastMCP
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import httpx
+from fastmcp import Context, FastMCP
 
 mcp = FastMCP("Weather")
 logger = logging.getLogger(__name__)
@@ -19,69 +23,374 @@ logging.basicConfig(
 )
 
 # Configurable timeouts and retries for external API resilience
-_REQUEST_TIMEOUT = int(os.getenv("WEATHER_REQUEST_TIMEOUT", "30"))
+_REQUEST_TIMEOUT = float(os.getenv("WEATHER_REQUEST_TIMEOUT", "30"))
 _MAX_RETRIES = int(os.getenv("WEATHER_MAX_RETRIES", "3"))
 _BACKOFF_FACTOR = float(os.getenv("WEATHER_BACKOFF_FACTOR", "1.0"))
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Overall budget for one tool call, including retries and backoff
+_REQUEST_DEADLINE = float(os.getenv("WEATHER_REQUEST_DEADLINE", "20"))
+_MAX_CONNECTIONS_PER_HOST = int(os.getenv("WEATHER_MAX_CONNECTIONS_PER_HOST", "20"))
 
+# One HTTP/2 client per upstream host — reused across tool calls for connection pooling
+_clients: dict[str, httpx.AsyncClient] = {}
 
-def _build_resilient_session() -> requests.Session:
-    """Create an HTTP session with automatic retry and exponential backoff."""
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=_MAX_RETRIES,
-        backoff_factor=_BACKOFF_FACTOR,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    return session
 
+def _client_for(url: str) -> httpx.AsyncClient:
+    """Return the pooled client for the URL's host, creating it on first use."""
+    host = httpx.URL(url).host
+    client = _clients.get(host)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=_REQUEST_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=_MAX_CONNECTIONS_PER_HOST,
+            ),
+        )
+        _clients[host] = client
+    return client
 
-# Module-level session — reused across tool calls for connection pooling
-_session = _build_resilient_session()
+
+def _retry_delay(attempt: int, response: httpx.Response | None) -> float:
+    """Exponential backoff, honouring a numeric Retry-After header when present."""
+    delay = _BACKOFF_FACTOR * (2**attempt)
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+async def _get_json(url: str, params: dict[str, Any], deadline: float) -> Any:
+    """GET a URL and decode its JSON body, retrying transient failures until the deadline.
+
+    Backoff sleeps are awaited, so a retrying call never holds a worker thread, and
+    no attempt or sleep is allowed to run past ``deadline`` (a ``time.monotonic()`` value).
+    """
+    client = _client_for(url)
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise httpx.TimeoutException(f"Deadline exceeded for {url}")
+
+        response = None
+        try:
+            response = await client.get(url, params=params, timeout=min(_REQUEST_TIMEOUT, remaining))
+        except httpx.TransportError:
+            if attempt >= _MAX_RETRIES:
+                raise
+        if response is not None and (response.status_code not in _RETRY_STATUSES or attempt >= _MAX_RETRIES):
+            response.raise_for_status()
+            return response.json()
+
+        delay = _retry_delay(attempt, response)
+        if time.monotonic() + delay >= deadline:
+            if response is not None:
+                response.raise_for_status()
+            raise httpx.TimeoutException(f"Deadline exceeded while retrying {url}")
+        attempt += 1
+        logger.debug("Retrying %s in %.1fs (attempt %d)", url, delay, attempt)
+        await asyncio.sleep(delay)
+
+
+def _deadline(ctx: Context | None) -> float:
+    """Deadline for a tool call: WEATHER_REQUEST_DEADLINE, tightened by the caller's `_meta.timeout` (seconds)."""
+    budget = _REQUEST_DEADLINE
+    try:
+        meta = ctx.request_context.meta if ctx is not None else None
+        client_timeout = float(getattr(meta, "timeout", None) or 0)
+    except Exception:
+        # Outside of an MCP request, or a malformed timeout
+        client_timeout = 0
+    if client_timeout > 0:
+        budget = min(budget, client_timeout)
+    return time.monotonic() + budget
+
+
+# City -> coordinates never changes; current weather changes slowly
+_GEOCODE_CACHE_SIZE = int(os.getenv("WEATHER_GEOCODE_CACHE_SIZE", "1024"))
+_GEOCODE_CACHE_PATH = os.getenv("WEATHER_GEOCODE_CACHE_PATH", "")  # SQLite file; empty = memory only
+_FORECAST_TTL = float(os.getenv("WEATHER_FORECAST_TTL", "300"))
+_FORECAST_STALE_TTL = float(os.getenv("WEATHER_FORECAST_STALE_TTL", "900"))
+_FORECAST_CACHE_SIZE = int(os.getenv("WEATHER_FORECAST_CACHE_SIZE", "1024"))
+_COORD_PRECISION = int(os.getenv("WEATHER_COORD_PRECISION", "2"))  # 2 decimals ~ 1 km
+
+# Multi-city lookups: concurrent geocoding requests and maximum cities per call
+_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "8"))
+_MAX_BATCH_CITIES = int(os.getenv("WEATHER_MAX_BATCH_CITIES", "50"))
+
+
+def _normalize_city(city: str) -> str:
+    return " ".join(city.lower().split())
+
+
+class GeocodeCache:
+    """LRU cache of city name -> (latitude, longitude), optionally persisted to SQLite."""
+
+    def __init__(self, maxsize: int, path: str = ""):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode (city TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, city: str) -> tuple[float, float] | None:
+        key = _normalize_city(city)
+        with self._lock:
+            coords = self._entries.get(key)
+            if coords is not None:
+                self._entries.move_to_end(key)
+                return coords
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT latitude, longitude FROM geocode WHERE city = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            coords = (row[0], row[1])
+            self._remember(key, coords)
+            return coords
+
+    def put(self, city: str, coords: tuple[float, float]) -> None:
+        key = _normalize_city(city)
+        with self._lock:
+            self._remember(key, coords)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?)", (key, coords[0], coords[1]))
+                self._db.commit()
+
+    def _remember(self, key: str, coords: tuple[float, float]) -> None:
+        self._entries[key] = coords
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+
+class ForecastCache:
+    """Current-weather cache keyed on rounded coordinates, with TTL and stale-while-revalidate.
+
+    Entries younger than ``ttl`` are fresh. Entries younger than ``ttl + stale_ttl``
+    are served as-is while a single background refresh updates them.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float, precision: int):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._precision = precision
+        self._entries: OrderedDict[tuple[float, float], tuple[float, dict]] = OrderedDict()
+        self._refreshing: set[tuple[float, float]] = set()
+        self._lock = threading.Lock()
+
+    def key(self, latitude: float, longitude: float) -> tuple[float, float]:
+        return (round(latitude, self._precision), round(longitude, self._precision))
+
+    def get(self, key: tuple[float, float]) -> tuple[dict | None, bool]:
+        """Return ``(value, needs_refresh)``; value is None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            age = time.monotonic() - entry[0]
+            if age < self._ttl:
+                self._entries.move_to_end(key)
+                return entry[1], False
+            if age < self._ttl + self._stale_ttl:
+                if key in self._refreshing:
+                    return entry[1], False
+                self._refreshing.add(key)
+                return entry[1], True
+            del self._entries[key]
+            return None, False
+
+    def put(self, key: tuple[float, float], value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            self._refreshing.discard(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def refresh_failed(self, key: tuple[float, float]) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+
+_geocode_cache = GeocodeCache(_GEOCODE_CACHE_SIZE, _GEOCODE_CACHE_PATH)
+_forecast_cache = ForecastCache(_FORECAST_CACHE_SIZE, _FORECAST_TTL, _FORECAST_STALE_TTL, _COORD_PRECISION)
+# Strong references to in-flight background refreshes so they are not garbage collected
+_refresh_tasks: set[asyncio.Task] = set()
+
+
+async def _geocode(city: str, deadline: float) -> tuple[float, float] | None:
+    """Resolve a city name to coordinates, consulting the geocoding cache first.
+
+    Returns None if the city is unknown; raises on upstream errors.
+    """
+    coords = _geocode_cache.get(city)
+    if coords is not None:
+        return coords
+
+    base_url = "https://geocoding-api.open-meteo.com/v1/search"
+    params = {"name": city, "count": 1}
+    data = await _get_json(base_url, params, deadline)
+
+    if not data or "results" not in data:
+        return None
+    coords = (data["results"][0]["latitude"], data["results"][0]["longitude"])
+    _geocode_cache.put(city, coords)
+    return coords
+
+
+async def _fetch_forecasts(keys: list[tuple[float, float]], deadline: float) -> dict[tuple[float, float], dict]:
+    """Fetch current weather for (already rounded) coordinates in a single request.
+
+    Open-Meteo accepts comma-separated coordinate lists and then returns one result
+    per location. Results are stored in the forecast cache.
+    """
+    weather_url = "https://api.open-meteo.com/v1/forecast"
+    weather_params = {
+        "latitude": ",".join(str(key[0]) for key in keys),
+        "longitude": ",".join(str(key[1]) for key in keys),
+        "temperature_unit": "fahrenheit",
+        "current_weather": True,
+    }
+    data = await _get_json(weather_url, weather_params, deadline)
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(keys):
+        raise ValueError(f"Expected {len(keys)} forecasts, got {len(data)}")
+
+    forecasts = {}
+    for key, item in zip(keys, data):
+        forecasts[key] = item["current_weather"]
+        _forecast_cache.put(key, forecasts[key])
+    return forecasts
+
+
+async def _fetch_forecast(key: tuple[float, float], deadline: float) -> dict:
+    """Fetch current weather for (already rounded) coordinates and store it in the forecast cache."""
+    return (await _fetch_forecasts([key], deadline))[key]
+
+
+async def _background_refresh(key: tuple[float, float]) -> None:
+    try:
+        await _fetch_forecast(key, time.monotonic() + _REQUEST_DEADLINE)
+    except (httpx.HTTPError, ValueError, KeyError) as exc:
+        logger.warning("Background forecast refresh failed for %s: %s", key, exc)
+        _forecast_cache.refresh_failed(key)
+
+
+def _schedule_refresh(key: tuple[float, float]) -> None:
+    task = asyncio.create_task(_background_refresh(key))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def _current_weather(latitude: float, longitude: float, deadline: float) -> dict:
+    """Return current weather at coordinates, serving fresh or stale cache entries when possible."""
+    key = _forecast_cache.key(latitude, longitude)
+    current, needs_refresh = _forecast_cache.get(key)
+    if current is None:
+        return await _fetch_forecast(key, deadline)
+    if needs_refresh:
+        _schedule_refresh(key)
+    return current
 
 
 @mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
-def get_weather(city: str) -> str:
+async def get_weather(city: str, ctx: Context | None = None) -> str:
     """Get weather info for a city"""
     logger.debug(f"Getting weather info for city '{city}'.")
+    deadline = _deadline(ctx)
 
     # Geocoding: resolve city name to coordinates
-    base_url = "https://geocoding-api.open-meteo.com/v1/search"
-    params = {"name": city, "count": 1}
     try:
-        response = _session.get(base_url, params=params, timeout=_REQUEST_TIMEOUT)
-        response.raise_for_status()
-        data = response.json()
-    except (requests.RequestException, ValueError) as exc:
+        coords = await _geocode(city, deadline)
+    except (httpx.HTTPError, ValueError) as exc:
         logger.warning("Geocoding API error for '%s': %s", city, exc)
         return f"Weather service temporarily unavailable for {city} (geocoding error)"
 
-    if not data or "results" not in data:
+    if coords is None:
         return f"City {city} not found"
-    latitude = data["results"][0]["latitude"]
-    longitude = data["results"][0]["longitude"]
 
     # Forecast: get current weather at coordinates
-    weather_url = "https://api.open-meteo.com/v1/forecast"
-    weather_params = {
-        "latitude": latitude,
-        "longitude": longitude,
-        "temperature_unit": "fahrenheit",
-        "current_weather": True,
-    }
     try:
-        weather_response = _session.get(weather_url, params=weather_params, timeout=_REQUEST_TIMEOUT)
-        weather_response.raise_for_status()
-        weather_data = weather_response.json()
-    except (requests.RequestException, ValueError) as exc:
+        current = await _current_weather(*coords, deadline)
+    except (httpx.HTTPError, ValueError, KeyError) as exc:
         logger.warning("Forecast API error for '%s': %s", city, exc)
         return f"Weather service temporarily unavailable for {city} (forecast error)"
 
-    return json.dumps(weather_data["current_weather"])
+    return json.dumps(current)
+
+
+@mcp.tool(annotations={"readOnlyHint": True, "destructiveHint": False, "idempotentHint": True})
+async def get_weather_many(cities: list[str], ctx: Context | None = None) -> str:
+    """Get weather info for several cities at once, e.g. to compare them.
+
+    Returns a JSON object mapping each city to its current weather, or to an
+    object with an "error" key if that city could not be looked up.
+    """
+    names = list(dict.fromkeys(c.strip() for c in cities if isinstance(c, str) and c.strip()))
+    if not names:
+        return json.dumps({"error": "cities must contain at least one city name"})
+    if len(names) > _MAX_BATCH_CITIES:
+        return json.dumps({"error": f"Too many cities (max {_MAX_BATCH_CITIES})"})
+    logger.debug("Getting weather info for cities %s.", names)
+    deadline = _deadline(ctx)
+
+    results: dict[str, dict] = {}
+
+    # Geocoding has no batch endpoint; resolve uncached cities concurrently
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+
+    async def geocode_one(city: str) -> tuple[float, float] | None:
+        async with semaphore:
+            return await _geocode(city, deadline)
+
+    geocoded = await asyncio.gather(*(geocode_one(city) for city in names), return_exceptions=True)
+    city_keys: dict[str, tuple[float, float]] = {}
+    for city, coords in zip(names, geocoded):
+        if isinstance(coords, (httpx.HTTPError, ValueError)):
+            logger.warning("Geocoding API error for '%s': %s", city, coords)
+            results[city] = {"error": "Weather service temporarily unavailable (geocoding error)"}
+            continue
+        if isinstance(coords, BaseException):
+            raise coords
+        if coords is None:
+            results[city] = {"error": f"City {city} not found"}
+            continue
+        city_keys[city] = _forecast_cache.key(*coords)
+
+    # Forecasts: serve from cache, then fetch every remaining location in one request
+    forecasts: dict[tuple[float, float], dict] = {}
+    missing: list[tuple[float, float]] = []
+    for key in dict.fromkeys(city_keys.values()):
+        current, needs_refresh = _forecast_cache.get(key)
+        if current is None:
+            missing.append(key)
+            continue
+        forecasts[key] = current
+        if needs_refresh:
+            _schedule_refresh(key)
+    if missing:
+        try:
+            forecasts.update(await _fetch_forecasts(missing, deadline))
+        except (httpx.HTTPError, ValueError, KeyError) as exc:
+            logger.warning("Forecast API error for %s: %s", missing, exc)
+
+    for city, key in city_keys.items():
+        if key in forecasts:
+            results[city] = forecasts[key]
+        else:
+            results[city] = {"error": "Weather service temporarily unavailable (forecast error)"}
+
+    return json.dumps({city: results[city] for city in names})
 
 
 # host can be specified with HOST env variable
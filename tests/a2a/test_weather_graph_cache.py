@@ -0,0 +1,202 @@
+"""Tests for the weather_service compiled-graph cache.
+
+Loads graph.py in isolation (same approach as test_weather_service.py) with the
+LangChain/LangGraph dependencies mocked out.
+"""
+
+import asyncio
+import importlib.util
+import pathlib
+import sys
+from types import ModuleType, SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# --- Isolation setup (must happen before any weather_service imports) ---
+_fake_ws = ModuleType("weather_service")
+_fake_ws.__path__ = []  # type: ignore[attr-defined]
+sys.modules.setdefault("weather_service", _fake_ws)
+sys.modules.setdefault("weather_service.observability", MagicMock())
+sys.modules.setdefault("weather_service.metrics", MagicMock())
+
+_BASE = pathlib.Path(__file__).parent.parent.parent / "a2a" / "weather_service" / "src" / "weather_service"
+
+
+def _load_module(name: str, path: pathlib.Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)  # type: ignore[union-attr]
+    return mod
+
+
+for mod_name in [
+    "langchain_core",
+    "langchain_core.messages",
+    "langchain_mcp_adapters",
+    "langchain_mcp_adapters.client",
+    "langchain_openai",
+    "langgraph",
+    "langgraph.graph",
+    "langgraph.prebuilt",
+]:
+    sys.modules.setdefault(mod_name, MagicMock())
+
+if "weather_service.configuration" not in sys.modules:
+    _load_module("weather_service.configuration", _BASE / "configuration.py")
+_graph_mod = _load_module("weather_service.graph_under_test", _BASE / "graph.py")
+
+GraphCache = _graph_mod.GraphCache
+
+
+def _tool(name, description="", schema=None):
+    return SimpleNamespace(name=name, description=description, args_schema=schema or {"type": "object"})
+
+
+class _FakeMCP:
+    """Stands in for get_mcpclient; records which headers were used."""
+
+    def __init__(self, tools):
+        self.tools = tools
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, headers=None):
+        self.calls.append(headers)
+        client = MagicMock()
+
+        async def get_tools():
+            if self.fail:
+                raise ConnectionError("down")
+            return list(self.tools)
+
+        client.get_tools = get_tools
+        return client
+
+
+@pytest.fixture
+def mcp(monkeypatch):
+    fake = _FakeMCP([_tool("get_weather")])
+    monkeypatch.setattr(_graph_mod, "get_mcpclient", fake)
+    monkeypatch.setattr(_graph_mod, "build_graph", lambda tools: object())
+    return fake
+
+
+class TestGraphCache:
+    """Test per-header caching, TTL refresh and invalidation."""
+
+    def test_second_request_does_no_setup(self, mcp):
+        cache = GraphCache(ttl=60, maxsize=4)
+
+        async def run():
+            first = await cache.get({"Authorization": "Bearer a"})
+            second = await cache.get({"Authorization": "Bearer a"})
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first is second
+        assert len(mcp.calls) == 1
+
+    def test_headers_get_separate_graphs(self, mcp):
+        cache = GraphCache(ttl=60, maxsize=4)
+
+        async def run():
+            return await cache.get({"Authorization": "Bearer a"}), await cache.get({"Authorization": "Bearer b"})
+
+        first, second = asyncio.run(run())
+        assert first is not second
+        assert mcp.calls == [{"Authorization": "Bearer a"}, {"Authorization": "Bearer b"}]
+
+    def test_concurrent_first_requests_build_once(self, mcp):
+        cache = GraphCache(ttl=60, maxsize=4)
+
+        async def run():
+            return await asyncio.gather(*(cache.get(None) for _ in range(5)))
+
+        graphs = asyncio.run(run())
+        assert all(graph is graphs[0] for graph in graphs)
+        assert len(mcp.calls) == 1
+
+    def test_expired_entry_kept_when_tools_unchanged(self, mcp):
+        cache = GraphCache(ttl=0, maxsize=4)
+
+        async def run():
+            first = await cache.get(None)
+            second = await cache.get(None)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return first, second, await cache.get(None)
+
+        first, second, third = asyncio.run(run())
+        assert first is second is third
+        assert len(mcp.calls) >= 2
+
+    def test_tool_list_change_rebuilds(self, mcp):
+        cache = GraphCache(ttl=0, maxsize=4)
+
+        async def run():
+            first = await cache.get(None)
+            mcp.tools.append(_tool("get_forecast"))
+            await cache.get(None)  # serves the old graph, refreshes in the background
+            for _ in range(3):
+                await asyncio.sleep(0)
+            return first, await cache.get(None)
+
+        first, rebuilt = asyncio.run(run())
+        assert rebuilt is not first
+
+    def test_refresh_failure_keeps_graph(self, mcp):
+        cache = GraphCache(ttl=0, maxsize=4)
+
+        async def run():
+            first = await cache.get(None)
+            mcp.fail = True
+            await cache.get(None)
+            for _ in range(3):
+                await asyncio.sleep(0)
+            return first, await cache.get(None)
+
+        first, second = asyncio.run(run())
+        assert first is second
+
+    def test_connection_error_wrapped(self, mcp):
+        mcp.fail = True
+        cache = GraphCache(ttl=60, maxsize=4)
+        with pytest.raises(_graph_mod.MCPConnectionError):
+            asyncio.run(cache.get(None))
+        assert cache._locks == {}
+
+    def test_zero_size_still_returns_graph(self, mcp):
+        cache = GraphCache(ttl=60, maxsize=0)
+
+        async def run():
+            return await cache.get({"a": "1"}), await cache.get({"b": "2"})
+
+        first, second = asyncio.run(run())
+        assert first is not None and second is not None
+        assert len(cache._entries) == 1
+
+    def test_invalidate_and_eviction(self, mcp):
+        cache = GraphCache(ttl=60, maxsize=1)
+
+        async def run():
+            await cache.get({"a": "1"})
+            await cache.get({"b": "2"})  # evicts a
+            await cache.get({"a": "1"})
+            cache.invalidate({"a": "1"})
+            await cache.get({"a": "1"})
+
+        asyncio.run(run())
+        assert len(mcp.calls) == 4
+
+
+class TestToolsSignature:
+    def test_order_independent(self):
+        a, b = _tool("a", "x"), _tool("b", "y")
+        assert _graph_mod.tools_signature([a, b]) == _graph_mod.tools_signature([b, a])
+
+    def test_schema_change_detected(self):
+        before = _tool("a", schema={"properties": {"city": {"type": "string"}}})
+        after = _tool("a", schema={"properties": {"city": {"type": "string"}, "units": {"type": "string"}}})
+        assert _graph_mod.tools_signature([before]) != _graph_mod.tools_signature([after])
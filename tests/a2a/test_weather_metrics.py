@@ -0,0 +1,62 @@
+"""Tests for the weather_service Prometheus metrics.
+
+Loads metrics.py in isolation and scrapes it through a Starlette app, as the
+agent serves it.
+"""
+
+import importlib.util
+import pathlib
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+pytest.importorskip("starlette")
+
+from prometheus_client import REGISTRY  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+_PATH = pathlib.Path(__file__).parent.parent.parent / "a2a" / "weather_service" / "src" / "weather_service"
+
+_spec = importlib.util.spec_from_file_location("weather_service_metrics_under_test", _PATH / "metrics.py")
+metrics = importlib.util.module_from_spec(_spec)  # type: ignore[arg-type]
+_spec.loader.exec_module(metrics)  # type: ignore[union-attr]
+
+
+def _scrape() -> str:
+    app = Starlette(routes=[Route("/metrics", metrics.metrics_endpoint, methods=["GET"])])
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return response.text
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_histogram_is_scraped():
+    before = _sample("weather_agent_stage_seconds_count", stage="llm")
+    metrics.observe_stage("llm", 0.3)
+    metrics.observe_stage("llm", 1.7)
+
+    assert _sample("weather_agent_stage_seconds_count", stage="llm") == before + 2
+    assert _sample("weather_agent_stage_seconds_bucket", stage="llm", le="0.5") >= 1
+    assert 'weather_agent_stage_seconds_bucket{le="0.0001",stage="llm"}' in _scrape()
+
+
+def test_task_counters_and_in_flight_gauge():
+    before = _sample("weather_agent_tasks_total", outcome="completed")
+    with metrics.TASKS_IN_FLIGHT.track_inprogress():
+        assert _sample("weather_agent_tasks_in_flight") == 1
+        metrics.TASKS.labels(outcome="completed").inc()
+    assert _sample("weather_agent_tasks_in_flight") == 0
+
+    text = _scrape()
+    assert "weather_agent_tasks_in_flight 0.0" in text
+    assert _sample("weather_agent_tasks_total", outcome="completed") == before + 1
+
+
+def test_tool_node_is_a_stage():
+    assert metrics.GRAPH_NODE_STAGES["tools"] == "tool"
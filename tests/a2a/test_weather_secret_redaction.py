@@ -5,6 +5,7 @@ test_weather_service.py) to avoid pulling in heavy deps like opentelemetry.
 """
 
 import importlib.util
+import io
 import logging
 import pathlib
 import sys
@@ -50,6 +51,7 @@ for mod_name in [
     "a2a.types",
     "a2a.utils",
     "weather_service.graph",
+    "weather_service.metrics",
 ]:
     sys.modules.setdefault(mod_name, MagicMock())
 
@@ -57,6 +59,7 @@ _agent_mod = _load_module("weather_service.agent", _BASE / "agent.py")
 
 Configuration = _config_mod.Configuration
 SecretRedactionFilter = _agent_mod.SecretRedactionFilter
+SecretRedactingFormatter = _agent_mod.SecretRedactingFormatter
 
 
 # --- Tests ---
@@ -142,6 +145,67 @@ class TestSecretRedactionFilter:
         assert record.msg == "Normal log message"
 
 
+class TestSecretRedactingFormatter:
+    """Test the formatter that redacts emitted records after formatting."""
+
+    def _logger(self, formatter, level=logging.INFO):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+        logger = logging.getLogger(f"test_redaction_{id(stream)}")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        return logger, stream
+
+    def test_redacts_message_args_and_traceback(self, monkeypatch):
+        key = "a1b2c3d4e5f6g7h8i9j0k1l2m3n4o5p6"
+        monkeypatch.setenv("LLM_API_KEY", key)
+        logger, stream = self._logger(SecretRedactingFormatter(logging.Formatter("%(levelname)s %(message)s")))
+        logger.info("headers: %s", {"authorization": "Bearer tok-123"})
+        try:
+            raise ValueError(f"bad key {key}")
+        except ValueError:
+            logger.exception("call failed")
+
+        output = stream.getvalue()
+        assert "tok-123" not in output
+        assert key not in output
+        assert "INFO headers: {'authorization': 'Bearer [REDACTED]" in output
+        assert "ValueError: bad key [REDACTED]" in output
+
+    def test_key_and_bearer_in_one_message(self, monkeypatch):
+        key = "a1b2c3d4e5f6g7h8i9j0k1l2m3n4o5p6"
+        monkeypatch.setenv("LLM_API_KEY", key)
+        filt = SecretRedactionFilter()
+        assert filt.redact(f"BEARER abc and {key}") == "BEARER [REDACTED] and [REDACTED]"
+
+    def test_text_before_first_secret_is_kept(self, monkeypatch):
+        key = "a1b2c3d4e5f6g7h8i9j0k1l2m3n4o5p6"
+        monkeypatch.setenv("LLM_API_KEY", key)
+        filt = SecretRedactionFilter()
+        assert filt.redact(f"key={key}, auth=Bearer abc") == "key=[REDACTED], auth=Bearer [REDACTED]"
+        # lower() lengthens "İ", so match offsets from the lowered text must not be reused
+        assert filt.redact("İİİİ Bearer abc") == "İİİİ Bearer [REDACTED]"
+
+    def test_clean_message_returned_unchanged(self):
+        filt = SecretRedactionFilter()
+        text = "Processing weather request for New York"
+        assert filt.redact(text) is text
+
+    def test_dropped_records_are_not_redacted(self, monkeypatch):
+        formatter = SecretRedactingFormatter()
+        calls = []
+        monkeypatch.setattr(formatter._redaction, "redact", lambda text: calls.append(text) or text)
+        logger, stream = self._logger(formatter, level=logging.WARNING)
+        logger.info("Bearer secret123")
+        logger.warning("kept")
+
+        assert calls == ["kept"]
+        assert stream.getvalue() == "kept\n"
+
+
 class TestConfigurationApiKeyValidation:
     """Test API key validation logic."""
 
@@ -0,0 +1,264 @@
+"""Tests for the weather_service pure-ASGI tracing middleware.
+
+Loads observability.py in isolation and drives TracingMiddleware with a raw ASGI
+app, exporting spans to memory.
+"""
+
+import asyncio
+import importlib.util
+import json
+import pathlib
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter  # noqa: E402
+from opentelemetry.trace import StatusCode  # noqa: E402
+
+_PATH = pathlib.Path(__file__).parent.parent.parent / "a2a" / "weather_service" / "src" / "weather_service"
+
+
+def _load_observability():
+    spec = importlib.util.spec_from_file_location(
+        "weather_service_observability_under_test", _PATH / "observability.py"
+    )
+    mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+    spec.loader.exec_module(mod)  # type: ignore[union-attr]
+    return mod
+
+
+obs = _load_observability()
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(obs, "_use_otel", True)
+    monkeypatch.setattr(obs, "get_tracer", lambda: provider.get_tracer("test"))
+    return exporter
+
+
+def _request_body(text="weather in NY?", context_id="ctx-1"):
+    return json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "message/send",
+            "params": {
+                "message": {"role": "user", "messageId": "msg-1", "parts": [{"kind": "text", "text": text}]},
+                "contextId": context_id,
+            },
+        }
+    ).encode()
+
+
+def _app(response_chunks, content_type=b"application/json", seen=None):
+    """A raw ASGI app that reads the whole request, then sends ``response_chunks``."""
+
+    async def app(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        if seen is not None:
+            seen.append((body, obs.get_root_span()))
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for i, chunk in enumerate(response_chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(response_chunks) - 1})
+
+    return app
+
+
+def _call(app, body, path="/", chunk_size=None, headers=()):
+    chunks = [body] if chunk_size is None else [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    incoming = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": path, "headers": list(headers)}
+    asyncio.run(obs.TracingMiddleware(app)(scope, receive, send))
+    return sent
+
+
+def _task_response(text):
+    return json.dumps(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "result": {"kind": "task", "artifacts": [{"parts": [{"kind": "text", "text": text}]}]},
+        }
+    ).encode()
+
+
+def test_json_request_and_response_attributes(exporter):
+    seen = []
+    response = _task_response("Sunny, 21C")
+    sent = _call(_app([response[:10], response[10:]], seen=seen), _request_body(), chunk_size=7)
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "invoke_agent weather-assistant"
+    assert span.attributes["input.value"] == "weather in NY?"
+    assert span.attributes["session.id"] == "ctx-1"
+    assert span.attributes["output.value"] == "Sunny, 21C"
+    assert span.attributes["mlflow.user"] == "anonymous"
+    assert span.status.status_code == StatusCode.OK
+    # The app saw the request unchanged, inside the root span
+    assert seen[0][0] == _request_body()
+    assert seen[0][1] is not None
+    # Response chunks are forwarded as-is, not buffered and re-sent
+    assert [m.get("body") for m in sent[1:]] == [response[:10], response[10:]]
+    assert sent[1]["body"] is not None and sent[1]["more_body"] is True
+
+
+def test_large_request_parses_only_prefix(exporter, monkeypatch):
+    monkeypatch.setattr(obs, "REQUEST_CAPTURE_BYTES", 256)
+    body = _request_body(text="weather in NY?" + " padding" * 5000)
+    seen = []
+    _call(_app([b"{}"], seen=seen), body, chunk_size=64)
+
+    (span,) = exporter.get_finished_spans()
+    assert seen[0][0] == body
+    # contextId lies past the prefix, so the message id is the session; the prompt
+    # string is cut off by the prefix and left unset rather than guessed
+    assert span.attributes["session.id"] == "msg-1"
+    assert "input.value" not in span.attributes
+
+
+def test_scan_json_string_on_truncated_document():
+    prefix = '{"params": {"message": {"messageId": "m-9", "parts": [{"text": "hello \\"there\\"", "x": "abcdef'
+    assert obs._scan_json_string(prefix, "messageId") == "m-9"
+    assert obs._scan_json_string(prefix, "text") == 'hello "there"'
+    assert obs._scan_json_string(prefix, "x") is None
+    assert obs._scan_json_string(prefix, "contextId") is None
+
+
+def test_sse_artifact_captured_across_chunk_boundaries(exporter):
+    status = {"jsonrpc": "2.0", "id": 1, "result": {"kind": "status-update", "status": {"state": "working"}}}
+    artifact = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {"kind": "artifact-update", "artifact": {"parts": [{"kind": "text", "text": "Rainy, 12C"}]}},
+    }
+    stream = f"data: {json.dumps(status)}\r\n\r\ndata: {json.dumps(artifact)}\r\n\r\n".encode()
+    chunks = [stream[i : i + 17] for i in range(0, len(stream), 17)]
+    sent = _call(_app(chunks, content_type=b"text/event-stream"), _request_body())
+
+    (span,) = exporter.get_finished_spans()
+    assert span.attributes["output.value"] == "Rainy, 12C"
+    assert b"".join(m.get("body", b"") for m in sent[1:]) == stream
+
+
+def test_untraced_paths_and_disabled_otel_pass_through(exporter, monkeypatch):
+    _call(_app([b"ok"]), b"", path="/health")
+    assert exporter.get_finished_spans() == ()
+
+    monkeypatch.setattr(obs, "_use_otel", False)
+    sent = _call(_app([b"ok"]), _request_body())
+    assert exporter.get_finished_spans() == ()
+    assert sent[1]["body"] == b"ok"
+
+
+def test_app_error_marks_span(exporter):
+    async def failing(scope, receive, send):
+        await receive()
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        _call(failing, _request_body(), headers=[(b"authorization", b"Bearer x")])
+
+    (span,) = exporter.get_finished_spans()
+    assert span.status.status_code == StatusCode.ERROR
+    assert span.attributes["mlflow.user"] == "authenticated"
+    assert obs.get_root_span() is None
+
+
+def test_payload_dedup_writes_prompt_once(exporter, monkeypatch):
+    monkeypatch.setattr(obs, "PAYLOAD_DEDUP", True)
+    monkeypatch.setattr(obs, "PAYLOAD_MAX_CHARS", 5)
+    _call(_app([_task_response("Sunny, 21C")]), _request_body())
+
+    (span,) = exporter.get_finished_spans()
+    assert span.attributes["input.value"] == "weath"
+    assert span.attributes["gen_ai.prompt"] == "@input.value"
+    # MLflow's Request/Response columns read these, so they carry the text itself
+    assert span.attributes["mlflow.spanInputs"] == "weath"
+    assert span.attributes["output.value"] == "Sunny"
+    assert span.attributes["gen_ai.completion"] == "@output.value"
+    assert span.attributes["mlflow.spanOutputs"] == "Sunny"
+
+
+def _sampled_exporter(monkeypatch, sampler):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(obs, "_use_otel", True)
+    monkeypatch.setattr(obs, "get_tracer", lambda: provider.get_tracer("test"))
+    return exporter
+
+
+def test_sampled_out_request_passes_through(monkeypatch):
+    monkeypatch.delenv("OTEL_TRACES_SAMPLER", raising=False)
+    monkeypatch.setenv("OTEL_TRACES_SAMPLE_RATIO", "0")
+    exporter = _sampled_exporter(monkeypatch, obs._build_sampler())
+    seen = []
+    sent = _call(_app([b"ok"], seen=seen), _request_body())
+
+    assert exporter.get_finished_spans() == ()
+    assert seen[0][0] == _request_body()
+    assert sent[1]["body"] == b"ok"
+
+
+def test_route_rate_limit(monkeypatch):
+    monkeypatch.delenv("OTEL_TRACES_SAMPLER", raising=False)
+    monkeypatch.setenv("OTEL_TRACES_SAMPLE_RATIO", "1.0")
+    monkeypatch.setenv("OTEL_TRACES_ROUTE_RATE_LIMIT", "2")
+    sampler = obs._build_sampler()
+    exporter = _sampled_exporter(monkeypatch, sampler)
+    for _ in range(5):
+        _call(_app([b"{}"]), _request_body(), path="/")
+    _call(_app([b"{}"]), _request_body(), path="/other")
+
+    paths = [span.attributes["url.path"] for span in exporter.get_finished_spans()]
+    # A burst of one second's budget on "/", and "/other" has its own budget
+    assert paths == ["/", "/", "/other"]
+    assert "RouteRateLimitingSampler" in sampler.get_description()
+
+
+def test_route_rate_limit_buckets_bounded():
+    sampler = obs.RouteRateLimitingSampler(1, max_routes=2)
+    decisions = [
+        sampler.should_sample(None, 1, "span", attributes={"url.path": f"/{i}"}).decision.is_sampled()
+        for i in range(100)
+    ]
+
+    # Two routes of their own plus one shared budget for every other path
+    assert decisions == [True, True, True] + [False] * 97
+    assert len(sampler._buckets) == 3
+
+
+def test_parent_decision_wins_over_rate_limit(monkeypatch):
+    monkeypatch.delenv("OTEL_TRACES_SAMPLER", raising=False)
+    monkeypatch.setenv("OTEL_TRACES_SAMPLE_RATIO", "0")
+    exporter = _sampled_exporter(monkeypatch, obs._build_sampler())
+    traceparent = b"00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    _call(_app([b"{}"]), _request_body(), headers=[(b"traceparent", traceparent)])
+
+    (span,) = exporter.get_finished_spans()
+    assert format(span.context.trace_id, "032x") == "0af7651916cd43dd8448eb211c80319c"
+
+
+def test_standard_sampler_env_takes_precedence(monkeypatch):
+    monkeypatch.setenv("OTEL_TRACES_SAMPLER", "always_off")
+    assert obs._build_sampler() is None
@@ -14,8 +14,14 @@ _paths = [
     str(root / "a2a" / "weather_service" / "src"),
     str(root / "a2a" / "simple_generalist" / "src"),
     str(root / "a2a" / "a2a_contact_extractor"),
+    str(root / "mcp" / "appworld_apis"),
     str(root / "mcp" / "flight_tool"),
+    str(root / "mcp" / "image_tool"),
+    str(root / "mcp" / "movie_tool"),
     str(root / "mcp" / "reservation_tool"),
+    str(root / "mcp" / "shopping_tool"),
+    str(root / "mcp" / "slack_tool"),
+    str(root / "mcp" / "weather_tool"),
 ]
 
 for p in _paths:
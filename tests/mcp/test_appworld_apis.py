@@ -0,0 +1,354 @@
+"""Tests for appworld_apis — supervisor restarts and the DB snapshot pool (no appworld install needed)."""
+
+import inspect
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock
+
+import db_snapshots
+import entrypoint
+import pytest
+from db_snapshots import SnapshotPool, SnapshotShutil
+from entrypoint import Supervisor, Worker
+
+
+def _exit_with(code: int) -> None:
+    sys.exit(code)
+
+
+def _sleep() -> None:
+    time.sleep(30)
+
+
+def _listen(port: int) -> None:
+    with socket.create_server(("127.0.0.1", port)):
+        time.sleep(30)
+
+
+def _free_port() -> int:
+    with socket.create_server(("127.0.0.1", 0)) as sock:
+        return sock.getsockname()[1]
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self.send_response(200 if self.path == "/" else 404)
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.02)
+
+
+class TestBuildWorkers:
+    """Test worker ports and the MCP -> API worker pinning."""
+
+    def test_defaults_match_single_process_layout(self, monkeypatch):
+        for name in ("APIS_PORT", "MCP_PORT", "APIS_WORKERS", "MCP_WORKERS", "WORKER_PORT_STEP"):
+            monkeypatch.delenv(name, raising=False)
+        workers = entrypoint.build_workers()
+        assert [(w.name, w.port, w.args) for w in workers] == [
+            ("apis-0", 8000, (8000,)),
+            ("mcp-0", 8001, (8001, "http://localhost:8000")),
+        ]
+        apis, mcp = workers
+        assert apis.ready_path == "/"
+        assert mcp.depends_on is apis
+
+    def test_mcp_workers_spread_across_api_workers(self, monkeypatch):
+        monkeypatch.setenv("APIS_WORKERS", "2")
+        monkeypatch.setenv("MCP_WORKERS", "3")
+        monkeypatch.setenv("WORKER_PORT_STEP", "10")
+        mcp = [w for w in entrypoint.build_workers() if w.name.startswith("mcp")]
+        assert [w.args for w in mcp] == [
+            (8001, "http://localhost:8000"),
+            (8011, "http://localhost:8010"),
+            (8021, "http://localhost:8000"),
+        ]
+
+    def test_api_workers_follow_mcp_workers(self, monkeypatch):
+        monkeypatch.delenv("APIS_WORKERS", raising=False)
+        monkeypatch.setenv("MCP_WORKERS", "2")
+        monkeypatch.setenv("WORKER_PORT_STEP", "10")
+        workers = entrypoint.build_workers()
+        assert [w.name for w in workers] == ["apis-0", "apis-1", "mcp-0", "mcp-1"]
+        assert [w.depends_on.name for w in workers[2:]] == ["apis-0", "apis-1"]
+
+    def test_api_workers_capped_at_mcp_workers(self, monkeypatch):
+        monkeypatch.setenv("APIS_WORKERS", "4")
+        monkeypatch.setenv("MCP_WORKERS", "1")
+        workers = entrypoint.build_workers()
+        assert [w.name for w in workers] == ["apis-0", "mcp-0"]
+
+    def test_no_api_workers_uses_remote_url(self, monkeypatch):
+        monkeypatch.setenv("APIS_WORKERS", "0")
+        monkeypatch.setenv("REMOTE_APIS_URL", "http://apis.example:9000")
+        workers = entrypoint.build_workers()
+        assert [w.args for w in workers] == [(8001, "http://apis.example:9000")]
+
+
+class TestSupervisor:
+    """Test restart backoff, counters and the status endpoint."""
+
+    def test_crashed_worker_restarted_with_backoff(self):
+        worker = Worker(name="crashy", target=_exit_with, args=(3,))
+        supervisor = Supervisor([worker], backoff=0.2, max_backoff=0.3, stable_after=60)
+        supervisor.poll()
+        worker.process.join(5)
+
+        supervisor.poll()
+        assert worker.last_exit_code == 3
+        assert worker.restarts == 0
+        assert worker.next_start_at - time.monotonic() == pytest.approx(0.2, abs=0.1)
+
+        _wait_for(lambda: time.monotonic() >= worker.next_start_at)
+        supervisor.poll()
+        assert worker.restarts == 1
+        worker.process.join(5)
+
+        supervisor.poll()
+        # Second consecutive failure doubles the delay, capped at max_backoff
+        assert worker.next_start_at - time.monotonic() == pytest.approx(0.3, abs=0.1)
+
+    def test_worker_does_not_inherit_shutdown_handler(self):
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+        try:
+            port = _free_port()
+            worker = Worker(name="listener", target=_listen, args=(port,), port=port)
+            supervisor = Supervisor([worker])
+            supervisor.poll()
+            _wait_for(worker.probe)
+            worker.process.terminate()
+            worker.process.join(5)
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+        assert worker.process.exitcode == -signal.SIGTERM
+
+    def test_stable_worker_resets_backoff(self):
+        worker = Worker(name="w", target=_exit_with, args=(1,), failures=5)
+        supervisor = Supervisor([worker], backoff=0.5, max_backoff=60, stable_after=0)
+        supervisor.poll()
+        worker.process.join(5)
+        supervisor.poll()
+        assert worker.failures == 1
+        assert worker.next_start_at - time.monotonic() == pytest.approx(0.5, abs=0.1)
+
+    def test_status_reports_each_worker(self):
+        worker = Worker(name="sleepy", target=_sleep)
+        supervisor = Supervisor([worker])
+        try:
+            supervisor.poll()
+            status = supervisor.status()
+            (entry,) = status["workers"]
+            assert entry["name"] == "sleepy"
+            assert entry["alive"] is True
+            assert entry["pid"] == worker.process.pid
+            assert entry["restarts"] == 0
+        finally:
+            supervisor.stop()
+        assert not worker.process.is_alive()
+
+    def test_dependent_waits_until_dependency_ready(self):
+        port = _free_port()
+        apis = Worker(name="apis", target=_listen, args=(port,), port=port)
+        mcp = Worker(name="mcp", target=_sleep, depends_on=apis)
+        supervisor = Supervisor([apis, mcp])
+        try:
+            supervisor.poll(probe=False)
+            assert mcp.process is None
+            _wait_for(lambda: supervisor.poll(probe=False) or apis.healthy)
+            assert apis.ready_after is not None
+            supervisor.poll(probe=False)
+            assert mcp.process is not None and mcp.process.is_alive()
+        finally:
+            supervisor.stop()
+
+    def test_http_readiness_probe(self):
+        server = HTTPServer(("127.0.0.1", 0), _OkHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            port = server.server_address[1]
+            assert Worker(name="w", port=port, target=_sleep, ready_path="/").probe()
+            assert not Worker(name="w", port=port, target=_sleep, ready_path="/missing").probe()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert not Worker(name="w", port=port, target=_sleep, ready_path="/").probe()
+
+    def _get(self, url):
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    def test_health_and_ready_endpoints(self):
+        port = _free_port()
+        worker = Worker(name="w", target=_sleep, port=port)
+        supervisor = Supervisor([worker])
+        server = entrypoint._serve_status(supervisor, 0)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            supervisor.poll()
+            status, body = self._get(base + "/health")
+            assert status == 200
+            assert body["alive"] is True
+            assert body["workers"][0]["name"] == "w"
+            # Nothing listens on the worker's port, so it never becomes ready
+            status, body = self._get(base + "/ready")
+            assert status == 503
+            assert body["ready"] is False
+        finally:
+            server.shutdown()
+            server.server_close()
+            supervisor.stop()
+
+
+class TestSnapshotPool:
+    """Test copy-on-write/pooled DB materialization."""
+
+    @pytest.fixture(autouse=True)
+    def no_reflink(self, monkeypatch):
+        monkeypatch.setattr(db_snapshots, "reflink", lambda src, dst: False)
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        path = tmp_path / "base" / "app.db"
+        path.parent.mkdir()
+        path.write_bytes(b"base")
+        return str(path)
+
+    def test_first_reset_copies(self, tmp_path, source):
+        pool = SnapshotPool(str(tmp_path / "pool"))
+        dst = tmp_path / "task" / "app.db"
+        assert pool.materialize(source, str(dst)) == "copy"
+        assert dst.read_bytes() == b"base"
+
+    def test_prepared_source_served_from_pool(self, tmp_path, source):
+        pool = SnapshotPool(str(tmp_path / "pool"), depth=2)
+        pool.prepare([source])
+        assert pool.wait(timeout=5)
+        assert pool.ready(source) == 2
+
+        dst = tmp_path / "task" / "app.db"
+        assert pool.materialize(source, str(dst)) == "pool"
+        assert dst.read_bytes() == b"base"
+        # The pool is topped back up in the background
+        assert pool.wait(timeout=5)
+        assert pool.ready(source) == 2
+
+    def test_copies_are_private(self, tmp_path, source):
+        pool = SnapshotPool(str(tmp_path / "pool"))
+        pool.prepare([source])
+        pool.wait(timeout=5)
+        first, second = tmp_path / "t1" / "app.db", tmp_path / "t2" / "app.db"
+        pool.materialize(source, str(first))
+        pool.materialize(source, str(second))
+        first.write_bytes(b"changed")
+        assert second.read_bytes() == b"base"
+        assert open(source, "rb").read() == b"base"
+
+    def test_stale_snapshot_discarded(self, tmp_path, source):
+        pool = SnapshotPool(str(tmp_path / "pool"))
+        pool.prepare([source])
+        pool.wait(timeout=5)
+        with open(source, "wb") as f:
+            f.write(b"new base")
+        os.utime(source, ns=(0, 0))
+        dst = tmp_path / "task" / "app.db"
+        assert pool.materialize(source, str(dst)) == "copy"
+        assert dst.read_bytes() == b"new base"
+
+    def test_unprepared_source_never_pooled(self, tmp_path, source):
+        pool = SnapshotPool(str(tmp_path / "pool"), depth=1)
+        for task in ("t1", "t2", "t3"):
+            assert pool.materialize(source, str(tmp_path / task / "app.db")) == "copy"
+        assert pool.wait(timeout=5)
+        assert pool.ready(source) == 0
+        assert os.listdir(tmp_path / "pool") == []
+
+    def test_leftover_snapshots_removed(self, tmp_path):
+        directory = tmp_path / "pool"
+        directory.mkdir()
+        (directory / "old.snapshot").write_bytes(b"x")
+        (directory / "keep.txt").write_bytes(b"x")
+        SnapshotPool(str(directory))
+        assert sorted(p.name for p in directory.iterdir()) == ["keep.txt"]
+
+    def test_shutil_stand_in(self, tmp_path, source):
+        pool = MagicMock()
+        fake = SnapshotShutil(pool)
+        target = tmp_path / "task"
+        target.mkdir()
+        assert fake.copy(source, str(target)) == str(target / "app.db")
+        pool.materialize.assert_called_once_with(source, str(target / "app.db"))
+        # Anything else goes to the real shutil
+        assert fake.rmtree is shutil.rmtree
+        other = tmp_path / "notes.txt"
+        other.write_text("hi")
+        fake.copy(str(other), str(tmp_path / "copy.txt"))
+        assert (tmp_path / "copy.txt").read_text() == "hi"
+        pool.materialize.assert_called_once()
+
+
+def _save_local_dbs(from_db_home_path, to_db_home_path, format="full", app_names=None):
+    pass
+
+
+class TestDockerModeGuard:
+    """Test DB path coercion caching and the save_local_dbs wrapper."""
+
+    def test_resolution_is_cached(self):
+        entrypoint._resolve_db_path.cache_clear()
+        path = "/elsewhere/experiments/outputs/exp/dbs"
+        assert entrypoint._coerce_db_path_for_docker_mode(path, "/run") == "/run/experiments/outputs/exp/dbs"
+        assert entrypoint._coerce_db_path_for_docker_mode(path, "/run") == "/run/experiments/outputs/exp/dbs"
+        assert entrypoint._resolve_db_path.cache_info().hits == 1
+
+    def test_rejection_is_cached_and_still_raises(self):
+        entrypoint._resolve_db_path.cache_clear()
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                entrypoint._coerce_db_path_for_docker_mode("/etc/passwd", "/run")
+        assert entrypoint._resolve_db_path.cache_info().hits == 1
+
+    def test_memory_and_none_pass_through(self):
+        assert entrypoint._coerce_db_path_for_docker_mode(":memory:base", "/run") == ":memory:base"
+        assert entrypoint._coerce_db_path_for_docker_mode(None, "/run") is None
+
+    def test_save_guard_coerces_positional_and_keyword_paths(self):
+        original = MagicMock(wraps=_save_local_dbs)
+        original.__signature__ = inspect.signature(_save_local_dbs)
+        guarded = entrypoint._guard_save_local_dbs(original, "/run")
+        guarded("data/base_dbs", to_db_home_path="experiments/outputs/x", format="changes")
+        original.assert_called_once_with(
+            from_db_home_path="/run/data/base_dbs", to_db_home_path="/run/experiments/outputs/x", format="changes"
+        )
+
+    def test_save_guard_rejects_duplicate_arguments(self):
+        guarded = entrypoint._guard_save_local_dbs(_save_local_dbs, "/run")
+        with pytest.raises(TypeError):
+            guarded("data/a", from_db_home_path="data/b")
+
+    def test_save_guard_reports_disallowed_path(self):
+        raise_http_exception = MagicMock(side_effect=RuntimeError("422"))
+        guarded = entrypoint._guard_save_local_dbs(_save_local_dbs, "/run", raise_http_exception)
+        with pytest.raises(RuntimeError):
+            guarded("data/a", "/tmp/outside")
+        raise_http_exception.assert_called_once()
+        assert raise_http_exception.call_args.kwargs == {"status_code": 422}
@@ -0,0 +1,210 @@
+"""Tests for image_tool MCP server — blob cache, request cache and resizing (isolated from heavy deps)."""
+
+import hashlib
+import sys
+from unittest.mock import MagicMock
+
+# Mock the fastmcp, mcp, starlette and requests dependencies before importing
+for _name in (
+    "fastmcp",
+    "fastmcp.resources",
+    "fastmcp.tools",
+    "mcp.types",
+    "starlette",
+    "starlette.requests",
+    "starlette.responses",
+    "requests",
+    "requests.adapters",
+):
+    sys.modules.setdefault(_name, MagicMock())
+
+import image_resize
+import image_tool
+import pytest
+from image_tool import BlobCache
+
+_JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 64
+_PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def _cache(path, max_memory=1 << 20, max_disk=1 << 20):
+    return BlobCache(str(path), max_memory, max_disk)
+
+
+class TestBlobCache:
+    """Test the content-addressed memory/disk blob store."""
+
+    def test_put_returns_sha256(self, tmp_path):
+        assert _cache(tmp_path).put(_JPEG) == hashlib.sha256(_JPEG).hexdigest()
+
+    def test_round_trip_in_memory(self, tmp_path):
+        cache = _cache(tmp_path)
+        digest = cache.put(_PNG)
+        assert cache.get(digest) == _PNG
+        assert list(tmp_path.rglob("*")) == []
+
+    def test_evicted_blob_spills_to_disk(self, tmp_path):
+        cache = _cache(tmp_path, max_memory=100)
+        first = cache.put(_JPEG)
+        cache.put(_PNG)
+        assert list(tmp_path.rglob(first))
+        assert cache.get(first) == _JPEG
+        assert _cache(tmp_path).get(first) == _JPEG
+
+    def test_identical_content_spilled_once(self, tmp_path):
+        cache = _cache(tmp_path, max_memory=0)
+        assert cache.put(_JPEG) == cache.put(_JPEG)
+        assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+
+    def test_disk_trimmed_least_recently_used_first(self, tmp_path):
+        cache = _cache(tmp_path, max_memory=0, max_disk=150)
+        first = cache.put(_JPEG)
+        second = cache.put(_PNG)
+        third = cache.put(b"GIF89a" + b"\x00" * 64)
+        assert cache.get(first) is None
+        assert cache.get(second) == _PNG
+        assert cache.get(third) is not None
+
+    def test_unknown_digest(self, tmp_path):
+        assert _cache(tmp_path).get("0" * 64) is None
+
+    @pytest.mark.parametrize("digest", ["../../etc/passwd", "ABC", "0" * 63])
+    def test_rejects_non_digest_keys(self, tmp_path, digest):
+        assert _cache(tmp_path).get(digest) is None
+
+
+class TestFetchImage:
+    """Test request-keyed reuse of fetched images and pre-warming."""
+
+    @pytest.fixture
+    def session(self, tmp_path, monkeypatch):
+        session = MagicMock()
+        session.get.return_value.content = _JPEG
+        monkeypatch.setattr(image_tool, "_session", session)
+        monkeypatch.setattr(image_tool, "_blobs", _cache(tmp_path))
+        monkeypatch.setattr(image_tool, "_requests_cache", image_tool.TTLCache(16, 60))
+        monkeypatch.setattr(image_tool, "IMAGE_SOURCE_SIZE", 0)
+        return session
+
+    def test_repeat_size_served_locally(self, session):
+        digest, data, cached = image_tool._fetch_image(200, 300)
+        assert (data, cached) == (_JPEG, False)
+        assert image_tool._fetch_image(200, 300) == (digest, _JPEG, True)
+        session.get.assert_called_once_with("https://picsum.photos/200/300", timeout=10)
+
+    def test_different_size_fetched(self, session):
+        image_tool._fetch_image(200, 300)
+        image_tool._fetch_image(300, 200)
+        assert session.get.call_count == 2
+
+    def test_prewarm_fills_cache(self, session):
+        image_tool.prewarm(image_tool._parse_sizes("200x300, 400X400"))
+        assert image_tool._fetch_image(400, 400)[2] is True
+        assert session.get.call_count == 2
+
+    def test_parse_sizes_skips_invalid(self):
+        assert image_tool._parse_sizes("200x300,abc,0x10,,64x64") == [(200, 300), (64, 64)]
+
+
+class TestSniffMime:
+    """Test image type detection from magic bytes."""
+
+    @pytest.mark.parametrize(
+        "data, mime",
+        [
+            (_JPEG, "image/jpeg"),
+            (_PNG, "image/png"),
+            (b"GIF89a" + b"\x00" * 8, "image/gif"),
+            (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "image/webp"),
+            (b"hello", "application/octet-stream"),
+        ],
+    )
+    def test_detects_type(self, data, mime):
+        assert image_tool._sniff_mime(data) == mime
+
+
+class TestDeriveImage:
+    """Test deriving sizes from one cached source image."""
+
+    @pytest.fixture
+    def session(self, tmp_path, monkeypatch):
+        session = MagicMock()
+        session.get.return_value.content = _JPEG
+        monkeypatch.setattr(image_tool, "_session", session)
+        monkeypatch.setattr(image_tool, "_blobs", _cache(tmp_path))
+        monkeypatch.setattr(image_tool, "_requests_cache", image_tool.TTLCache(16, 60))
+        monkeypatch.setattr(image_tool, "_derived_cache", image_tool.TTLCache(16, 60))
+        monkeypatch.setattr(image_tool, "IMAGE_SOURCE_SIZE", 1024)
+        renders = []
+
+        def fake_render(data, w, h, fmt, quality):
+            renders.append((w, h, fmt, quality))
+            rendered = f"{w}x{h}.{fmt}@{quality}".encode()
+            return image_tool._blobs.put(rendered), rendered
+
+        monkeypatch.setattr(image_tool, "_render", fake_render)
+        session.renders = renders
+        return session
+
+    def test_sizes_share_one_upstream_source(self, session):
+        image_tool._derive_image(200, 300, "jpeg", 80)
+        image_tool._derive_image(64, 64, "webp", 60)
+        session.get.assert_called_once_with("https://picsum.photos/1024/1024", timeout=10)
+        assert session.renders == [(200, 300, "jpeg", 80), (64, 64, "webp", 60)]
+
+    def test_repeat_render_served_from_cache(self, session):
+        first = image_tool._derive_image(200, 300, "webp", 60)
+        second = image_tool._derive_image(200, 300, "webp", 60)
+        assert first[:2] == second[:2] == (first[0], b"200x300.webp@60")
+        assert len(session.renders) == 1
+
+    def test_prewarm_renders_derived_sizes(self, session):
+        image_tool.prewarm([(200, 300), (64, 64)])
+        assert session.get.call_count == 1
+        assert session.renders == [(200, 300, "jpeg", 80), (64, 64, "jpeg", 80)]
+
+    def test_render_uses_rendered_bytes_when_blob_trimmed(self, session, monkeypatch):
+        monkeypatch.setattr(image_tool._blobs, "get", lambda digest: None)
+        digest, data, _, _ = image_tool._derive_image(200, 300, "webp", 60)
+        assert data == b"200x300.webp@60"
+        assert digest == hashlib.sha256(data).hexdigest()
+
+    def test_format_conversion_of_large_size_cached(self, session):
+        src_digest, src, _ = image_tool._fetch_image(2000, 2000)
+        first = image_tool._cached_render(src_digest, src, 2000, 2000, "webp", 80)
+        second = image_tool._cached_render(src_digest, src, 2000, 2000, "webp", 80)
+        assert first == second
+        assert session.renders == [(2000, 2000, "webp", 80)]
+
+    def test_only_sizes_within_source_are_derived(self, session, monkeypatch):
+        assert image_tool._derivable(1024, 10)
+        assert not image_tool._derivable(1025, 10)
+        monkeypatch.setattr(image_tool, "IMAGE_SOURCE_SIZE", 0)
+        assert not image_tool._derivable(10, 10)
+
+
+class TestImageResize:
+    """Test format handling and the Pillow resize pipeline."""
+
+    def test_normalize_format(self):
+        assert image_resize.normalize_format(" JPG ") == "jpeg"
+        assert image_resize.normalize_format("webp") == "webp"
+        with pytest.raises(ValueError):
+            image_resize.normalize_format("gif")
+
+    def test_cover_box_keeps_target_aspect(self):
+        left, top, right, bottom = image_resize._cover_box(1000, 1000, 200, 100)
+        assert (right - left) / (bottom - top) == pytest.approx(2.0)
+        assert (left, right) == (0, 1000)
+        assert top == pytest.approx(250)
+
+    @pytest.mark.parametrize("fmt, mime", [("jpeg", "image/jpeg"), ("webp", "image/webp"), ("png", "image/png")])
+    def test_render_size_and_format(self, fmt, mime):
+        pil = pytest.importorskip("PIL.Image")
+        import io
+
+        src = io.BytesIO()
+        pil.new("RGB", (512, 512), (200, 30, 30)).save(src, "JPEG")
+        out = image_resize.render_image(src.getvalue(), 120, 60, fmt, 70)
+        assert image_tool._sniff_mime(out) == mime
+        assert pil.open(io.BytesIO(out)).size == (120, 60)
@@ -0,0 +1,158 @@
+"""Tests for movie_tool MCP server — title cache and detail projection (isolated from heavy deps)."""
+
+import sys
+import time
+from unittest.mock import MagicMock
+
+# Mock the fastmcp and requests dependencies before importing
+sys.modules.setdefault("fastmcp", MagicMock())
+sys.modules.setdefault("requests", MagicMock())
+sys.modules.setdefault("requests.adapters", MagicMock())
+
+import movie_tool
+import pytest
+from movie_tool import TitleIndex, TTLCache, _movie_details
+
+_INCEPTION = {
+    "Title": "Inception",
+    "Plot": "A thief...",
+    "Poster": "http://x",
+    "imdbID": "tt1375666",
+    "Response": "True",
+}
+
+
+class TestTTLCache:
+    """Test the LRU/TTL cache used for OMDb records."""
+
+    def test_hit_and_expiry(self, monkeypatch):
+        cache = TTLCache(maxsize=4, ttl=10)
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        now = time.monotonic()
+        monkeypatch.setattr(movie_tool.time, "monotonic", lambda: now + 11)
+        assert cache.get("a") is None
+
+    def test_bounded(self):
+        cache = TTLCache(maxsize=2, ttl=10)
+        for key in ("a", "b", "c"):
+            cache.put(key, key)
+        assert cache.get("a") is None
+        assert cache.get("c") == "c"
+
+    def test_zero_ttl_disables(self):
+        cache = TTLCache(maxsize=2, ttl=0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+
+class TestGetMovie:
+    """Test that one full-plot fetch serves every tool for a normalized title."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(movie_tool, "_movie_cache", TTLCache(maxsize=8, ttl=60))
+        monkeypatch.setattr(movie_tool, "_title_index", TitleIndex(maxsize=8))
+
+    def test_normalized_titles_share_one_fetch(self, monkeypatch):
+        fetch = MagicMock(return_value=dict(_INCEPTION))
+        monkeypatch.setattr(movie_tool, "_fetch_json", fetch)
+        movie_tool._get_movie("Inception")
+        movie_tool._get_movie("  inception ")
+        fetch.assert_called_once_with(params={"t": "Inception", "plot": "full"})
+
+    def test_near_miss_title_resolved_locally(self, monkeypatch):
+        godfather = {**_INCEPTION, "Title": "The Godfather", "Year": "1972", "imdbID": "tt0068646"}
+        fetch = MagicMock(side_effect=[godfather, {"Response": "False", "Error": "Movie not found!"}])
+        monkeypatch.setattr(movie_tool, "_fetch_json", fetch)
+        movie_tool._get_movie("The Godfather")
+        data = movie_tool._get_movie("The Godfater")
+        assert data["Title"] == "The Godfather"
+        assert data["resolved_from"] == "The Godfater"
+        assert data["matched_title"] == "The Godfather"
+        # The near-miss title is now cached too, still marked as substituted
+        assert movie_tool._get_movie("the godfater")["resolved_from"] == "The Godfater"
+        # The real title's record carries no marker
+        assert "resolved_from" not in movie_tool._get_movie("The Godfather")
+        assert fetch.call_count == 2
+
+    def test_sequels_are_not_substituted(self, monkeypatch):
+        movie_tool._title_index.add({"Title": "Toy Story 4", "imdbID": "tt1979376"})
+        movie_tool._title_index.add({"Title": "The Matrix", "imdbID": "tt0133093"})
+        fetch = MagicMock(return_value={"Response": "False", "Error": "Movie not found!"})
+        monkeypatch.setattr(movie_tool, "_fetch_json", fetch)
+        assert movie_tool._get_movie("Toy Story 5")["Response"] == "False"
+        assert movie_tool._get_movie("The Matrix 5")["Response"] == "False"
+        assert fetch.call_count == 2
+
+    def test_full_plot_names_substituted_movie(self, monkeypatch):
+        movie_tool._title_index.add({"Title": "The Godfather", "imdbID": "tt0068646"})
+        godfather = {**_INCEPTION, "Title": "The Godfather", "Year": "1972", "Plot": "A mafia family..."}
+        fetch = MagicMock(side_effect=[{"Response": "False", "Error": "Movie not found!"}, godfather])
+        monkeypatch.setattr(movie_tool, "_fetch_json", fetch)
+        plot = movie_tool._full_plot(movie_tool._get_movie("The Godfater"))
+        assert "'The Godfather' (1972)" in plot
+        assert plot.endswith("A mafia family...")
+
+    def test_not_found_retried_by_indexed_id(self, monkeypatch):
+        movie_tool._title_index.add({"Title": "The Shawshank Redemption", "imdbID": "tt0111161"})
+        fetch = MagicMock(
+            side_effect=[{"Response": "False", "Error": "Movie not found!"}, {**_INCEPTION, "Title": "Shawshank"}]
+        )
+        monkeypatch.setattr(movie_tool, "_fetch_json", fetch)
+        assert movie_tool._get_movie("The Shawshank Redemtion")["Response"] == "True"
+        assert fetch.call_args.kwargs["params"] == {"i": "tt0111161", "plot": "full"}
+
+    def test_not_found_is_not_cached(self, monkeypatch):
+        fetch = MagicMock(return_value={"Response": "False", "Error": "Movie not found!"})
+        monkeypatch.setattr(movie_tool, "_fetch_json", fetch)
+        movie_tool._get_movie("Nope")
+        movie_tool._get_movie("Nope")
+        assert fetch.call_count == 2
+
+
+class TestMovieDetails:
+    """Test _movie_details projection."""
+
+    def test_drops_poster_and_response(self):
+        assert _movie_details(dict(_INCEPTION)) == {"Title": "Inception", "Plot": "A thief...", "imdbID": "tt1375666"}
+
+    def test_error_passthrough(self):
+        assert _movie_details({"Response": "False", "Error": "Movie not found!"}) == "Movie not found!"
+
+    def test_missing_response(self):
+        assert _movie_details({}) == "Movie not found"
+
+
+class TestTitleIndex:
+    """Test the trigram title index."""
+
+    def test_finds_misspelled_title(self):
+        index = TitleIndex(maxsize=8)
+        index.add({"Title": "The Godfather", "Year": "1972", "imdbID": "tt0068646"})
+        index.add({"Title": "Goodfellas", "Year": "1990", "imdbID": "tt0099685"})
+        (score, entry), *_ = index.search("the godfater")
+        assert entry["imdbID"] == "tt0068646"
+        assert score > 0.6
+
+    def test_ignores_case_and_punctuation(self):
+        index = TitleIndex(maxsize=8)
+        index.add({"Title": "Spider-Man: No Way Home", "imdbID": "tt10872600"})
+        assert index.search("spiderman no way home", threshold=0.6)
+
+    def test_threshold_filters_unrelated(self):
+        index = TitleIndex(maxsize=8)
+        index.add({"Title": "Inception", "imdbID": "tt1375666"})
+        assert index.search("Casablanca", threshold=0.6) == []
+
+    def test_evicts_oldest_and_its_postings(self):
+        index = TitleIndex(maxsize=1)
+        index.add({"Title": "Inception", "imdbID": "tt1375666"})
+        index.add({"Title": "Casablanca", "imdbID": "tt0034583"})
+        assert len(index) == 1
+        assert index.search("Inception") == []
+
+    def test_requires_id_and_title(self):
+        index = TitleIndex(maxsize=8)
+        index.add({"Title": "No ID"})
+        assert len(index) == 0
@@ -0,0 +1,99 @@
+"""Tests for shopping_tool — SerpAPI response cache and offline stub (isolated from heavy deps)."""
+
+import sys
+from unittest.mock import MagicMock
+
+# Mock the fastmcp and serpapi dependencies before importing
+sys.modules.setdefault("fastmcp", MagicMock())
+sys.modules.setdefault("serpapi", MagicMock())
+
+import pytest
+import shopping_agent
+from serpapi_stub import StubConfig, synthetic_shopping_results
+
+
+@pytest.fixture
+def fake_search(monkeypatch):
+    """Replace GoogleSearch with a mock and start every test with an empty cache."""
+    search_cls = MagicMock()
+    search_cls.return_value.get_dict.return_value = {"shopping_results": [{"title": "Scarf"}]}
+    monkeypatch.setattr(shopping_agent, "GoogleSearch", search_cls)
+    monkeypatch.setattr(shopping_agent, "SERPAPI_CACHE_TTL", 300.0)
+    shopping_agent._cache.clear()
+    yield search_cls
+    shopping_agent._cache.clear()
+
+
+class TestSerpApiSearch:
+    """Test _serpapi_search base URL and caching."""
+
+    def test_uses_configured_base_url(self, fake_search, monkeypatch):
+        monkeypatch.setattr(shopping_agent, "SERPAPI_BASE_URL", "http://localhost:9100")
+        shopping_agent._serpapi_search({"q": "scarf", "engine": "google_shopping"})
+        assert fake_search.return_value.BACKEND == "http://localhost:9100"
+
+    def test_repeat_query_served_from_cache(self, fake_search):
+        params = {"q": "scarf", "engine": "google_shopping", "api_key": "k"}
+        first = shopping_agent._serpapi_search(params)
+        second = shopping_agent._serpapi_search(params)
+        assert first == second
+        assert fake_search.call_count == 1
+
+    def test_cache_key_normalizes_query(self, fake_search):
+        shopping_agent._serpapi_search({"q": "Wool  Scarf", "engine": "google_shopping"})
+        shopping_agent._serpapi_search({"q": "wool scarf ", "engine": "google_shopping"})
+        assert fake_search.call_count == 1
+
+    def test_cache_key_ignores_api_key(self):
+        a = shopping_agent._cache_key({"q": "scarf", "api_key": "one"})
+        b = shopping_agent._cache_key({"q": "scarf", "api_key": "two"})
+        assert a == b
+
+    def test_different_engine_not_shared(self, fake_search):
+        shopping_agent._serpapi_search({"q": "scarf", "engine": "google_shopping"})
+        shopping_agent._serpapi_search({"q": "scarf", "engine": "google"})
+        assert fake_search.call_count == 2
+
+    def test_ttl_zero_disables_cache(self, fake_search, monkeypatch):
+        monkeypatch.setattr(shopping_agent, "SERPAPI_CACHE_TTL", 0.0)
+        params = {"q": "scarf", "engine": "google_shopping"}
+        shopping_agent._serpapi_search(params)
+        shopping_agent._serpapi_search(params)
+        assert fake_search.call_count == 2
+
+    def test_errors_not_cached(self, fake_search):
+        fake_search.return_value.get_dict.return_value = {"error": "quota exceeded"}
+        params = {"q": "scarf", "engine": "google_shopping"}
+        shopping_agent._serpapi_search(params)
+        shopping_agent._serpapi_search(params)
+        assert fake_search.call_count == 2
+
+    def test_cache_is_bounded(self, fake_search, monkeypatch):
+        monkeypatch.setattr(shopping_agent, "SERPAPI_CACHE_SIZE", 2)
+        for q in ("a", "b", "c"):
+            shopping_agent._serpapi_search({"q": q, "engine": "google_shopping"})
+        assert len(shopping_agent._cache) == 2
+
+
+class TestSerpApiStub:
+    """Test the offline SerpAPI stand-in's response shapes."""
+
+    def test_synthetic_results_are_deterministic(self):
+        assert synthetic_shopping_results("scarf", 3) == synthetic_shopping_results("scarf", 3)
+
+    def test_shopping_engine_shape(self):
+        body = StubConfig(results=5).build_response({"q": "scarf", "engine": "google_shopping", "num": "3"})
+        assert len(body["shopping_results"]) == 3
+        item = body["shopping_results"][0]
+        assert {"title", "price", "link", "source", "rating", "reviews"} <= item.keys()
+
+    def test_google_engine_has_organic_results(self):
+        body = StubConfig().build_response({"q": "scarf", "engine": "google"})
+        assert body["organic_results"]
+        assert "shopping_results" in body
+
+    def test_fixture_overrides_synthetic(self):
+        body = StubConfig(fixture={"shopping_results": [{"title": "Recorded"}]}).build_response(
+            {"q": "scarf", "engine": "google_shopping"}
+        )
+        assert body["shopping_results"] == [{"title": "Recorded"}]
@@ -0,0 +1,467 @@
+"""Tests for slack_tool MCP server — client caching and Slack call helpers (isolated from heavy deps)."""
+
+import sys
+import time
+from types import ModuleType
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class _SlackApiError(Exception):
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+
+# Mock the fastmcp and slack_sdk dependencies before importing
+_errors = ModuleType("slack_sdk.errors")
+_errors.SlackApiError = _SlackApiError  # type: ignore[attr-defined]
+sys.modules.setdefault("fastmcp", MagicMock())
+sys.modules.setdefault("slack_sdk", MagicMock())
+sys.modules.setdefault("slack_sdk.errors", _errors)
+sys.modules.setdefault("slack_sdk.http_retry", MagicMock())
+sys.modules.setdefault("slack_sdk.http_retry.builtin_handlers", MagicMock())
+
+import slack_tool
+
+SlackApiError = slack_tool.SlackApiError
+
+
+@pytest.fixture
+def web_client(monkeypatch):
+    """Replace WebClient with a factory of fresh mocks and start with no cached clients."""
+    created = []
+
+    def factory(**kwargs):
+        client = MagicMock()
+        client.auth_test.return_value = {"user": "bot", "team": "team"}
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(slack_tool, "WebClient", factory)
+    monkeypatch.setattr(slack_tool, "SLACK_BOT_TOKEN", "xoxb-test")
+    monkeypatch.setattr(slack_tool, "ADMIN_SLACK_BOT_TOKEN", None)
+    slack_tool._clients.clear()
+    yield created
+    slack_tool._clients.clear()
+
+
+class TestSlackClientCache:
+    """Test that one authenticated client is reused per token."""
+
+    def test_client_reused_across_calls(self, web_client):
+        first = slack_tool.get_slack_client()
+        second = slack_tool.get_slack_client()
+        assert first is second
+        assert len(web_client) == 1
+        first.auth_test.assert_called_once()
+
+    def test_admin_token_takes_precedence(self, web_client, monkeypatch):
+        monkeypatch.setattr(slack_tool, "ADMIN_SLACK_BOT_TOKEN", "xoxb-admin")
+        slack_tool.get_slack_client()
+        assert "xoxb-admin" in slack_tool._clients
+
+    def test_failed_auth_not_cached(self, web_client, monkeypatch):
+        def failing(**kwargs):
+            client = MagicMock()
+            client.auth_test.side_effect = SlackApiError("bad", {"error": "invalid_auth"})
+            return client
+
+        monkeypatch.setattr(slack_tool, "WebClient", failing)
+        assert slack_tool.get_slack_client() is None
+        assert slack_tool._clients == {}
+
+
+class TestCallSlack:
+    """Test call_slack's re-authentication behaviour."""
+
+    def test_single_request_when_cached(self, web_client):
+        slack_tool.get_slack_client()
+        slack_tool.call_slack(lambda c: c.conversations_list())
+        assert web_client[0].conversations_list.call_count == 1
+        assert web_client[0].auth_test.call_count == 1
+
+    def test_reauthenticates_on_revoked_token(self, web_client):
+        calls = []
+
+        def call(client):
+            calls.append(client)
+            if len(calls) == 1:
+                raise SlackApiError("revoked", {"error": "token_revoked"})
+            return {"ok": True}
+
+        assert slack_tool.call_slack(call) == {"ok": True}
+        assert len(web_client) == 2
+        assert calls == web_client
+
+    def test_other_errors_propagate(self, web_client):
+        def call(client):
+            raise SlackApiError("missing", {"error": "channel_not_found"})
+
+        with pytest.raises(SlackApiError):
+            slack_tool.call_slack(call)
+        assert len(web_client) == 1
+
+    def test_unavailable_client_raises(self, web_client, monkeypatch):
+        monkeypatch.setattr(slack_tool, "slack_client_from_bot_token", lambda token: None)
+        with pytest.raises(slack_tool.SlackClientUnavailableError):
+            slack_tool.call_slack(lambda c: c.conversations_list())
+
+
+def _page(names, cursor=""):
+    return {
+        "channels": [{"id": f"C{n}", "name": n, "purpose": {"value": f"About {n}"}} for n in names],
+        "response_metadata": {"next_cursor": cursor},
+    }
+
+
+class TestChannelDirectory:
+    """Test channel directory pagination, caching and filters."""
+
+    @pytest.fixture
+    def slack(self, web_client, monkeypatch):
+        monkeypatch.setattr(slack_tool, "SLACK_CHANNEL_CACHE_TTL", 300.0)
+        slack_tool._channel_cache.clear()
+        client = slack_tool.get_slack_client()
+        client.conversations_list.side_effect = [_page(["general", "random"], "next"), _page(["eng-infra"])]
+        yield client
+        slack_tool._channel_cache.clear()
+
+    def test_follows_cursor_to_last_page(self, slack):
+        channels = slack_tool._channel_directory()
+        assert [c["name"] for c in channels] == ["general", "random", "eng-infra"]
+        assert channels[0] == {"id": "Cgeneral", "name": "general", "purpose": "About general"}
+        first, second = slack.conversations_list.call_args_list
+        assert first.kwargs["limit"] == 1000
+        assert first.kwargs["cursor"] is None
+        assert second.kwargs["cursor"] == "next"
+
+    def test_directory_served_from_cache(self, slack):
+        slack_tool._channel_directory()
+        slack_tool._channel_directory()
+        assert slack.conversations_list.call_count == 2
+
+    def test_directory_refreshed_after_ttl(self, slack, monkeypatch):
+        slack_tool._channel_directory()
+        slack.conversations_list.side_effect = [_page(["new"])]
+        now = time.monotonic()
+        monkeypatch.setattr(slack_tool.time, "monotonic", lambda: now + 301)
+        assert [c["name"] for c in slack_tool._channel_directory()] == ["new"]
+
+    def test_api_error_not_cached(self, slack):
+        slack.conversations_list.side_effect = SlackApiError("boom", {"error": "ratelimited"})
+        with pytest.raises(SlackApiError):
+            slack_tool._channel_directory()
+        assert slack_tool._channel_cache == {}
+
+    def test_filters_are_case_insensitive(self):
+        channels = [
+            {"id": "C1", "name": "general", "purpose": "Company-wide news"},
+            {"id": "C2", "name": "eng-infra", "purpose": "Infrastructure"},
+        ]
+        assert slack_tool._filter_channels(channels, "ENG", None) == [channels[1]]
+        assert slack_tool._filter_channels(channels, None, "company") == [channels[0]]
+        assert slack_tool._filter_channels(channels, "eng", "company") == []
+        assert slack_tool._filter_channels(channels, None, None) == channels
+
+
+class _RateLimitedResponse(dict):
+    status_code = 429
+    headers = {"Retry-After": "7"}
+
+
+class TestTokenBucket:
+    """Test the per-method rate limiter."""
+
+    def test_burst_then_waits(self, monkeypatch):
+        now = [0.0]
+        sleeps = []
+        monkeypatch.setattr(slack_tool.time, "monotonic", lambda: now[0])
+
+        def fake_sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        monkeypatch.setattr(slack_tool.time, "sleep", fake_sleep)
+        bucket = slack_tool.TokenBucket(rate_per_minute=60, burst=2)
+        for _ in range(3):
+            bucket.acquire()
+        assert sleeps == [pytest.approx(1.0)]
+
+    def test_pause_blocks_until_retry_after(self, monkeypatch):
+        now = [0.0]
+        monkeypatch.setattr(slack_tool.time, "monotonic", lambda: now[0])
+        monkeypatch.setattr(slack_tool.time, "sleep", lambda s: now.__setitem__(0, now[0] + s))
+        bucket = slack_tool.TokenBucket(rate_per_minute=600, burst=5)
+        bucket.pause(7)
+        bucket.acquire()
+        assert now[0] >= 7
+
+    def test_method_override_from_env(self, monkeypatch):
+        monkeypatch.setenv("SLACK_RATE_LIMIT_CONVERSATIONS_REPLIES", "1")
+        monkeypatch.setattr(slack_tool, "_buckets", {})
+        assert slack_tool._rate_limiter("conversations.replies").rate == pytest.approx(1 / 60)
+
+    @pytest.mark.parametrize("value", ["0", "-5"])
+    def test_non_positive_override_uses_tier_default(self, monkeypatch, value):
+        monkeypatch.setenv("SLACK_RATE_LIMIT_CONVERSATIONS_REPLIES", value)
+        monkeypatch.setattr(slack_tool, "_buckets", {})
+        bucket = slack_tool._rate_limiter("conversations.replies")
+        assert bucket.rate == pytest.approx(slack_tool._TIER_LIMITS["conversations.replies"] / 60)
+        bucket.acquire()
+        bucket.acquire()
+
+
+class TestChannelsHistory:
+    """Test the concurrent multi-channel history fetch."""
+
+    @pytest.fixture
+    def slack(self, web_client, monkeypatch):
+        monkeypatch.setattr(slack_tool, "_buckets", {})
+        monkeypatch.setattr(slack_tool, "SLACK_HISTORY_PAGE_SIZE", 2)
+        return slack_tool.get_slack_client()
+
+    def test_paginates_until_limit(self, slack):
+        slack.conversations_history.side_effect = [
+            {"messages": [{"ts": "3"}, {"ts": "2"}], "has_more": True, "response_metadata": {"next_cursor": "c1"}},
+            {"messages": [{"ts": "1"}], "has_more": True, "response_metadata": {"next_cursor": "c2"}},
+        ]
+        result = slack_tool._fetch_history("C1", 3, "0.5")
+        assert [m["ts"] for m in result["messages"]] == ["3", "2", "1"]
+        assert result["has_more"] is True
+        second = slack.conversations_history.call_args_list[1].kwargs
+        assert second == {"channel": "C1", "limit": 1, "cursor": "c1", "oldest": "0.5", "latest": None}
+
+    def test_stops_at_last_page(self, slack):
+        slack.conversations_history.return_value = {"messages": [{"ts": "1"}], "has_more": False}
+        result = slack_tool._fetch_history("C1", 10, None)
+        assert result == {"channel_id": "C1", "messages": [{"ts": "1"}], "has_more": False}
+        assert slack.conversations_history.call_count == 1
+
+    def test_partial_failure_reported_per_channel(self, slack):
+        def history(channel, **kwargs):
+            if channel == "CBAD":
+                raise SlackApiError("missing", {"error": "channel_not_found"})
+            return {"messages": [{"ts": "1"}], "has_more": False}
+
+        slack.conversations_history.side_effect = history
+        results = [slack_tool._history_result(c, 5, None) for c in ("C1", "CBAD")]
+        assert results[0]["messages"] == [{"ts": "1"}]
+        assert results[1] == {"channel_id": "CBAD", "error": "Slack API Error: channel_not_found"}
+
+    def test_rate_limit_pauses_bucket(self, slack):
+        slack.conversations_history.side_effect = SlackApiError("limited", _RateLimitedResponse(error="ratelimited"))
+        result = slack_tool._history_result("C1", 5, None)
+        assert result["error"] == "Slack API Error: ratelimited"
+        assert slack_tool._rate_limiter("conversations.history")._paused_until > time.monotonic() + 6
+
+
+def _messages(*timestamps):
+    return [{"ts": ts, "user": "U1", "text": f"message {ts}"} for ts in timestamps]
+
+
+class TestMessageStore:
+    """Test the SQLite message store and incremental sync."""
+
+    @pytest.fixture
+    def slack(self, web_client, monkeypatch):
+        monkeypatch.setattr(slack_tool, "_buckets", {})
+        monkeypatch.setattr(slack_tool, "_message_store", slack_tool.MessageStore())
+        return slack_tool.get_slack_client()
+
+    def test_store_persists_to_file(self, tmp_path):
+        path = str(tmp_path / "messages.sqlite")
+        slack_tool.MessageStore(path).save("C1", _messages("2.0", "1.0"), "2.0", "1.0", complete=True)
+        store = slack_tool.MessageStore(path)
+        assert store.state("C1") == ("2.0", "1.0", True)
+        assert [m["ts"] for m in store.recent("C1", 5)] == ["2.0", "1.0"]
+
+    def test_store_keeps_newest_messages_per_channel(self):
+        store = slack_tool.MessageStore(max_messages=2)
+        store.save("C1", _messages("2.0", "1.0"), "2.0", "1.0", complete=True)
+        store.save("C2", _messages("1.5"), "1.5", "1.5", complete=True)
+        store.save("C1", _messages("3.0"), "3.0", "1.0", complete=True)
+        assert [m["ts"] for m in store.recent("C1", 5)] == ["3.0", "2.0"]
+        assert store.state("C1") == ("3.0", "2.0", False)
+        assert store.state("C2") == ("1.5", "1.5", True)
+
+    def test_sync_does_not_backfill_past_cap(self, slack, monkeypatch):
+        monkeypatch.setattr(slack_tool, "_message_store", slack_tool.MessageStore(max_messages=2))
+        slack.conversations_history.side_effect = [
+            {"messages": _messages("3.0", "2.0"), "has_more": True, "response_metadata": {"next_cursor": "c"}},
+            {"messages": [], "has_more": False},
+        ]
+        assert [m["ts"] for m in slack_tool._sync_channel("C1", 2)] == ["3.0", "2.0"]
+        assert [m["ts"] for m in slack_tool._sync_channel("C1", 5)] == ["3.0", "2.0"]
+        assert slack.conversations_history.call_count == 2
+
+    def test_repeat_read_fetches_only_delta(self, slack):
+        slack.conversations_history.side_effect = [
+            {"messages": _messages("2.0", "1.0"), "has_more": False},
+            {"messages": _messages("3.0"), "has_more": False},
+        ]
+        assert [m["ts"] for m in slack_tool._sync_channel("C1", 2)] == ["2.0", "1.0"]
+        assert [m["ts"] for m in slack_tool._sync_channel("C1", 2)] == ["3.0", "2.0"]
+        delta = slack.conversations_history.call_args_list[1].kwargs
+        assert delta["oldest"] == "2.0"
+        assert slack_tool._message_store.state("C1") == ("3.0", "1.0", True)
+
+    def test_empty_delta_served_locally(self, slack):
+        slack.conversations_history.side_effect = [
+            {"messages": _messages("2.0", "1.0"), "has_more": False},
+            {"messages": [], "has_more": False},
+        ]
+        slack_tool._sync_channel("C1", 2)
+        assert [m["ts"] for m in slack_tool._sync_channel("C1", 2)] == ["2.0", "1.0"]
+        assert slack.conversations_history.call_count == 2
+
+    def test_larger_limit_backfills_older_messages(self, slack):
+        slack.conversations_history.side_effect = [
+            {"messages": _messages("3.0"), "has_more": True, "response_metadata": {"next_cursor": "c"}},
+            {"messages": [], "has_more": False},
+            {"messages": _messages("2.0", "1.0"), "has_more": False},
+        ]
+        slack_tool._sync_channel("C1", 1)
+        assert [m["ts"] for m in slack_tool._sync_channel("C1", 3)] == ["3.0", "2.0", "1.0"]
+        backfill = slack.conversations_history.call_args_list[2].kwargs
+        assert backfill["latest"] == "3.0"
+        assert backfill["oldest"] is None
+        assert slack_tool._message_store.state("C1") == ("3.0", "1.0", True)
+
+    def test_oversized_delta_resets_channel(self, slack, monkeypatch):
+        monkeypatch.setattr(slack_tool, "SLACK_SYNC_MAX_DELTA", 1)
+        slack.conversations_history.side_effect = [
+            {"messages": _messages("2.0", "1.0"), "has_more": False},
+            {"messages": _messages("9.0"), "has_more": True, "response_metadata": {"next_cursor": "c"}},
+        ]
+        slack_tool._sync_channel("C1", 2)
+        slack_tool._sync_channel("C1", 1)
+        assert [m["ts"] for m in slack_tool._message_store.recent("C1", 5)] == ["9.0"]
+        assert slack_tool._message_store.state("C1") == ("9.0", "9.0", False)
+
+
+class TestSearchMessages:
+    """Test the full-text index over synced messages."""
+
+    @pytest.fixture
+    def store(self):
+        store = slack_tool.MessageStore()
+        store.save(
+            "C1",
+            [
+                {"ts": "1700000001.000100", "user": "U1", "text": "The deploy failed during rollout"},
+                {"ts": "1700000002.000100", "user": "U2", "text": "Lunch at noon?"},
+                {"ts": "1700000003.000100", "user": "U1", "text": "Deploying a fix for the failed deploy"},
+            ],
+            "1700000003.000100",
+            "1700000001.000100",
+            complete=True,
+        )
+        store.save(
+            "C2", [{"ts": "1700000004.000100", "text": "deploy notes"}], "1700000004.000100", None, complete=True
+        )
+        return store
+
+    def test_ranked_matches_with_snippets(self, store):
+        results = store.search("failed deploy", ["C1"], None, 10)
+        assert [r["ts"] for r in results] == ["1700000003.000100", "1700000001.000100"]
+        assert "**deploy**" in results[0]["snippet"]
+
+    def test_stemming_matches_word_forms(self, store):
+        assert "1700000003.000100" in {r["ts"] for r in store.search("deploying", ["C1"], None, 10)}
+
+    def test_channel_and_since_filters(self, store):
+        assert {r["channel_id"] for r in store.search("deploy", None, None, 10)} == {"C1", "C2"}
+        assert [r["ts"] for r in store.search("deploy", None, "1700000003.000100", 10)] == ["1700000004.000100"]
+
+    def test_index_follows_updates_and_resets(self, store):
+        store.save(
+            "C1", [{"ts": "1700000002.000100", "text": "Lunch moved, deploy first"}], "1700000003.000100", None, True
+        )
+        assert "1700000002.000100" in {r["ts"] for r in store.search("lunch", ["C1"], None, 10)}
+        store.save("C1", [], None, None, False, replace=True)
+        assert store.search("deploy", ["C1"], None, 10) == []
+
+    def test_query_punctuation_is_ignored(self, store):
+        assert store.search('"deploy" OR (', ["C1"], None, 10)
+        assert store.search("!!!", None, None, 10) == []
+
+    def test_permalink_from_workspace_url(self, monkeypatch):
+        monkeypatch.setattr(slack_tool, "SLACK_WORKSPACE_URL", "https://acme.slack.com/")
+        assert slack_tool._permalink("C1", "1700000001.000100", None) == (
+            "https://acme.slack.com/archives/C1/p1700000001000100"
+        )
+        assert slack_tool._permalink("C1", "1700000002.000100", "1700000001.000100").endswith(
+            "?thread_ts=1700000001.000100&cid=C1"
+        )
+
+    def test_since_accepts_iso_dates(self):
+        assert slack_tool._slack_ts("1700000001.5") == "1700000001.500000"
+        assert slack_tool._slack_ts("2024-05-01T00:00:00+00:00") == "1714521600.000000"
+        with pytest.raises(ValueError):
+            slack_tool._slack_ts("last week")
+
+    def test_naive_since_read_as_utc(self, monkeypatch):
+        monkeypatch.setenv("TZ", "America/New_York")
+        if hasattr(time, "tzset"):
+            time.tzset()
+        try:
+            assert slack_tool._slack_ts("2024-05-01") == "1714521600.000000"
+            assert slack_tool._slack_ts("2024-05-01T02:00:00") == "1714528800.000000"
+        finally:
+            monkeypatch.undo()
+            if hasattr(time, "tzset"):
+                time.tzset()
+
+
+class TestTrimmedHistory:
+    """Test the trimmed message projection and cached user directory."""
+
+    @pytest.fixture
+    def slack(self, web_client, monkeypatch):
+        monkeypatch.setattr(slack_tool, "_buckets", {})
+        monkeypatch.setattr(slack_tool, "SLACK_USER_CACHE_TTL", 3600.0)
+        slack_tool._user_cache.clear()
+        client = slack_tool.get_slack_client()
+        client.users_list.side_effect = [
+            {
+                "members": [{"id": "U1", "name": "ada", "profile": {"display_name": "Ada"}}],
+                "response_metadata": {"next_cursor": "c"},
+            },
+            {"members": [{"id": "U2", "name": "grace", "real_name": "Grace Hopper", "profile": {}}]},
+        ]
+        yield client
+        slack_tool._user_cache.clear()
+
+    def test_user_directory_paginates_and_caches(self, slack):
+        assert slack_tool._user_directory() == {"U1": "Ada", "U2": "Grace Hopper"}
+        slack_tool._user_directory()
+        assert slack.users_list.call_count == 2
+        assert slack.users_list.call_args_list[1].kwargs["cursor"] == "c"
+
+    def test_missing_scope_yields_empty_directory(self, slack):
+        slack.users_list.side_effect = SlackApiError("scope", {"error": "missing_scope"})
+        assert slack_tool._user_directory() == {}
+        assert slack_tool._user_cache == {}
+
+    def test_projection_drops_payload_and_resolves_names(self):
+        raw = {
+            "ts": "2.0",
+            "user": "U1",
+            "text": "ping <@U2> and <@U9|someone>",
+            "thread_ts": "1.0",
+            "reply_count": 3,
+            "blocks": [{"type": "rich_text"}],
+            "reactions": [{"name": "+1"}],
+        }
+        assert slack_tool._trim_messages([raw], {"U1": "Ada", "U2": "Grace"}) == [
+            {"ts": "2.0", "user": "Ada", "text": "ping @Grace and @U9", "thread_ts": "1.0", "reply_count": 3}
+        ]
+
+    def test_max_chars_budget(self):
+        messages = [{"ts": "3.0", "text": "a" * 6}, {"ts": "2.0", "text": "b" * 6}, {"ts": "1.0", "text": "c"}]
+        trimmed = slack_tool._trim_messages(messages, {}, max_chars=10)
+        assert [m["text"] for m in trimmed] == ["aaaaaa", "bbbb"]
+        assert trimmed[1]["truncated"] is True
+        assert "truncated" not in trimmed[0]
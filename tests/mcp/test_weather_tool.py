@@ -0,0 +1,196 @@
+"""Tests for weather_tool MCP server — geocoding and forecast caches (isolated from heavy deps)."""
+
+import asyncio
+import sys
+import time
+from unittest.mock import MagicMock
+
+# Mock the fastmcp dependency before importing
+sys.modules.setdefault("fastmcp", MagicMock())
+
+import httpx
+import pytest
+import weather_tool
+from weather_tool import ForecastCache, GeocodeCache
+
+
+class TestGeocodeCache:
+    """Test the in-memory LRU and SQLite-backed geocoding cache."""
+
+    def test_miss_then_hit(self):
+        cache = GeocodeCache(maxsize=4)
+        assert cache.get("Paris") is None
+        cache.put("Paris", (48.85, 2.35))
+        assert cache.get("Paris") == (48.85, 2.35)
+
+    def test_city_name_normalized(self):
+        cache = GeocodeCache(maxsize=4)
+        cache.put("New  York", (40.71, -74.0))
+        assert cache.get(" new york ") == (40.71, -74.0)
+
+    def test_evicts_least_recently_used(self):
+        cache = GeocodeCache(maxsize=2)
+        cache.put("a", (1.0, 1.0))
+        cache.put("b", (2.0, 2.0))
+        cache.get("a")
+        cache.put("c", (3.0, 3.0))
+        assert cache.get("b") is None
+        assert cache.get("a") == (1.0, 1.0)
+
+    def test_sqlite_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "geocode.sqlite")
+        GeocodeCache(maxsize=4, path=path).put("Paris", (48.85, 2.35))
+        assert GeocodeCache(maxsize=4, path=path).get("paris") == (48.85, 2.35)
+
+
+class TestForecastCache:
+    """Test rounding, TTL and stale-while-revalidate behaviour."""
+
+    def test_key_rounds_coordinates(self):
+        cache = ForecastCache(maxsize=4, ttl=60, stale_ttl=60, precision=2)
+        assert cache.key(40.71278, -74.00597) == cache.key(40.7131, -74.0061)
+
+    def test_fresh_hit(self):
+        cache = ForecastCache(maxsize=4, ttl=60, stale_ttl=60, precision=2)
+        cache.put((1.0, 2.0), {"temperature": 70})
+        assert cache.get((1.0, 2.0)) == ({"temperature": 70}, False)
+
+    def test_stale_entry_served_once_with_refresh(self, monkeypatch):
+        cache = ForecastCache(maxsize=4, ttl=60, stale_ttl=60, precision=2)
+        cache.put((1.0, 2.0), {"temperature": 70})
+        now = time.monotonic()
+        monkeypatch.setattr(weather_tool.time, "monotonic", lambda: now + 90)
+        assert cache.get((1.0, 2.0)) == ({"temperature": 70}, True)
+        # Only the first stale reader triggers a refresh
+        assert cache.get((1.0, 2.0)) == ({"temperature": 70}, False)
+
+    def test_expired_entry_is_a_miss(self, monkeypatch):
+        cache = ForecastCache(maxsize=4, ttl=60, stale_ttl=60, precision=2)
+        cache.put((1.0, 2.0), {"temperature": 70})
+        now = time.monotonic()
+        monkeypatch.setattr(weather_tool.time, "monotonic", lambda: now + 200)
+        assert cache.get((1.0, 2.0)) == (None, False)
+
+
+class TestCurrentWeather:
+    """Test _current_weather cache integration."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(
+            weather_tool, "_forecast_cache", ForecastCache(maxsize=4, ttl=60, stale_ttl=60, precision=2)
+        )
+
+    def test_second_lookup_skips_upstream(self, monkeypatch):
+        calls = []
+
+        async def fake_fetch(key, deadline):
+            calls.append(key)
+            weather_tool._forecast_cache.put(key, {"temperature": 70})
+            return {"temperature": 70}
+
+        monkeypatch.setattr(weather_tool, "_fetch_forecast", fake_fetch)
+        deadline = time.monotonic() + 5
+        assert asyncio.run(weather_tool._current_weather(40.71278, -74.00597, deadline)) == {"temperature": 70}
+        assert asyncio.run(weather_tool._current_weather(40.7131, -74.0061, deadline)) == {"temperature": 70}
+        assert calls == [(40.71, -74.01)]
+
+    def test_geocode_served_from_cache(self, monkeypatch):
+        cache = GeocodeCache(maxsize=4)
+        cache.put("Paris", (48.85, 2.35))
+        monkeypatch.setattr(weather_tool, "_geocode_cache", cache)
+        get_json = MagicMock()
+        monkeypatch.setattr(weather_tool, "_get_json", get_json)
+        assert asyncio.run(weather_tool._geocode("paris", time.monotonic() + 5)) == (48.85, 2.35)
+        get_json.assert_not_called()
+
+
+def _fake_get_json(payload, calls):
+    async def fake(url, params, deadline):
+        calls.append(params)
+        return payload
+
+    return fake
+
+
+class TestFetchForecasts:
+    """Test the batched multi-location forecast request."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(
+            weather_tool, "_forecast_cache", ForecastCache(maxsize=4, ttl=60, stale_ttl=60, precision=2)
+        )
+
+    def test_many_locations_in_one_request(self, monkeypatch):
+        calls = []
+        payload = [{"current_weather": {"temperature": 70}}, {"current_weather": {"temperature": 50}}]
+        monkeypatch.setattr(weather_tool, "_get_json", _fake_get_json(payload, calls))
+
+        forecasts = asyncio.run(weather_tool._fetch_forecasts([(40.71, -74.01), (48.85, 2.35)], time.monotonic() + 5))
+
+        assert forecasts == {(40.71, -74.01): {"temperature": 70}, (48.85, 2.35): {"temperature": 50}}
+        assert len(calls) == 1
+        assert calls[0]["latitude"] == "40.71,48.85"
+        assert calls[0]["longitude"] == "-74.01,2.35"
+        assert weather_tool._forecast_cache.get((48.85, 2.35)) == ({"temperature": 50}, False)
+
+    def test_single_location_object_response(self, monkeypatch):
+        payload = {"current_weather": {"temperature": 70}}
+        monkeypatch.setattr(weather_tool, "_get_json", _fake_get_json(payload, []))
+        assert asyncio.run(weather_tool._fetch_forecast((40.71, -74.01), time.monotonic() + 5)) == {"temperature": 70}
+
+    def test_mismatched_result_count_raises(self, monkeypatch):
+        payload = [{"current_weather": {"temperature": 70}}]
+        monkeypatch.setattr(weather_tool, "_get_json", _fake_get_json(payload, []))
+        with pytest.raises(ValueError):
+            asyncio.run(weather_tool._fetch_forecasts([(1.0, 1.0), (2.0, 2.0)], time.monotonic() + 5))
+
+
+class TestGetJson:
+    """Test async retry/backoff and deadline handling."""
+
+    @pytest.fixture(autouse=True)
+    def fast_backoff(self, monkeypatch):
+        monkeypatch.setattr(weather_tool, "_BACKOFF_FACTOR", 0.001)
+
+    def _use_transport(self, monkeypatch, handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(weather_tool, "_client_for", lambda url: client)
+
+    def test_retries_transient_status(self, monkeypatch):
+        responses = iter([httpx.Response(503), httpx.Response(200, json={"ok": True})])
+        self._use_transport(monkeypatch, lambda request: next(responses))
+        assert asyncio.run(weather_tool._get_json("https://example.com", {}, time.monotonic() + 5)) == {"ok": True}
+
+    def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr(weather_tool, "_MAX_RETRIES", 2)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        self._use_transport(monkeypatch, handler)
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(weather_tool._get_json("https://example.com", {}, time.monotonic() + 5))
+        assert len(calls) == 3
+
+    def test_backoff_never_exceeds_deadline(self, monkeypatch):
+        monkeypatch.setattr(weather_tool, "_BACKOFF_FACTOR", 10.0)
+        self._use_transport(monkeypatch, lambda request: httpx.Response(503))
+        start = time.monotonic()
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(weather_tool._get_json("https://example.com", {}, start + 0.5))
+        assert time.monotonic() - start < 0.5
+
+    def test_expired_deadline_raises_timeout(self, monkeypatch):
+        self._use_transport(monkeypatch, lambda request: httpx.Response(200, json={}))
+        with pytest.raises(httpx.TimeoutException):
+            asyncio.run(weather_tool._get_json("https://example.com", {}, time.monotonic() - 1))
+
+    def test_client_timeout_tightens_deadline(self):
+        ctx = MagicMock()
+        ctx.request_context.meta.timeout = 2
+        assert weather_tool._deadline(ctx) - time.monotonic() <= 2
+        assert weather_tool._deadline(None) - time.monotonic() > 2